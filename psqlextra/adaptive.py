@@ -0,0 +1,84 @@
+import threading
+
+from typing import Any, Optional, Type
+
+from django.db import models
+
+from .conflict_keys import get_conflict_target_cache_key
+from .statement_cache import conflict_ratio_cache, make_cache_key
+from .types import UpsertStrategy
+
+# once more than this share of the rows in recent batches
+# already existed, rows are updated before inserting them
+UPDATE_FIRST_THRESHOLD = 0.5
+
+
+class ConflictRatioTracker:
+    """Keeps track of which share of the rows upserted in recent batches
+    already existed.
+
+    The ratio is an exponentially weighted moving average
+    over the batches, so that it follows changes in the
+    workload without jumping around on a single odd batch.
+    """
+
+    def __init__(self, smoothing: float = 0.2) -> None:
+        """Initializes a new instance of :see:ConflictRatioTracker.
+
+        Arguments:
+            smoothing (default: 0.2):
+                How much weight the most recent batch gets
+                in the average, between 0 and 1.
+        """
+
+        self.smoothing = smoothing
+        self.ratio: Optional[float] = None
+
+        self._lock = threading.Lock()
+
+    def observe(self, conflicts: int, total: int) -> None:
+        """Records that `conflicts` out of `total` rows in a batch already
+        existed."""
+
+        if total <= 0:
+            return
+
+        ratio = conflicts / total
+
+        with self._lock:
+            if self.ratio is None:
+                self.ratio = ratio
+            else:
+                self.ratio += self.smoothing * (ratio - self.ratio)
+
+    def choose(self) -> UpsertStrategy:
+        """Picks the strategy that is cheapest for the ratio observed so
+        far."""
+
+        ratio = self.ratio
+        if ratio is not None and ratio > UPDATE_FIRST_THRESHOLD:
+            return UpsertStrategy.UPDATE_FIRST
+
+        return UpsertStrategy.INSERT
+
+
+def get_conflict_ratio_tracker(
+    model: Type[models.Model], conflict_target: Any, using: str
+) -> ConflictRatioTracker:
+    """Gets the tracker of the conflict ratio of upserts into the specified
+    model with the specified conflict target.
+
+    Trackers live for as long as the process. Call
+    `conflict_ratio_cache.invalidate(model)` to start
+    over, for example after the table was truncated.
+    """
+
+    conflict_target_key = get_conflict_target_cache_key(conflict_target)
+
+    return conflict_ratio_cache.get_or_set(
+        model,
+        make_cache_key(using, conflict_target_key)
+        if conflict_target_key is not None
+        else None,
+        ConflictRatioTracker,
+    )
@@ -0,0 +1,245 @@
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+
+try:
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+except ImportError:
+    is_psycopg3 = False
+
+if is_psycopg3:
+    import psycopg
+
+    from psycopg.types import TypeInfo
+    from psycopg.types.hstore import register_hstore
+
+if TYPE_CHECKING:
+    from psycopg import AsyncConnection
+
+_pools: Dict[str, Any] = {}
+
+# statements are executed this many times before psycopg prepares
+# them by itself, see :see:get_async_connection_params
+_EXPLICIT_PREPARE_THRESHOLD = 2**31 - 1
+
+# the hstore type per database, the type's OID is the
+# same for every connection to the same database
+_hstore_type_infos: Dict[Tuple[str, Any], "TypeInfo"] = {}
+
+
+def set_async_pool(pool: Optional[Any], using: str) -> None:
+    """Sets the pool to take connections from for the async API (such as
+    :see:PostgresQuerySet.aupsert).
+
+    The async API requires a pool. Create it when your
+    application starts, inside the event loop it is going
+    to be used in:
+
+        pool = psycopg_pool.AsyncConnectionPool(
+            conninfo="",
+            kwargs=get_async_connection_params("default"),
+            configure=partial(configure_async_connection, using="default"),
+        )
+        set_async_pool(pool, using="default")
+
+    Arguments:
+        pool:
+            A `psycopg_pool.AsyncConnectionPool` or
+            None to stop using a pool.
+
+        using:
+            The name of the database connection to use
+            the pool for.
+    """
+
+    if pool is None:
+        _pools.pop(using, None)
+        return
+
+    _pools[using] = pool
+
+
+def get_async_connection_params(using: str) -> Dict[str, Any]:
+    """Gets the parameters to open a psycopg 3 async connection for the
+    database connection with the specified name.
+
+    These are the same parameters Django uses, except that
+    the cursors are async cursors and statements executed
+    with `prepare=True` are prepared.
+    """
+
+    _assert_psycopg3()
+
+    connection = connections[using]
+    params = connection.get_connection_params()
+
+    server_side_binding = connection.settings_dict.get("OPTIONS", {}).get(
+        "server_side_binding"
+    )
+    params["cursor_factory"] = (
+        psycopg.AsyncCursor
+        if server_side_binding is True
+        else psycopg.AsyncClientCursor
+    )
+
+    # Django disables prepared statements unless configured otherwise,
+    # which would make psycopg ignore `prepare=True` as well, with a
+    # threshold that is never reached only statements that are
+    # explicitly asked to be prepared are
+    if "prepare_threshold" not in connection.settings_dict.get("OPTIONS", {}):
+        params["prepare_threshold"] = _EXPLICIT_PREPARE_THRESHOLD
+
+    return params
+
+
+async def configure_async_connection(
+    aconnection: "AsyncConnection", using: str
+) -> None:
+    """Sets up a new async connection the same way Django sets up its own
+    connections.
+
+    Sets the time zone and registers the hstore type. Pass
+    this as `configure` when creating a pool, bound to the
+    name of the database connection the pool is for.
+
+    The hstore type is only looked up once per database.
+    """
+
+    connection = connections[using]
+
+    await aconnection.set_autocommit(True)
+
+    timezone_name = connection.timezone_name
+    if (
+        timezone_name
+        and aconnection.info.parameter_status("TimeZone") != timezone_name
+    ):
+        await aconnection.execute(
+            connection.ops.set_time_zone_sql(), [timezone_name]
+        )
+
+    # not cached when missing, the extension
+    # might still be created later on
+    cache_key = (using, connection.settings_dict["NAME"])
+    hstore_info = _hstore_type_infos.get(cache_key)
+    if not hstore_info:
+        hstore_info = await TypeInfo.fetch(aconnection, "hstore")
+        if hstore_info:
+            _hstore_type_infos[cache_key] = hstore_info
+
+    if hstore_info:
+        register_hstore(hstore_info, aconnection)
+
+
+def async_cursor(aconnection: "AsyncConnection", *, prepare: bool = False):
+    """Opens a cursor on the specified async connection.
+
+    Arguments:
+        aconnection:
+            The psycopg 3 async connection to open the
+            cursor on.
+
+        prepare (default: False):
+            Whether statements are going to be executed with
+            `prepare=True`. Client-side binding cursors, the
+            default (see :see:get_async_connection_params),
+            silently ignore that. A server-side binding cursor
+            is opened instead, which prepares them.
+    """
+
+    _assert_psycopg3()
+
+    if prepare:
+        return psycopg.AsyncCursor(aconnection)
+
+    return aconnection.cursor()
+
+
+class async_connection:
+    """Gets a psycopg 3 async connection for the database connection with
+    the specified name from the pool configured with
+    :see:set_async_pool:
+
+        async with async_connection("default") as aconnection:
+            ...
+
+    Implemented as a class rather than with
+    `contextlib.asynccontextmanager`, which does not exist
+    on Python 3.6, so that importing this module works on
+    every supported version of Python.
+    """
+
+    def __init__(self, using: str) -> None:
+        self.using = using
+
+        self._pool_connection: Optional[Any] = None
+
+    async def __aenter__(self) -> "AsyncConnection":
+        _assert_psycopg3()
+
+        # opening a connection for every statement would
+        # cost more than the async API saves
+        pool = _pools.get(self.using)
+        if not pool:
+            raise ImproperlyConfigured(
+                (
+                    "No pool was configured for the async API on database "
+                    "connection '%s', configure one with set_async_pool(..)."
+                )
+                % self.using
+            )
+
+        self._pool_connection = pool.connection()
+        return await self._pool_connection.__aenter__()
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        if self._pool_connection is None:
+            return
+
+        pool_connection, self._pool_connection = self._pool_connection, None
+        await pool_connection.__aexit__(exc_type, exc_value, traceback)
+
+
+class FetchedCursor:
+    """Read-only, cursor-like view of rows that were already fetched from an
+    async cursor.
+
+    Allows re-using code that reads from normal cursors,
+    such as :see:models_from_cursor.
+    """
+
+    def __init__(
+        self, description: Any, rows: List[Any], rowcount: int
+    ) -> None:
+        self.description = description
+        self.rowcount = rowcount
+
+        self._rows = iter(rows)
+
+    @classmethod
+    async def fetch(cls, cursor: Any) -> "FetchedCursor":
+        """Fetches all rows from the specified async cursor."""
+
+        rows = await cursor.fetchall() if cursor.description else []
+        return cls(cursor.description, rows, cursor.rowcount)
+
+    def fetchone(self) -> Optional[Any]:
+        return next(self._rows, None)
+
+    def fetchmany(self, size: int = 100) -> List[Any]:
+        return [row for _, row in zip(range(size), self._rows)]
+
+    def fetchall(self) -> List[Any]:
+        return list(self._rows)
+
+    def __iter__(self):
+        return self._rows
+
+
+def _assert_psycopg3() -> None:
+    if not is_psycopg3:
+        raise ImproperlyConfigured(
+            "The async API of django-postgres-extra requires psycopg 3. "
+            "Install psycopg>=3.1 to use it."
+        )
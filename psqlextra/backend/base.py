@@ -10,6 +10,11 @@ from django.contrib.postgres.signals import (
 )
 from django.db import ProgrammingError
 
+from psqlextra.prepared_statements import (
+    PreparedStatementCache,
+    get_prepared_statements_max,
+)
+
 from . import base_impl
 from .introspection import PostgresIntrospection
 from .operations import PostgresOperations
@@ -46,6 +51,10 @@ class DatabaseWrapper(Wrapper):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+        self.prepared_statements = PreparedStatementCache(
+            get_prepared_statements_max()
+        )
+
         if VERSION >= (5, 0):
             return
 
@@ -75,6 +84,16 @@ class DatabaseWrapper(Wrapper):
                     )
                 )
 
+    def connect(self):
+        """Connects to the database.
+
+        Statements prepared on a previous connection are gone,
+        forget about them.
+        """
+
+        super().connect()
+        self.prepared_statements.reset()
+
     def prepare_database(self):
         """Ran to prepare the configured database.
 
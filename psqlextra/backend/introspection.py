@@ -24,6 +24,10 @@ class PostgresIntrospectedPartitionTable:
     full_name: str
     comment: Optional[str]
 
+    # the partition bound as PostgreSQL describes it, for
+    # example: FOR VALUES FROM ('2024-01-01') TO ('2024-02-01')
+    bound: Optional[str] = None
+
 
 @dataclass
 class PostgresIntrospectedPartitonedTable:
@@ -129,7 +133,8 @@ class PostgresIntrospection(Introspection):
         sql = """
             SELECT
                 child.relname,
-                pg_description.description
+                pg_description.description,
+                pg_get_expr(child.relpartbound, child.oid)
             FROM pg_inherits
             JOIN
                 pg_class parent
@@ -165,6 +170,7 @@ class PostgresIntrospection(Introspection):
                 name=row[0].replace(f"{table_name}_", ""),
                 full_name=row[0],
                 comment=row[1] or None,
+                bound=row[2],
             )
             for row in cursor.fetchall()
         ]
@@ -19,6 +19,7 @@ from psqlextra.settings import (
     postgres_prepend_local_search_path,
     postgres_reset_local_search_path,
 )
+from psqlextra.statement_cache import partition_router_cache
 from psqlextra.type_assertions import is_sql_with_params
 from psqlextra.types import PostgresPartitioningMethod
 
@@ -725,6 +726,8 @@ class PostgresSchemaEditor(SchemaEditor):
             if comment:
                 self.set_comment_on_table(table_name, comment)
 
+        partition_router_cache.invalidate(model)
+
     def add_list_partition(
         self,
         model: Type[Model],
@@ -784,6 +787,8 @@ class PostgresSchemaEditor(SchemaEditor):
             if comment:
                 self.set_comment_on_table(table_name, comment)
 
+        partition_router_cache.invalidate(model)
+
     def add_hash_partition(
         self,
         model: Type[Model],
@@ -875,6 +880,8 @@ class PostgresSchemaEditor(SchemaEditor):
         )
         self.execute(sql)
 
+        partition_router_cache.invalidate(model)
+
     def alter_db_table(
         self, model: Type[Model], old_db_table: str, new_db_table: str
     ) -> None:
@@ -0,0 +1,340 @@
+import threading
+import time
+
+from itertools import count
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Type,
+    Union,
+)
+
+from django.core.exceptions import SuspiciousOperation
+from django.db import connections, models, router
+from django.db.models import Expression, Q
+
+from .conflict_keys import (
+    DedupeMergeFunc,
+    _UniqueKey,
+    build_conflict_key_getter,
+    get_merge_func,
+)
+from .query import ConflictTarget, PostgresQuerySet
+from .types import DedupePolicy, InsertEngine
+
+
+class UpsertBuffer:
+    """Collects rows in memory and upserts them in bulk later.
+
+    Rows with the same values for the conflict target are
+    coalesced into a single row while they are buffered,
+    so that repeated writes to the same row only end up
+    in the database once.
+
+    The buffer is flushed when it holds `max_rows` rows,
+    when the oldest row is older than `max_age` seconds
+    and when it is used as a context manager and the
+    block exits:
+
+        with transaction.atomic():
+            with UpsertBuffer(MyModel, ["name"]) as buffer:
+                for name in names:
+                    buffer.add(dict(name=name, last_seen=now))
+
+    Rows are discarded when the block exits because of an
+    error. Rows are flushed on the connection of the thread
+    that triggers the flush, a flush triggered by `add`
+    takes part in the transaction `add` is called in.
+
+    Safe to use from multiple threads. Flushes never run
+    concurrently, so rows are written in the order they
+    were added.
+    """
+
+    def __init__(
+        self,
+        model: Type[models.Model],
+        conflict_target: ConflictTarget,
+        *,
+        merge: Union[
+            DedupePolicy, str, DedupeMergeFunc
+        ] = DedupePolicy.KEEP_LAST,
+        max_rows: Optional[int] = 1000,
+        max_age: Optional[float] = None,
+        flush_interval: Optional[float] = None,
+        using: Optional[str] = None,
+        index_predicate: Optional[Union[Expression, Q, str]] = None,
+        update_condition: Optional[Union[Expression, Q, str]] = None,
+        update_values: Optional[Dict[str, Union[Any, Expression]]] = None,
+        skip_unchanged: bool = False,
+        engine: Union[InsertEngine, str] = InsertEngine.VALUES,
+        batch_size: Optional[int] = None,
+        sort: bool = False,
+    ) -> None:
+        """Initializes a new instance of :see:UpsertBuffer.
+
+        Arguments:
+            model:
+                The model to upsert rows into.
+
+            conflict_target:
+                Fields to pass into the ON CONFLICT clause,
+                rows are coalesced by the values of these.
+
+            merge (default: DedupePolicy.KEEP_LAST):
+                What to do when a row is added while a row with
+                the same values for the conflict target is
+                buffered. Either a :see:DedupePolicy or a function
+                that takes the buffered row and the new row and
+                returns the row to keep buffered.
+
+            max_rows (default: 1000):
+                Flush once this many rows are buffered. None
+                to not flush based on the amount of rows.
+
+            max_age:
+                Optionally, flush once the oldest buffered
+                row was added this many seconds ago.
+
+            flush_interval:
+                Optionally, check every this many seconds
+                whether `max_age` was exceeded from a background
+                thread, so that rows do not linger when no more
+                rows are added. The background thread uses its
+                own connection. Call :see:close to stop it.
+
+            using:
+                The name of the database connection to use.
+
+            index_predicate, update_condition, update_values,
+            skip_unchanged, engine, batch_size, sort:
+                See :see:PostgresQuerySet.bulk_upsert.
+        """
+
+        if max_rows is not None and max_rows < 1:
+            raise SuspiciousOperation("max_rows must be 1 or larger.")
+
+        if flush_interval is not None and max_age is None:
+            raise SuspiciousOperation(
+                "flush_interval only applies when max_age is specified."
+            )
+
+        self.model = model
+        self.conflict_target = conflict_target
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self.using = using or router.db_for_write(model)
+
+        self.upsert_kwargs = dict(
+            index_predicate=index_predicate,
+            update_condition=update_condition,
+            update_values=update_values,
+            skip_unchanged=skip_unchanged,
+            engine=engine,
+            batch_size=batch_size,
+            sort=sort,
+        )
+
+        # the amount of rows that were merged into
+        # a row that was already buffered
+        self.coalesced = 0
+
+        self._merge = get_merge_func(merge)
+        self._get_conflict_key = build_conflict_key_getter(
+            model, conflict_target
+        )
+
+        self._rows: Dict[Hashable, Dict[str, Any]] = {}
+        self._oldest_row_added_at: Optional[float] = None
+        self._unique_keys = count()
+
+        # guards the buffered rows
+        self._lock = threading.Lock()
+
+        # makes sure only one flush runs at a time
+        self._flush_lock = threading.Lock()
+
+        self._background_error: Optional[Exception] = None
+        self._closed = threading.Event()
+        self._flush_thread = None
+
+        if flush_interval is not None:
+            self._flush_thread = threading.Thread(
+                target=self._flush_periodically,
+                args=(flush_interval,),
+                daemon=True,
+            )
+            self._flush_thread.start()
+
+    def __enter__(self) -> "UpsertBuffer":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is not None:
+            self.clear()
+
+        self.close(flush=exc_type is None)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, row: Dict[str, Any]) -> None:
+        """Adds a row to the buffer and flushes if it is full or too old."""
+
+        self._raise_background_error()
+
+        key = self._get_conflict_key(row)
+
+        with self._lock:
+            # rows with NULL in the conflict target
+            # never conflict with anything
+            if key is None:
+                key = (_UniqueKey, next(self._unique_keys))
+
+            existing_row = self._rows.get(key)
+            if existing_row is None:
+                self._rows[key] = row
+            else:
+                self._rows[key] = self._merge(existing_row, row)
+                self.coalesced += 1
+
+            if self._oldest_row_added_at is None:
+                self._oldest_row_added_at = time.monotonic()
+
+            is_due = self._is_due()
+
+        if is_due:
+            self.flush()
+
+    def extend(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """Adds multiple rows to the buffer, see :see:add."""
+
+        for row in rows:
+            self.add(row)
+
+    def flush(self) -> int:
+        """Upserts all buffered rows.
+
+        Rows that specify different fields are upserted in
+        separate queries. When an upsert fails, the rows that
+        were not upserted yet are put back into the buffer,
+        merged with any rows added in the meantime.
+
+        Returns:
+            The amount of rows that were inserted or updated.
+        """
+
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, {}
+                self._oldest_row_added_at = None
+
+            # all rows in a single upsert have to specify the same
+            # fields, otherwise the upsert would fail every time
+            groups: Dict[FrozenSet[str], List[Hashable]] = {}
+            for key, row in rows.items():
+                groups.setdefault(frozenset(row), []).append(key)
+
+            affected_rows = 0
+            for keys in groups.values():
+                try:
+                    affected_rows += PostgresQuerySet(self.model).bulk_upsert(
+                        self.conflict_target,
+                        [rows[key] for key in keys],
+                        using=self.using,
+                        returning=None,
+                        **self.upsert_kwargs,
+                    )
+                except Exception:
+                    self._restore(rows)
+                    raise
+
+                for key in keys:
+                    del rows[key]
+
+            return affected_rows
+
+    def flush_if_due(self) -> int:
+        """Flushes if the buffer is full or the oldest row is too old.
+
+        Returns:
+            The amount of rows that were inserted or updated.
+        """
+
+        with self._lock:
+            is_due = self._is_due()
+
+        return self.flush() if is_due else 0
+
+    def clear(self) -> None:
+        """Discards all buffered rows without upserting them."""
+
+        with self._lock:
+            self._rows = {}
+            self._oldest_row_added_at = None
+
+    def close(self, flush: bool = True) -> None:
+        """Stops the background thread and flushes the remaining rows.
+
+        Arguments:
+            flush (default: True):
+                Whether to upsert the buffered rows.
+        """
+
+        self._closed.set()
+        if self._flush_thread:
+            self._flush_thread.join()
+
+        if flush:
+            self._raise_background_error()
+            self.flush()
+
+    def _is_due(self) -> bool:
+        if self.max_rows is not None and len(self._rows) >= self.max_rows:
+            return True
+
+        return (
+            self.max_age is not None
+            and self._oldest_row_added_at is not None
+            and time.monotonic() - self._oldest_row_added_at >= self.max_age
+        )
+
+    def _restore(self, rows: Dict[Hashable, Dict[str, Any]]) -> None:
+        """Puts rows that failed to flush back into the buffer, in front of
+        the rows that were added since."""
+
+        with self._lock:
+            newer_rows, self._rows = self._rows, rows
+
+            for key, row in newer_rows.items():
+                existing_row = self._rows.get(key)
+                self._rows[key] = (
+                    row
+                    if existing_row is None
+                    else self._merge(existing_row, row)
+                )
+
+            self._oldest_row_added_at = time.monotonic()
+
+    def _flush_periodically(self, interval: float) -> None:
+        try:
+            while not self._closed.wait(interval):
+                try:
+                    self.flush_if_due()
+                except Exception as e:
+                    # raised from the next add/close
+                    self._background_error = e
+                    return
+        finally:
+            # every thread has its own connection
+            connections[self.using].close()
+
+    def _raise_background_error(self) -> None:
+        error, self._background_error = self._background_error, None
+        if error:
+            raise error
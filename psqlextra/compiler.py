@@ -3,21 +3,56 @@ import os
 import sys
 
 from collections.abc import Iterable
-from typing import TYPE_CHECKING, Tuple, Union, cast
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
 
 import django
 
 from django.conf import settings
 from django.core.exceptions import SuspiciousOperation
-from django.db.models import Expression, Model, Q
+from django.db.models import NOT_PROVIDED, Expression, Model, Q
 from django.db.models.fields.related import RelatedField
 from django.db.models.sql import compiler as django_compiler
 
-from .expressions import HStoreValue
-from .types import ConflictAction
+from .conflict_keys import (
+    get_conflict_target_cache_key,
+    get_conflict_target_fields,
+)
+from .expressions import (
+    GET_OR_CREATE_CREATED_ALIAS,
+    MERGE_SOURCE_ALIAS,
+    ExcludedCol,
+    HStoreValue,
+    KeysIn,
+    MergeSourceCol,
+    get_array_element_type,
+)
+from .outcome import KEY_COLUMN_PREFIX, OUTCOME_COLUMN
+from .staging import STAGING_ORDINAL_COLUMN
+from .statement_cache import (
+    conflict_target_clause_cache,
+    make_cache_key,
+    on_conflict_clause_cache,
+)
+from .types import ConflictAction, InsertEngine, MergeAction
 
 if TYPE_CHECKING:
-    from .sql import PostgresInsertQuery
+    from .merge import MergeWhen
+    from .sql import (
+        PostgresGetOrCreateQuery,
+        PostgresInsertQuery,
+        PostgresMergeQuery,
+        PostgresUpdateFromValuesQuery,
+    )
 
 
 def append_caller_to_sql(sql):
@@ -174,12 +209,135 @@ class PostgresInsertOnConflictCompiler(django_compiler.SQLInsertCompiler):  # ty
     def as_sql(self, return_id=False, *args, **kwargs):
         """Builds the SQL INSERT statement."""
 
-        queries = [
+        if self.query.staging_table_name:
+            queries = [self._build_insert_from_staging_table()]
+        elif self.query.engine == InsertEngine.UNNEST:
+            queries = [self._build_insert_from_arrays()]
+        else:
+            queries = super().as_sql(*args, **kwargs)
+
+        return [
             self._rewrite_insert(sql, params, return_id)
-            for sql, params in super().as_sql(*args, **kwargs)
+            for sql, params in queries
         ]
 
-        return queries
+    def as_create_staging_table_sql(self) -> str:
+        """Builds the SQL statement that creates the temporary staging table
+        that rows are copied into when inserting with
+        :see:InsertEngine.COPY.
+
+        The staging table has the same column types as the columns
+        being inserted into, plus an ordinal column that preserves
+        the order in which the rows were copied.
+        """
+
+        columns = ", ".join(
+            self.qn(field.column) for field in self.query.fields
+        )
+
+        return (
+            f"CREATE TEMPORARY TABLE {self.qn(self.query.staging_table_name)} "
+            f"ON COMMIT DROP AS SELECT 0::bigint AS {self.qn(STAGING_ORDINAL_COLUMN)}, "
+            f"{columns} FROM {self.qn(self.query.get_meta().db_table)} WITH NO DATA"
+        )
+
+    def prepare_value_rows(self) -> List[List[Any]]:
+        """Gets the values of all rows to insert, prepared for the database.
+
+        This does what the normal INSERT compiler does for every row,
+        except that the values are returned as-is rather than compiled
+        into SQL. Expressions cannot be used since there's no SQL
+        to put them in.
+        """
+
+        value_rows = []
+        for obj in self.query.objs:
+            value_row = []
+            for field in self.query.fields:
+                value = self.prepare_value(field, self.pre_save_val(field, obj))
+                if hasattr(value, "as_sql"):
+                    raise SuspiciousOperation(
+                        (
+                            "Cannot use expressions as values for '%s' when "
+                            "inserting with the '%s' engine."
+                        )
+                        % (field.name, self.query.engine)
+                    )
+
+                value_row.append(value)
+
+            value_rows.append(value_row)
+
+        return value_rows
+
+    def _build_insert_from_staging_table(self) -> Tuple[str, tuple]:
+        """Builds a `INSERT INTO ... SELECT` statement that inserts the rows
+        previously copied into the staging table."""
+
+        table_name = self.qn(self.query.get_meta().db_table)
+        columns = ", ".join(
+            self.qn(field.column) for field in self.query.fields
+        )
+
+        return (
+            (
+                f"INSERT INTO {table_name} ({columns}) "
+                f"SELECT {columns} FROM {self.qn(self.query.staging_table_name)} "
+                f"ORDER BY {self.qn(STAGING_ORDINAL_COLUMN)}"
+            ),
+            tuple(),
+        )
+
+    def _build_insert_from_arrays(self) -> Tuple[str, tuple]:
+        """Builds a `INSERT INTO ... SELECT * FROM unnest(...)` statement that
+        passes the values of each column as a single array parameter.
+
+        The SQL is the same regardless of the amount of rows.
+        """
+
+        table_name = self.qn(self.query.get_meta().db_table)
+        columns = ", ".join(
+            self.qn(field.column) for field in self.query.fields
+        )
+        arrays_sql, params = self._build_value_arrays()
+
+        return (
+            f"INSERT INTO {table_name} ({columns}) SELECT * FROM unnest({arrays_sql})",
+            params,
+        )
+
+    def _build_value_arrays(self) -> Tuple[str, tuple]:
+        """Builds the array parameters to pass to `unnest(...)`, one per
+        column, holding the values of that column for all rows."""
+
+        for field in self.query.fields:
+            if field.get_internal_type() == "ArrayField":
+                # unnest(..) would flatten the multi-dimensional array
+                raise SuspiciousOperation(
+                    (
+                        "Cannot insert into '%s' with the '%s' engine, "
+                        "array fields are not supported."
+                    )
+                    % (field.name, self.query.engine)
+                )
+
+        arrays = ", ".join(
+            f"%s::{self._get_array_element_type(field)}[]"
+            for field in self.query.fields
+        )
+
+        value_columns = zip(*self.prepare_value_rows())
+
+        return (
+            arrays,
+            tuple(list(value_column) for value_column in value_columns),
+        )
+
+    def _get_array_element_type(self, field) -> str:
+        """Gets the type to cast the array of values for the specified field
+        to when inserting with :see:InsertEngine.UNNEST."""
+
+        return get_array_element_type(field, self.connection)
 
     def _rewrite_insert(self, sql, params, return_id=False):
         """Rewrites a formed SQL INSERT query to include the ON CONFLICT
@@ -194,15 +352,25 @@ class PostgresInsertOnConflictCompiler(django_compiler.SQLInsertCompiler):  # ty
 
             return_id:
                 Whether to only return the ID or all
-                columns.
+                columns. Ignored when the query specifies
+                what to return.
 
         Returns:
             A tuple of the rewritten SQL query and new params.
         """
 
-        returning = (
-            self.qn(self.query.model._meta.pk.attname) if return_id else "*"
-        )
+        returning = self._build_returning(return_id)
+
+        if self.query.partition_table_name:
+            sql = self._rewrite_insert_into_partition(sql)
+
+        # a plain insert, used by the async API to insert
+        # without conflict handling over its own connection
+        if not self.query.conflict_action:
+            if returning:
+                sql += f" RETURNING {returning}"
+
+            return append_caller_to_sql(sql), params
 
         (sql, params) = self._rewrite_insert_on_conflict(
             sql, params, self.query.conflict_action.value, returning
@@ -210,19 +378,56 @@ class PostgresInsertOnConflictCompiler(django_compiler.SQLInsertCompiler):  # ty
 
         return append_caller_to_sql(sql), params
 
+    def _rewrite_insert_into_partition(self, sql: str) -> str:
+        """Rewrites a SQL INSERT query to insert straight into the partition
+        in :see:PostgresInsertQuery.partition_table_name.
+
+        The partition is aliased as the partitioned table so
+        that references to the partitioned table's columns in
+        the rest of the query keep working.
+        """
+
+        table_name = self.qn(self.query.get_meta().db_table)
+        partition_table_name = self.qn(self.query.partition_table_name)
+
+        prefix = f"INSERT INTO {table_name}"
+        if not sql.startswith(prefix):
+            raise SuspiciousOperation(
+                "Cannot insert into partition '%s', unexpected query: %s"
+                % (self.query.partition_table_name, sql)
+            )
+
+        return sql.replace(
+            prefix, f"INSERT INTO {partition_table_name} AS {table_name}", 1
+        )
+
     def _rewrite_insert_on_conflict(
         self, sql, params, conflict_action: ConflictAction, returning
     ):
         """Rewrites a normal SQL INSERT query to add the 'ON CONFLICT'
         clause."""
 
+        suffix_sql, suffix_params = on_conflict_clause_cache.get_or_set(
+            self._get_on_conflict_cache_key(conflict_action, returning),
+            lambda: self._build_on_conflict_suffix(conflict_action, returning),
+        )
+
+        return f"{sql} {suffix_sql}", tuple(params) + suffix_params
+
+    def _build_on_conflict_suffix(
+        self, conflict_action: ConflictAction, returning
+    ) -> Tuple[str, tuple]:
+        """Builds everything that goes after the INSERT statement, the
+        'ON CONFLICT' clause and the 'RETURNING' clause."""
+
         # build the conflict target, the columns to watch
         # for conflicts
         on_conflict_clause = self._build_on_conflict_clause()
         index_predicate = self.query.index_predicate  # type: ignore[attr-defined]
         update_condition = self.query.conflict_update_condition  # type: ignore[attr-defined]
 
-        rewritten_sql = f"{sql} {on_conflict_clause}"
+        rewritten_sql = on_conflict_clause
+        params: tuple = tuple()
 
         if index_predicate:
             expr_sql, expr_params = self._compile_expression(index_predicate)
@@ -245,18 +450,130 @@ class PostgresInsertOnConflictCompiler(django_compiler.SQLInsertCompiler):  # ty
             rewritten_sql += f" SET {set_sql}"
             params += sql_params
 
+            conditions = []
+            if self.query.skip_unchanged:
+                conditions.append(self._build_unchanged_guard())
+
             if update_condition:
                 expr_sql, expr_params = self._compile_expression(
                     update_condition
                 )
-                rewritten_sql += f" WHERE {expr_sql}"
-                params += tuple(expr_params)
+                conditions.append((expr_sql, tuple(expr_params)))
+
+            if conditions:
+                rewritten_sql += " WHERE " + " AND ".join(
+                    f"({expr_sql})" for expr_sql, _ in conditions
+                )
+                for _, expr_params in conditions:
+                    params += expr_params
 
-        rewritten_sql += f" RETURNING {returning}"
+        if returning:
+            rewritten_sql += f" RETURNING {returning}"
 
         return (rewritten_sql, params)
 
-    def _build_set_statement(self) -> Tuple[str, tuple]:
+    def _get_on_conflict_cache_key(
+        self, conflict_action: ConflictAction, returning
+    ) -> Optional[Hashable]:
+        """Gets the key under which the 'ON CONFLICT' clause built by
+        :see:_build_on_conflict_suffix is cached.
+
+        The clause only depends on the shape of the query
+        and not on the rows being inserted. Returns None
+        if the query cannot be cached, for example because
+        one of the update values cannot be hashed.
+        """
+
+        conflict_target_key = get_conflict_target_cache_key(
+            self.query.conflict_target
+        )
+        if conflict_target_key is None:
+            return None
+
+        return make_cache_key(
+            self.connection.alias,
+            self.query.model,
+            [field.attname for field in self.query.fields],
+            conflict_target_key,
+            conflict_action,
+            returning,
+            self.query.index_predicate,
+            self.query.conflict_update_condition,
+            self.query.update_values,
+            self.query.skip_unchanged,
+            self.query.skip_unchanged_fields,
+        )
+
+    def _build_returning(self, return_id: bool) -> Optional[str]:
+        """Builds what goes after `RETURNING`, or None if nothing should be
+        returned.
+
+        The fields (and hstore keys) in
+        :see:PostgresInsertQuery.return_key_fields are returned
+        after the normal columns so that returned rows can be
+        matched to the rows that were inserted.
+
+        When the outcome of every row was requested, `xmax`
+        is returned as the last column. It is zero for rows
+        that were just inserted and set for updated rows.
+        """
+
+        returning = self._build_returning_columns(return_id)
+        if returning is None and not self.query.return_outcome:
+            return None
+
+        columns = [returning] if returning else []
+        for index, (field, hstore_key) in enumerate(
+            self.query.return_key_fields
+        ):
+            column = self.qn(field.column)
+            if hstore_key is not None:
+                column = "(%s->'%s')" % (column, hstore_key.replace("'", "''"))
+
+            columns.append(
+                f"{column} AS {self.qn(KEY_COLUMN_PREFIX + str(index))}"
+            )
+
+        if self.query.return_outcome:
+            columns.append(f"(xmax = 0) AS {self.qn(OUTCOME_COLUMN)}")
+
+        return ", ".join(columns)
+
+    def _build_returning_columns(self, return_id: bool) -> Optional[str]:
+        """Builds the columns to return, or None if no columns should be
+        returned."""
+
+        returning = self.query.returning
+        if returning is NOT_PROVIDED:
+            return (
+                self.qn(self.query.model._meta.pk.attname) if return_id else "*"
+            )
+
+        if not returning:
+            return None
+
+        if returning == "*":
+            return "*"
+
+        if isinstance(returning, str):
+            returning = [returning]
+
+        columns = []
+        for field_name in returning:
+            field = self._get_model_field(field_name)
+            if not field:
+                raise SuspiciousOperation(
+                    "%s is not a valid field to return, specify a list of field or column names or '*'."
+                    % str(field_name)
+                )
+
+            columns.append(self.qn(field.column))
+
+        return ", ".join(columns)
+
+    def _build_set_statement(
+        self, update_values: Optional[Dict[str, Any]] = None
+    ) -> Tuple[str, tuple]:
         """Builds the SET statement for the ON CONFLICT DO UPDATE clause.
 
         This uses the update compiler to provide full compatibility with
@@ -268,12 +585,101 @@ class PostgresInsertOnConflictCompiler(django_compiler.SQLInsertCompiler):  # ty
         from .sql import PostgresUpdateQuery
 
         query = cast(PostgresUpdateQuery, self.query.chain(PostgresUpdateQuery))
-        query.add_update_values(self.query.update_values)
+        query.add_update_values(
+            self.query.update_values if update_values is None else update_values
+        )
 
         sql, params = query.get_compiler(self.connection.alias).as_sql()
         return sql.split("SET")[1].split(" WHERE")[0], tuple(params)
 
+    def _build_unchanged_guard(self) -> Tuple[str, tuple]:
+        """Builds the condition that skips updating rows that would not
+        change.
+
+        Compares the current values of the updated columns
+        against the values they would be updated with:
+
+            (t.a, t.b) IS DISTINCT FROM (EXCLUDED.a, EXCLUDED.b)
+
+        `IS DISTINCT FROM` treats NULL as a comparable value,
+        so that changing a column from or to NULL still counts
+        as a change.
+
+        Only the columns in
+        :see:PostgresInsertQuery.skip_unchanged_fields are
+        compared when set. The other columns are still updated
+        when one of the compared columns changes.
+        """
+
+        # Local import to work around the circular dependency between
+        # the compiler and the queries.
+        from .sql import PostgresUpdateQuery
+
+        compared_fields = self.query.skip_unchanged_fields
+        update_values = {
+            name: value
+            for name, value in self.query.update_values.items()
+            if compared_fields is None or name in compared_fields
+        }
+
+        # nothing that was specified can change
+        if not update_values:
+            return "false", tuple()
+
+        query = cast(PostgresUpdateQuery, self.query.chain(PostgresUpdateQuery))
+        query.add_update_values(update_values)
+        compiler = query.get_compiler(self.connection.alias)
+
+        table_name = self.qn(self.query.get_meta().db_table)
+
+        columns = []
+        values = []
+        params: List[Any] = []
+
+        for field, _, value in query.values:
+            if hasattr(value, "resolve_expression"):
+                value = value.resolve_expression(
+                    query, allow_joins=False, for_save=True
+                )
+                value_sql, value_params = compiler.compile(value)
+            else:
+                value = field.get_db_prep_save(
+                    value, connection=self.connection
+                )
+                value_sql, value_params = (
+                    field.get_placeholder(value, compiler, self.connection)
+                    if hasattr(field, "get_placeholder")
+                    else "%s"
+                ), [value]
+
+            columns.append(f"{table_name}.{self.qn(field.column)}")
+            values.append(value_sql)
+            params.extend(value_params)
+
+        return (
+            f"({', '.join(columns)}) IS DISTINCT FROM ({', '.join(values)})",
+            tuple(params),
+        )
+
     def _build_on_conflict_clause(self):
+        """Builds the 'ON CONFLICT' clause up to the conflict action.
+
+        The clause only depends on the model and the conflict
+        target and is resolved once per model.
+        """
+
+        into_partition = bool(self.query.partition_table_name)
+
+        return conflict_target_clause_cache.get_or_set(
+            self.query.model,
+            (
+                get_conflict_target_cache_key(self.query.conflict_target),
+                into_partition,
+            ),
+            lambda: self._resolve_on_conflict_clause(into_partition),
+        )
+
+    def _resolve_on_conflict_clause(self, into_partition: bool) -> str:
         if django.VERSION >= (2, 2):
             from django.db.models.constraints import BaseConstraint
             from django.db.models.indexes import Index
@@ -281,6 +687,16 @@ class PostgresInsertOnConflictCompiler(django_compiler.SQLInsertCompiler):  # ty
             if isinstance(
                 self.query.conflict_target, BaseConstraint
             ) or isinstance(self.query.conflict_target, Index):
+                if into_partition:
+                    # partitions have their own copy of the constraint
+                    # under another name, infer it from the columns
+                    return "ON CONFLICT (%s)" % ", ".join(
+                        self.qn(field.column)
+                        for field, _ in get_conflict_target_fields(
+                            self.query.model, self.query.conflict_target
+                        )
+                    )
+
                 return "ON CONFLICT ON CONSTRAINT %s" % self.qn(
                     self.query.conflict_target.name
                 )
@@ -352,9 +768,12 @@ class PostgresInsertOnConflictCompiler(django_compiler.SQLInsertCompiler):  # ty
         if not matching_index:
             return None
 
-        with self.connection.schema_editor() as schema_editor:
-            stmt = matching_index.create_sql(self.query.model, schema_editor)
-            return "(%s)" % stmt.parts["columns"]
+        # only used to render the index, never entered so that no
+        # transaction is started and nothing is executed, this is
+        # resolved once per model, see :see:_build_on_conflict_clause
+        schema_editor = self.connection.schema_editor(collect_sql=True)
+        stmt = matching_index.create_sql(self.query.model, schema_editor)
+        return "(%s)" % stmt.parts["columns"]
 
     def _get_model_field(self, name: str):
         """Gets the field on a model with the specified name.
@@ -489,3 +908,348 @@ class PostgresInsertOnConflictCompiler(django_compiler.SQLInsertCompiler):  # ty
             field_name, _ = field_name
 
         return field_name
+
+
+class PostgresGetOrCreateCompiler(PostgresInsertOnConflictCompiler):
+    """Compiler for inserting rows and getting the rows that already existed
+    in a single statement.
+
+    Builds:
+
+        WITH "psqlextra_created" AS (
+            INSERT INTO ... ON CONFLICT ... DO NOTHING RETURNING ...
+        )
+        SELECT ..., true FROM "psqlextra_created"
+        UNION ALL
+        SELECT ..., false FROM ... WHERE (conflict target) IN (...)
+
+    The last column tells created rows apart from rows
+    that already existed.
+    """
+
+    query: "PostgresGetOrCreateQuery"  # type: ignore[assignment]
+
+    def as_sql(self, *args, **kwargs):
+        """Builds the SQL statement."""
+
+        meta = self.query.get_meta()
+        fields = meta.concrete_fields
+
+        # the rows the CTE returns and the existing rows have to
+        # have the same columns, `RETURNING *` would be in the
+        # order of the table, which might differ from the model
+        self.query.returning = [field.attname for field in fields]
+
+        ((insert_sql, params),) = super().as_sql(
+            *args, **{**kwargs, "return_id": False}
+        )
+
+        table_name = self.qn(meta.db_table)
+        created_name = self.qn(GET_OR_CREATE_CREATED_ALIAS)
+        columns = ", ".join(self.qn(field.column) for field in fields)
+
+        condition_sql, condition_params = self._build_existing_condition()
+
+        sql = (
+            f"WITH {created_name} AS ({insert_sql}) "
+            f"SELECT {columns}, true AS {self.qn(OUTCOME_COLUMN)} FROM {created_name} "
+            f"UNION ALL "
+            f"SELECT {columns}, false FROM {table_name} WHERE {condition_sql}"
+        )
+
+        return [(sql, tuple(params) + tuple(condition_params))]
+
+    def _build_existing_condition(self) -> Tuple[str, tuple]:
+        """Builds the condition that finds the existing rows that the rows
+        being inserted conflict with."""
+
+        target_fields = get_conflict_target_fields(
+            self.query.model, self.query.conflict_target
+        )
+        if not target_fields or any(
+            hstore_key is not None for _, hstore_key in target_fields
+        ):
+            raise SuspiciousOperation(
+                (
+                    "Cannot find existing rows for conflict target %s, it "
+                    "does not consist of fields."
+                )
+                % str(self.query.conflict_target)
+            )
+
+        keys = [
+            [self.pre_save_val(field, obj) for field, _ in target_fields]
+            for obj in self.query.objs
+        ]
+
+        # Local import to work around the circular dependency between
+        # the compiler and the queries.
+        from .sql import PostgresQuery
+
+        query = PostgresQuery(self.query.model)
+        condition = KeysIn(
+            [field.attname for field, _ in target_fields], keys
+        ).resolve_expression(query)
+
+        sql, params = condition.as_sql(
+            query.get_compiler(connection=self.connection), self.connection
+        )
+
+        # rows outside of a partial index never conflict
+        if self.query.index_predicate:
+            predicate_sql, predicate_params = self._compile_expression(
+                self.query.index_predicate
+            )
+            sql = f"{sql} AND ({predicate_sql})"
+            params = tuple(params) + tuple(predicate_params)
+
+        return sql, tuple(params)
+
+
+class PostgresMergeCompiler(PostgresInsertOnConflictCompiler):
+    """Compiler for SQL MERGE statements.
+
+    Builds a `MERGE INTO ... USING (VALUES ...)` statement
+    that matches the rows being merged against the existing
+    rows on the specified columns.
+    """
+
+    query: "PostgresMergeQuery"  # type: ignore[assignment]
+
+    def as_sql(self, *args, **kwargs):
+        """Builds the SQL MERGE statement."""
+
+        table_name = self.qn(self.query.get_meta().db_table)
+
+        source_sql, params = self._build_merge_source()
+        match_sql = self._build_match_condition()
+
+        sql = f"MERGE INTO {table_name} USING {source_sql} ON {match_sql}"
+
+        for when_clause in self.query.when_clauses:
+            when_sql, when_params = self._build_when_clause(when_clause)
+            sql += f" {when_sql}"
+            params += when_params
+
+        return [(append_caller_to_sql(sql), tuple(params))]
+
+    def _build_merge_source(self) -> Tuple[str, list]:
+        """Builds the `(VALUES ...) AS source (...)` list of rows being
+        merged.
+
+        Every value is cast to the type of its column, there
+        is nothing else to derive the types from. With
+        :see:InsertEngine.UNNEST, the values of every column
+        are passed as a single array instead.
+        """
+
+        columns = ", ".join(
+            self.qn(field.column) for field in self.query.fields
+        )
+
+        if self.query.engine == InsertEngine.UNNEST:
+            arrays_sql, array_params = self._build_value_arrays()
+
+            return (
+                "(SELECT * FROM unnest(%s)) AS %s (%s)"
+                % (arrays_sql, self.qn(MERGE_SOURCE_ALIAS), columns)
+            ), list(array_params)
+
+        placeholders = ", ".join(
+            f"%s::{self._get_array_element_type(field)}"
+            for field in self.query.fields
+        )
+
+        values_sql = []
+        params: list = []
+        for value_row in self.prepare_value_rows():
+            values_sql.append(f"({placeholders})")
+            params.extend(value_row)
+
+        return (
+            "(VALUES %s) AS %s (%s)"
+            % (", ".join(values_sql), self.qn(MERGE_SOURCE_ALIAS), columns)
+        ), params
+
+    def _build_match_condition(self) -> str:
+        """Builds the condition that matches the rows being merged against
+        the existing rows."""
+
+        table_name = self.qn(self.query.get_meta().db_table)
+        source_name = self.qn(MERGE_SOURCE_ALIAS)
+
+        return " AND ".join(
+            f"{table_name}.{self.qn(field.column)} = {source_name}.{self.qn(field.column)}"
+            for field in self._get_match_fields()
+        )
+
+    def _get_match_fields(self) -> List[Any]:
+        """Gets the fields to match the rows being merged against the existing
+        rows on."""
+
+        if not self.query.match_on:
+            raise SuspiciousOperation(
+                "Specify at least one field to match rows on."
+            )
+
+        fields = []
+        for field_name in self.query.match_on:
+            field = self._get_model_field(field_name)
+            if not field or field not in self.query.fields:
+                raise SuspiciousOperation(
+                    (
+                        "%s is not a valid field to match rows on, specify "
+                        "the names of fields that are specified in the rows."
+                    )
+                    % str(field_name)
+                )
+
+            fields.append(field)
+
+        return fields
+
+    def _build_when_clause(self, when_clause: "MergeWhen") -> Tuple[str, list]:
+        """Builds a single `WHEN ... THEN ...` clause."""
+
+        sql = f"WHEN {when_clause.keyword}"
+        params: list = []
+
+        if when_clause.condition is not None:
+            condition_sql, condition_params = self._compile_expression(
+                when_clause.condition
+            )
+            sql += f" AND {condition_sql}"
+            params.extend(condition_params)
+
+        if when_clause.action == MergeAction.INSERT:
+            columns = [self.qn(field.column) for field in self.query.fields]
+            source_columns = [
+                f"{self.qn(MERGE_SOURCE_ALIAS)}.{column}" for column in columns
+            ]
+            sql += " THEN INSERT (%s) VALUES (%s)" % (
+                ", ".join(columns),
+                ", ".join(source_columns),
+            )
+
+        elif when_clause.action == MergeAction.UPDATE:
+            set_sql, set_params = self._build_set_statement(
+                when_clause.update_values
+                if when_clause.update_values is not None
+                else self._get_default_update_values()
+            )
+            sql += f" THEN UPDATE SET {set_sql}"
+            params.extend(set_params)
+
+        elif when_clause.action == MergeAction.DELETE:
+            sql += " THEN DELETE"
+
+        else:
+            sql += " THEN DO NOTHING"
+
+        return sql, params
+
+    def _get_default_update_values(self) -> Dict[str, Any]:
+        """Gets the values to update with when none were specified: the same
+        values an upsert would update with, taken from the rows being merged
+        instead of the EXCLUDED row."""
+
+        return {
+            name: MergeSourceCol(value.name)
+            if isinstance(value, ExcludedCol)
+            else value
+            for name, value in self.query.update_values.items()
+        }
+
+
+class PostgresUpdateFromValuesCompiler(PostgresMergeCompiler):
+    """Compiler for `UPDATE ... FROM (VALUES ...)` statements.
+
+    Matches the rows against the existing rows the same
+    way :see:PostgresMergeCompiler does, but only updates
+    the rows that match.
+    """
+
+    query: "PostgresUpdateFromValuesQuery"  # type: ignore[assignment]
+
+    def as_sql(self, *args, **kwargs):
+        """Builds the SQL UPDATE statement."""
+
+        table_name = self.qn(self.query.get_meta().db_table)
+
+        set_sql, params = self._build_set_statement(
+            {
+                field.name: MergeSourceCol(field)
+                for field in self._get_update_fields()
+            }
+        )
+
+        source_sql, source_params = self._build_merge_source()
+        match_sql = self._build_match_condition()
+
+        sql = f"UPDATE {table_name} SET {set_sql.strip()} FROM {source_sql} WHERE {match_sql}"
+
+        returning = self._build_update_returning()
+        if returning:
+            sql += f" RETURNING {returning}"
+
+        return [(append_caller_to_sql(sql), params + tuple(source_params))]
+
+    def _get_update_fields(self) -> List[Any]:
+        """Gets the fields to update with the values in the rows."""
+
+        match_fields = self._get_match_fields()
+
+        fields = []
+        for field_name in self.query.update_fields:
+            field = self._get_model_field(field_name)
+            if not field or field not in self.query.fields:
+                raise SuspiciousOperation(
+                    (
+                        "%s is not a valid field to update, specify the "
+                        "names of fields that are specified in the rows."
+                    )
+                    % str(field_name)
+                )
+
+            if field not in match_fields:
+                fields.append(field)
+
+        if not fields:
+            raise SuspiciousOperation(
+                "Specify at least one field to update that is not "
+                "used to match rows on."
+            )
+
+        return fields
+
+    def _build_update_returning(self) -> Optional[str]:
+        """Builds the columns of the updated rows to return, or None if no
+        columns should be returned.
+
+        Columns are qualified with the table name, the rows
+        being merged have columns with the same names.
+        """
+
+        returning = self.query.returning
+        if not returning or returning is NOT_PROVIDED:
+            return None
+
+        table_name = self.qn(self.query.get_meta().db_table)
+        if returning == "*":
+            return f"{table_name}.*"
+
+        if isinstance(returning, str):
+            returning = [returning]
+
+        columns = []
+        for field_name in returning:
+            field = self._get_model_field(field_name)
+            if not field:
+                raise SuspiciousOperation(
+                    "%s is not a valid field to return, specify a list of field or column names or '*'."
+                    % str(field_name)
+                )
+
+            columns.append(f"{table_name}.{self.qn(field.column)}")
+
+        return ", ".join(columns)
@@ -0,0 +1,388 @@
+import datetime
+
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
+
+import django
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousOperation, ValidationError
+from django.db import models
+from django.utils import timezone
+
+from .statement_cache import conflict_target_fields_cache, make_cache_key
+from .types import DedupePolicy
+
+ConflictKeyGetter = Callable[[Dict[str, Any]], Optional[Hashable]]
+DedupeMergeFunc = Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]
+
+
+def get_conflict_target_fields(
+    model: Type[models.Model], conflict_target: Any
+) -> Optional[List[Tuple[models.Field, Optional[str]]]]:
+    """Resolves the specified conflict target into the fields (and optionally
+    hstore keys) it consists of.
+
+    Arguments:
+        model:
+            The model the conflict target is for.
+
+        conflict_target:
+            A list of field names and/or tuples of field
+            names and hstore keys, or a :see:Index or
+            :see:BaseConstraint with fields.
+
+    Returns:
+        A list of tuples of the field and hstore key (or None) or
+        None if the conflict target cannot be resolved into
+        fields, for example because it consists of expressions.
+    """
+
+    fields = conflict_target_fields_cache.get_or_set(
+        model,
+        get_conflict_target_cache_key(conflict_target),
+        lambda: _resolve_conflict_target_fields(model, conflict_target),
+    )
+
+    return list(fields) if fields is not None else None
+
+
+def get_conflict_target_cache_key(conflict_target: Any) -> Optional[Hashable]:
+    """Gets a key to cache things that only depend on the specified conflict
+    target under, or None if it cannot be used as a key."""
+
+    if django.VERSION >= (2, 2):
+        from django.db.models.constraints import BaseConstraint
+        from django.db.models.indexes import Index
+
+        # only the name and fields matter, the objects
+        # themselves do not compare by value
+        if isinstance(conflict_target, (BaseConstraint, Index)):
+            return make_cache_key(
+                type(conflict_target),
+                conflict_target.name,
+                list(getattr(conflict_target, "fields", None) or []),
+            )
+
+    return make_cache_key(conflict_target)
+
+
+def _resolve_conflict_target_fields(
+    model: Type[models.Model], conflict_target: Any
+) -> Optional[List[Tuple[models.Field, Optional[str]]]]:
+    names = getattr(conflict_target, "fields", conflict_target)
+    if not names or isinstance(names, str):
+        return None
+
+    fields = []
+    for name in names:
+        hstore_key = None
+        if isinstance(name, tuple):
+            name, hstore_key = name
+
+        field = _get_model_field(model, name.lstrip("-"))
+        if not field:
+            return None
+
+        fields.append((field, hstore_key))
+
+    return fields
+
+
+def build_conflict_key_getter(
+    model: Type[models.Model], conflict_target: Any
+) -> ConflictKeyGetter:
+    """Builds a function that gets the values of the conflict target columns
+    from a row as a hashable key.
+
+    Rows that have the same key would conflict with each other. The
+    key is None for rows that cannot conflict with any other row
+    because one of the values is NULL. The values are normalized
+    the same way as by :see:normalize_conflict_key, so that `"1"`
+    and `1` are the same key for an integer field.
+
+    If the conflict target cannot be resolved into fields, the
+    entire row is used as the key.
+    """
+
+    target_fields = get_conflict_target_fields(model, conflict_target)
+    if not target_fields:
+        return _freeze
+
+    lookups = [
+        (
+            (field.name, field.attname, field.column)
+            + (("pk",) if field.primary_key else tuple()),
+            hstore_key,
+        )
+        for field, hstore_key in target_fields
+    ]
+
+    def _get_conflict_key(row: Dict[str, Any]) -> Optional[Hashable]:
+        key = []
+        for (field, _), (names, hstore_key) in zip(target_fields, lookups):
+            value = next((row[name] for name in names if name in row), None)
+
+            if isinstance(value, models.Model):
+                value = value.pk
+
+            if hstore_key is not None:
+                value = value.get(hstore_key) if value else None
+
+            # NULL never conflicts with anything
+            if value is None:
+                return None
+
+            key.append(_normalize_key_value(field, hstore_key, value))
+
+        return tuple(key)
+
+    return _get_conflict_key
+
+
+def normalize_conflict_key(
+    target_fields: List[Tuple[models.Field, Optional[str]]],
+    key: Optional[Sequence[Any]],
+) -> Optional[Tuple]:
+    """Normalizes a conflict key so that the key of a row that was specified
+    compares equal to the key of the same row read back from the database.
+
+    Arguments:
+        target_fields:
+            The fields of the conflict target, see
+            :see:get_conflict_target_fields.
+
+        key:
+            The values of the conflict target, in the
+            same order as the fields.
+
+    Returns:
+        The normalized key or None if one of the values is
+        NULL, those never conflict with anything.
+    """
+
+    if key is None or any(value is None for value in key):
+        return None
+
+    return tuple(
+        _normalize_key_value(field, hstore_key, value)
+        for (field, hstore_key), value in zip(target_fields, key)
+    )
+
+
+def _normalize_key_value(
+    field: models.Field, hstore_key: Optional[str], value: Any
+) -> Hashable:
+    # hstore values are always stored as text
+    if hstore_key is not None:
+        return str(value)
+
+    # values that cannot be converted, such as lookups of
+    # related rows, are kept as they are and never match
+    try:
+        value = field.to_python(value)
+    except (ValidationError, TypeError, ValueError):
+        return _freeze(value)
+
+    # naive date/times are stored in the default time zone
+    if (
+        isinstance(value, datetime.datetime)
+        and settings.USE_TZ
+        and timezone.is_naive(value)
+    ):
+        value = timezone.make_aware(value, timezone.get_default_timezone())
+
+    return _freeze(value)
+
+
+def dedupe_rows(
+    rows: Iterable[Dict[str, Any]],
+    key_getter: ConflictKeyGetter,
+    policy: Union[DedupePolicy, DedupeMergeFunc],
+) -> List[Dict[str, Any]]:
+    """De-duplicates rows that have the same conflict key.
+
+    Runs in linear time. The de-duplicated row takes the position of the
+    first row with the same key.
+
+    Arguments:
+        rows:
+            The rows to de-duplicate.
+
+        key_getter:
+            Function that gets the conflict key of a row. See
+            :see:build_conflict_key_getter.
+
+        policy:
+            What to do when rows have the same key. Either a
+            :see:DedupePolicy or a function that takes the
+            row seen so far and the new row and returns the row
+            to keep.
+    """
+
+    merge = get_merge_func(policy)
+
+    deduped_rows: Dict[Hashable, Dict[str, Any]] = {}
+    for index, row in enumerate(rows):
+        key = key_getter(row)
+        if key is None:
+            deduped_rows[(_UniqueKey, index)] = row
+            continue
+
+        existing_row = deduped_rows.get(key)
+        deduped_rows[key] = (
+            row if existing_row is None else merge(existing_row, row)
+        )
+
+    return list(deduped_rows.values())
+
+
+def sort_rows(
+    rows: Iterable[Dict[str, Any]], key_getter: ConflictKeyGetter
+) -> Tuple[List[Dict[str, Any]], int]:
+    """Sorts rows by their conflict key.
+
+    The sort is stable, rows with the same key keep their
+    order. Rows that cannot conflict with any other row
+    because their key is None go last.
+
+    Arguments:
+        rows:
+            The rows to sort.
+
+        key_getter:
+            Function that gets the conflict key of a row. See
+            :see:build_conflict_key_getter.
+
+    Returns:
+        The sorted rows and the amount of rows that
+        ended up in a different position.
+    """
+
+    keyed_rows = [(key_getter(row), row) for row in rows]
+    order = list(range(len(keyed_rows)))
+
+    try:
+        order.sort(
+            key=lambda index: (
+                keyed_rows[index][0] is None,
+                keyed_rows[index][0] or tuple(),
+            )
+        )
+    except TypeError as e:
+        raise SuspiciousOperation(
+            "Cannot sort rows by conflict target, the values cannot be compared: %s"
+            % str(e)
+        )
+
+    reordered = sum(
+        1 for position, index in enumerate(order) if position != index
+    )
+
+    return [keyed_rows[index][1] for index in order], reordered
+
+
+def get_merge_func(
+    policy: Union[DedupePolicy, DedupeMergeFunc, str]
+) -> DedupeMergeFunc:
+    """Gets the function that merges a row seen so far with a new row that
+    has the same conflict key, according to the specified policy."""
+
+    if callable(policy):
+        return policy
+
+    policy = DedupePolicy(policy)
+
+    if policy == DedupePolicy.KEEP_FIRST:
+        return lambda existing_row, row: existing_row
+
+    if policy == DedupePolicy.KEEP_LAST:
+        return lambda existing_row, row: row
+
+    return lambda existing_row, row: {
+        **existing_row,
+        **{name: value for name, value in row.items() if value is not None},
+    }
+
+
+def build_aggregate_merge_func(
+    sum_fields: Iterable[str], max_fields: Iterable[str]
+) -> DedupeMergeFunc:
+    """Builds a function that merges rows with the same conflict key by
+    adding up the values of `sum_fields` and taking the largest value of
+    `max_fields`.
+
+    NULL values are ignored, like SQL's SUM and MAX do.
+    Other values are taken from the newest row.
+    """
+
+    sum_fields = list(sum_fields)
+    max_fields = list(max_fields)
+
+    def _aggregate(values: List[Any], func: Callable[[List[Any]], Any]) -> Any:
+        values = [value for value in values if value is not None]
+        return func(values) if values else None
+
+    def _merge(
+        existing_row: Dict[str, Any], row: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        merged_row = {**existing_row, **row}
+
+        for name in sum_fields:
+            merged_row[name] = _aggregate(
+                [existing_row.get(name), row.get(name)], sum
+            )
+
+        for name in max_fields:
+            merged_row[name] = _aggregate(
+                [existing_row.get(name), row.get(name)], max
+            )
+
+        return merged_row
+
+    return _merge
+
+
+def _freeze(value: Any) -> Hashable:
+    """Turns the specified value into something that can be hashed."""
+
+    if isinstance(value, dict):
+        return tuple(
+            sorted(
+                ((key, _freeze(item)) for key, item in value.items()),
+                key=repr,
+            )
+        )
+
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(item) for item in value)
+
+    return value
+
+
+def _get_model_field(
+    model: Type[models.Model], name: str
+) -> Optional[models.Field]:
+    if name == "pk":
+        return model._meta.pk
+
+    for field in model._meta.local_concrete_fields:  # type: ignore[attr-defined]
+        if name in (field.name, field.attname, field.column):
+            return field
+
+    return None
+
+
+class _UniqueKey:
+    """Marks keys of rows that cannot conflict with any other row."""
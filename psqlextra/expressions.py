@@ -1,6 +1,13 @@
-from typing import Union
+from typing import Any, Iterable, List, Sequence, Union
 
-from django.db.models import CharField, Field, expressions
+from django.core.exceptions import EmptyResultSet, SuspiciousOperation
+from django.db.models import BooleanField, CharField, Field, Model, expressions
+
+# alias of the rows being merged in MERGE statements
+MERGE_SOURCE_ALIAS = "psqlextra_source"
+
+# alias of the rows that were created by a bulk get or create
+GET_OR_CREATE_CREATED_ALIAS = "psqlextra_created"
 
 
 class HStoreValue(expressions.Expression):
@@ -233,3 +240,141 @@ class ExcludedCol(expressions.Expression):
     def as_sql(self, compiler, connection):
         quoted_name = connection.ops.quote_name(self.name)
         return f"EXCLUDED.{quoted_name}", tuple()
+
+
+class MergeSourceCol(expressions.Expression):
+    """References a column in the rows being merged in a MERGE statement,
+    the MERGE equivalent of :see:ExcludedCol.
+
+    See: https://www.postgresql.org/docs/current/sql-merge.html
+    """
+
+    def __init__(self, field_or_name: Union[Field, str]):
+        if isinstance(field_or_name, Field):
+            super().__init__(field_or_name)
+            self.name = field_or_name.column
+        else:
+            super().__init__(None)
+            self.name = field_or_name
+
+    def as_sql(self, compiler, connection):
+        quoted_alias = connection.ops.quote_name(MERGE_SOURCE_ALIAS)
+        quoted_name = connection.ops.quote_name(self.name)
+        return f"{quoted_alias}.{quoted_name}", tuple()
+
+
+class KeysIn(expressions.Expression):
+    """Matches rows of which the values of the specified fields are one of
+    the specified keys.
+
+    Compiles into `(a, b) IN (SELECT * FROM unnest(...))`,
+    passing a single array per field. Unlike OR-ing a `Q` object
+    per key together, the SQL is the same no matter how many keys
+    there are and PostgreSQL can use an index on the fields.
+
+        MyModel.objects.filter(
+            KeysIn(["tenant_id", "external_id"], [(1, "a"), (2, "b")])
+        )
+
+    NULL never matches anything.
+    """
+
+    conditional = True
+    output_field = BooleanField()
+
+    def __init__(
+        self, fields: List[str], keys: Iterable[Union[Sequence[Any], Any]]
+    ) -> None:
+        """Initializes a new instance of :see:KeysIn.
+
+        Arguments:
+            fields:
+                Names of the fields the keys consist of.
+
+            keys:
+                The keys to match, a tuple of values in the
+                same order as `fields`. When there is only a
+                single field, the keys can be plain values.
+        """
+
+        super().__init__()
+
+        if not fields:
+            raise SuspiciousOperation(
+                "Specify at least one field the keys consist of."
+            )
+
+        self.fields = list(fields)
+        self.keys = [
+            tuple(key) if isinstance(key, (list, tuple)) else (key,)
+            for key in keys
+        ]
+
+        for key in self.keys:
+            if len(key) != len(self.fields):
+                raise SuspiciousOperation(
+                    "Key %s does not have a value for each of the fields: %s"
+                    % (str(key), ", ".join(self.fields))
+                )
+
+        self.columns: List[Any] = []
+
+    def resolve_expression(self, *args, **kwargs):
+        clone = self.copy()
+        clone.columns = [
+            expressions.F(name).resolve_expression(*args, **kwargs)
+            for name in self.fields
+        ]
+
+        return clone
+
+    def as_sql(self, compiler, connection):
+        if not self.keys:
+            raise EmptyResultSet
+
+        lhs_sql = []
+        lhs_params: List[Any] = []
+        for column in self.columns:
+            column_sql, column_params = compiler.compile(column)
+            lhs_sql.append(column_sql)
+            lhs_params.extend(column_params)
+
+        arrays_sql = []
+        arrays_params = []
+        for column, values in zip(self.columns, zip(*self.keys)):
+            field = column.output_field
+
+            arrays_sql.append(
+                "%%s::%s[]" % get_array_element_type(field, connection)
+            )
+            arrays_params.append(
+                [
+                    field.get_db_prep_value(
+                        value.pk if isinstance(value, Model) else value,
+                        connection,
+                    )
+                    for value in values
+                ]
+            )
+
+        return (
+            "(%s) IN (SELECT * FROM unnest(%s))"
+            % (", ".join(lhs_sql), ", ".join(arrays_sql)),
+            tuple(lhs_params) + tuple(arrays_params),
+        )
+
+
+def get_array_element_type(field: Field, connection) -> str:
+    """Gets the type to cast an array of values of the specified field to,
+    for example when passing them to `unnest(...)`."""
+
+    # serial/identity columns are not real types that
+    # can be cast to, the type referencing them is
+    if field.get_internal_type() in (
+        "AutoField",
+        "BigAutoField",
+        "SmallAutoField",
+    ):
+        return field.rel_db_type(connection)
+
+    return field.cast_db_type(connection)
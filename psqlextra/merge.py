@@ -0,0 +1,112 @@
+from dataclasses import dataclass
+from typing import Any, ClassVar, Dict, Optional, Tuple, Union
+
+from django.core.exceptions import SuspiciousOperation
+from django.db.models import Expression, Q
+
+from .types import MergeAction
+
+
+@dataclass
+class MergeWhen:
+    """A WHEN clause of a MERGE statement.
+
+    Use one of :see:WhenMatched, :see:WhenNotMatched or
+    :see:WhenNotMatchedBySource. Clauses are evaluated in
+    order, the first clause whose condition is met wins.
+    """
+
+    # what comes after WHEN
+    keyword: ClassVar[str]
+
+    # the actions PostgreSQL allows for this clause
+    allowed_actions: ClassVar[Tuple[MergeAction, ...]]
+
+    action: Union[MergeAction, str]
+
+    # optional extra condition that has to be met, raw
+    # SQL or an expression/Q object, use :see:MergeSourceCol
+    # to refer to the values being merged
+    condition: Optional[Union[Expression, Q, str]] = None
+
+    # values/expressions to update with, all values in the
+    # rows are updated with the new values by default
+    update_values: Optional[Dict[str, Union[Any, Expression]]] = None
+
+    def __post_init__(self) -> None:
+        self.action = MergeAction(self.action)
+
+        if self.action not in self.allowed_actions:
+            raise SuspiciousOperation(
+                "%s is not a valid action for WHEN %s, use one of: %s"
+                % (
+                    self.action,
+                    self.keyword,
+                    ", ".join(str(action) for action in self.allowed_actions),
+                )
+            )
+
+        if self.update_values and self.action != MergeAction.UPDATE:
+            raise SuspiciousOperation(
+                "update_values can only be specified with %s"
+                % MergeAction.UPDATE
+            )
+
+
+@dataclass
+class WhenMatched(MergeWhen):
+    """WHEN MATCHED: a row in the table matches a row being merged."""
+
+    keyword: ClassVar[str] = "MATCHED"
+    allowed_actions: ClassVar[Tuple[MergeAction, ...]] = (
+        MergeAction.UPDATE,
+        MergeAction.DELETE,
+        MergeAction.NOTHING,
+    )
+
+    action: Union[MergeAction, str] = MergeAction.UPDATE
+
+
+@dataclass
+class WhenNotMatched(MergeWhen):
+    """WHEN NOT MATCHED: a row being merged does not match any row in the
+    table."""
+
+    keyword: ClassVar[str] = "NOT MATCHED"
+    allowed_actions: ClassVar[Tuple[MergeAction, ...]] = (
+        MergeAction.INSERT,
+        MergeAction.NOTHING,
+    )
+
+    action: Union[MergeAction, str] = MergeAction.INSERT
+
+
+@dataclass
+class WhenNotMatchedBySource(MergeWhen):
+    """WHEN NOT MATCHED BY SOURCE: a row in the table does not match any of
+    the rows being merged.
+
+    Requires PostgreSQL 17 or newer. Every row in the
+    table that is not being merged is affected, so this
+    cannot be used when merging in batches.
+    """
+
+    keyword: ClassVar[str] = "NOT MATCHED BY SOURCE"
+    allowed_actions: ClassVar[Tuple[MergeAction, ...]] = (
+        MergeAction.UPDATE,
+        MergeAction.DELETE,
+        MergeAction.NOTHING,
+    )
+
+    action: Union[MergeAction, str] = MergeAction.DELETE
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+
+        # there are no values to update with, the row that
+        # is updated does not match any of the merged rows
+        if self.action == MergeAction.UPDATE and not self.update_values:
+            raise SuspiciousOperation(
+                "update_values have to be specified to update rows "
+                "that are not matched by source."
+            )
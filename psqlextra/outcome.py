@@ -0,0 +1,176 @@
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from itertools import chain
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from .async_connection import FetchedCursor
+from .types import UpsertOutcome
+
+# name of the extra column that is returned to tell
+# inserted rows apart from updated rows
+OUTCOME_COLUMN = "psqlextra_inserted"
+
+# prefix of the names of the extra columns that are returned
+# to match returned rows to the rows that were inserted
+KEY_COLUMN_PREFIX = "psqlextra_key_"
+
+RowKeyGetter = Callable[[Dict[str, Any]], Optional[Hashable]]
+ReturnedKeyGetter = Callable[[Sequence[Any]], Optional[Hashable]]
+
+
+@dataclass
+class UpsertResult:
+    """Describes what happened to the rows in an insert/upsert that was done
+    with `return_outcome=True`."""
+
+    # what would have been returned without `return_outcome`,
+    # empty when nothing was returned (`returning=None`)
+    rows: List[Any] = field(default_factory=list)
+
+    # what happened to each row that was sent, in the same
+    # order as they were sent in (after de-duplication)
+    outcomes: List[UpsertOutcome] = field(default_factory=list)
+
+    # the amount of rows that were neither inserted nor
+    # updated, because of a conflict with DO NOTHING, because
+    # the update condition was not met or because the row
+    # was dropped as a duplicate before it was sent
+    skipped: int = 0
+
+    # the amount of rows that were sent in a different order
+    # than they were specified in, see `sort=True`
+    reordered: int = 0
+
+    @property
+    def inserted(self) -> int:
+        """The amount of rows that were inserted."""
+
+        return self.outcomes.count(UpsertOutcome.INSERTED)
+
+    @property
+    def updated(self) -> int:
+        """The amount of rows that were updated."""
+
+        return self.outcomes.count(UpsertOutcome.UPDATED)
+
+    def __add__(self, other: "UpsertResult") -> "UpsertResult":
+        return UpsertResult(
+            rows=self.rows + other.rows,
+            outcomes=self.outcomes + other.outcomes,
+            skipped=self.skipped + other.skipped,
+            reordered=self.reordered + other.reordered,
+        )
+
+
+def match_returned_rows(
+    cursor: Any,
+    rows: List[Dict[str, Any]],
+    *,
+    return_outcome: bool,
+    key_count: int = 0,
+    get_row_key: Optional[RowKeyGetter] = None,
+    get_returned_key: Optional[ReturnedKeyGetter] = None,
+) -> Tuple[FetchedCursor, List[Dict[str, Any]], List[UpsertOutcome]]:
+    """Fetches all rows from a cursor on which an insert was executed and
+    matches them to the rows that were inserted.
+
+    Rows that were skipped are not returned, so the returned
+    rows cannot be matched by position. When `key_count` is
+    set, the values of the conflict target are returned as
+    the :see:KEY_COLUMN_PREFIX columns after the normal ones
+    and rows are matched by those. Rows that cannot be matched
+    by key are matched in the order they were returned in.
+
+    Arguments:
+        cursor:
+            The cursor to fetch the returned rows from.
+
+        rows:
+            The rows that were inserted, in the order
+            they were sent in.
+
+        return_outcome:
+            Whether the :see:OUTCOME_COLUMN was returned
+            as the last column.
+
+        key_count:
+            The amount of key columns that were returned.
+
+        get_row_key:
+            Gets the key of one of the inserted rows.
+
+        get_returned_key:
+            Gets the key from the key columns of a
+            returned row.
+
+    Returns:
+        A cursor-like view of the returned rows without the extra
+        columns, the inserted rows they belong to in the same
+        order and the outcome of every inserted row. Outcomes
+        are only meaningful with `return_outcome`.
+    """
+
+    returned_rows = cursor.fetchall() if cursor.description else []
+    description = list(cursor.description or [])
+
+    width = len(description) - key_count - (1 if return_outcome else 0)
+
+    matches: List[Optional[int]] = [None] * len(rows)
+    unmatched = list(range(len(returned_rows)))
+
+    if key_count and get_row_key and get_returned_key:
+        returned_by_key: Dict[Hashable, Deque[int]] = defaultdict(deque)
+        for index, returned_row in enumerate(returned_rows):
+            key_values = returned_row[width:][:key_count]
+            returned_by_key[get_returned_key(key_values)].append(index)
+
+        # rows with NULL in the conflict target never conflict,
+        # they share the None key and are matched in order
+        for row_index, row in enumerate(rows):
+            candidates = returned_by_key.get(get_row_key(row))
+            if candidates:
+                matches[row_index] = candidates.popleft()
+
+        unmatched = sorted(chain.from_iterable(returned_by_key.values()))
+
+    unmatched_rows = (
+        row_index for row_index, match in enumerate(matches) if match is None
+    )
+
+    for row_index, returned_index in zip(unmatched_rows, unmatched):
+        matches[row_index] = returned_index
+
+    matched_rows = []
+    returned_values = []
+    outcomes = []
+
+    for row, returned_index in zip(rows, matches):
+        if returned_index is None:
+            outcomes.append(UpsertOutcome.SKIPPED)
+            continue
+
+        returned_row = returned_rows[returned_index]
+
+        matched_rows.append(row)
+        returned_values.append(returned_row[:width])
+        outcomes.append(
+            UpsertOutcome.INSERTED
+            if return_outcome and returned_row[-1]
+            else UpsertOutcome.UPDATED
+        )
+
+    fetched_cursor = FetchedCursor(
+        description[:width], returned_values, cursor.rowcount
+    )
+
+    return fetched_cursor, matched_rows, outcomes
@@ -0,0 +1,379 @@
+import re
+
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+
+import django
+
+from django.core.exceptions import SuspiciousOperation, ValidationError
+from django.db import connections, models
+
+from .async_connection import async_connection
+from .conflict_keys import build_conflict_key_getter, get_conflict_target_fields
+from .statement_cache import partition_router_cache
+from .types import PostgresPartitioningMethod
+
+# matches string literals, parentheses, commas and anything
+# else that is not white space, such as numbers and keywords
+_BOUND_TOKEN_REGEX = re.compile(r"'(?:[^']|'')*'|[(),]|[^\s(),']+")
+
+# how MINVALUE, regular values and MAXVALUE in a range bound
+# sort, values are wrapped as (rank, value) for comparison
+_MINVALUE_RANK = 0
+_VALUE_RANK = 1
+_MAXVALUE_RANK = 2
+
+_RoutingKey = Tuple[Tuple[int, Any], ...]
+
+# the table name and bound of every partition of a table, the table
+# is looked up on the search path like any other query, partitions are
+# inserted into by their unqualified name and have to be in the same
+# schema as the table
+_PARTITIONS_SQL = """
+    SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+    FROM pg_inherits
+    JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+    JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+    WHERE parent.oid = to_regclass(%s)
+    AND child.relnamespace = parent.relnamespace
+    ORDER BY child.oid
+"""
+
+# raised when a table, such as a dropped partition, does not exist
+_UNDEFINED_TABLE_SQLSTATE = "42P01"
+
+
+class PostgresPartitionRouter:
+    """Decides which partition rows of a partitioned model go into, the way
+    PostgreSQL would.
+
+    Only the partitions that existed when the router was
+    built are known. Rows that do not fit any of them,
+    rows that would go into the default partition and rows
+    that cannot be routed for any other reason are routed
+    to the partitioned table itself, which lets PostgreSQL
+    decide.
+    """
+
+    def __init__(
+        self,
+        model: Type[models.Model],
+        partitions: Iterable[Tuple[str, str]],
+    ) -> None:
+        """Initializes a new instance of :see:PostgresPartitionRouter.
+
+        Arguments:
+            model:
+                The partitioned model to route rows for.
+
+            partitions:
+                The table name and bound of each partition,
+                as described by `pg_get_expr(relpartbound, oid)`.
+        """
+
+        self.model = model
+
+        meta = model._partitioning_meta  # type: ignore[attr-defined]
+        self.method = meta.method
+        self.key_fields = [model._meta.get_field(name) for name in meta.key]
+
+        self._key_getter = build_conflict_key_getter(model, meta.key)
+
+        self._list_partitions: Dict[Any, str] = {}
+        range_partitions: List[Tuple[_RoutingKey, _RoutingKey, str]] = []
+
+        for table_name, bound in partitions:
+            try:
+                groups = self._parse_bound(bound)
+            except ValidationError:
+                # rows for partitions with bounds we do not
+                # understand end up in the partitioned table
+                continue
+
+            if groups is None:
+                continue
+
+            if self.method == PostgresPartitioningMethod.LIST:
+                for _, value in groups[0]:
+                    # NULL is never routed, see :see:_get_routing_key
+                    if value is not None:
+                        self._list_partitions[value] = table_name
+
+            elif self.method == PostgresPartitioningMethod.RANGE:
+                range_partitions.append(
+                    (tuple(groups[0]), tuple(groups[1]), table_name)
+                )
+
+        # partitions never overlap, sorted by their lower bound,
+        # the partition a row fits in can be found with a
+        # binary search
+        range_partitions.sort(key=lambda partition: partition[0])
+        self._range_lower_bounds = [
+            partition[0] for partition in range_partitions
+        ]
+        self._range_partitions = range_partitions
+
+    def route(
+        self, rows: Iterable[Dict[str, Any]]
+    ) -> Dict[Optional[str], List[Dict[str, Any]]]:
+        """Groups the specified rows by the partition they go into.
+
+        Returns:
+            The rows per table name of the partition. Rows
+            that should be inserted into the partitioned
+            table itself are grouped under None. Rows keep
+            their order within a group.
+        """
+
+        routed_rows: Dict[Optional[str], List[Dict[str, Any]]] = {}
+        for row in rows:
+            routed_rows.setdefault(self.get_table_name(row), []).append(row)
+
+        return routed_rows
+
+    def get_table_name(self, row: Dict[str, Any]) -> Optional[str]:
+        """Gets the name of the partition the specified row goes into, or None
+        if it should be inserted into the partitioned table itself."""
+
+        key = self._get_routing_key(row)
+        if key is None:
+            return None
+
+        if self.method == PostgresPartitioningMethod.LIST:
+            return self._list_partitions.get(key[0][1])
+
+        try:
+            index = bisect_right(self._range_lower_bounds, key) - 1
+            if index < 0:
+                return None
+
+            _, upper_bound, table_name = self._range_partitions[index]
+
+            # lower bounds are inclusive, upper bounds are not
+            return table_name if key < upper_bound else None
+        except TypeError:
+            # values that cannot be compared with the bounds, for
+            # example naive and aware date/times, let PostgreSQL
+            # figure it out
+            return None
+
+    def _get_routing_key(self, row: Dict[str, Any]) -> Optional[_RoutingKey]:
+        """Gets the values of the partition key of the specified row,
+        converted the same way as the values in the bounds, or None if the
+        row cannot be routed."""
+
+        # NULL (or no value at all) only fits the default partition
+        # or a LIST partition that explicitly allows NULL
+        values = self._key_getter(row)
+        if values is None:
+            return None
+
+        try:
+            return tuple(
+                (_VALUE_RANK, field.to_python(value))
+                for field, value in zip(self.key_fields, values)
+            )
+        except (TypeError, ValidationError):
+            return None
+
+    def _parse_bound(
+        self, bound: Optional[str]
+    ) -> Optional[List[List[Tuple[int, Any]]]]:
+        """Parses the values in a partition bound.
+
+        Returns:
+            The parenthesized groups of values in the bound, or
+            None for the default partition and bounds that do
+            not apply to the partitioning method.
+        """
+
+        tokens = _BOUND_TOKEN_REGEX.findall(bound or "")
+        keywords = [token.upper() for token in tokens[:3]]
+
+        if self.method == PostgresPartitioningMethod.LIST:
+            if keywords[:3] != ["FOR", "VALUES", "IN"]:
+                return None
+
+        elif self.method == PostgresPartitioningMethod.RANGE:
+            if keywords[:3] != ["FOR", "VALUES", "FROM"]:
+                return None
+
+        else:
+            return None
+
+        groups: List[List[Tuple[int, Any]]] = []
+        group: Optional[List[Tuple[int, Any]]] = None
+
+        for token in tokens[3:]:
+            if token == "(":
+                group = []
+            elif token == ")" and group is not None:
+                groups.append(group)
+                group = None
+            elif token not in (",", ")") and group is not None:
+                field = self.key_fields[
+                    min(len(group), len(self.key_fields) - 1)
+                ]
+                group.append(self._parse_bound_value(field, token))
+
+        expected_groups = (
+            1 if self.method == PostgresPartitioningMethod.LIST else 2
+        )
+        if len(groups) != expected_groups:
+            return None
+
+        return groups
+
+    @staticmethod
+    def _parse_bound_value(field: models.Field, token: str) -> Tuple[int, Any]:
+        """Converts a single value in a partition bound into the same Python
+        type as values of the specified field."""
+
+        upper_token = token.upper()
+
+        if upper_token == "MINVALUE":
+            return (_MINVALUE_RANK, None)
+
+        if upper_token == "MAXVALUE":
+            return (_MAXVALUE_RANK, None)
+
+        if upper_token == "NULL":
+            return (_VALUE_RANK, None)
+
+        if upper_token in ("TRUE", "FALSE"):
+            return (_VALUE_RANK, upper_token == "TRUE")
+
+        if token.startswith("'"):
+            token = token[1:-1].replace("''", "'")
+
+        return (_VALUE_RANK, field.to_python(token))
+
+
+def get_partition_router(
+    model: Type[models.Model], using: str
+) -> PostgresPartitionRouter:
+    """Gets the router for rows of the specified partitioned model.
+
+    The partitions are introspected once per model and
+    database. The router is rebuilt after partitions were
+    added or deleted through the schema editor. Call
+    `partition_router_cache.invalidate(model)` after
+    partitions were changed in other ways, such as by
+    another process. Inserts into partitions that no longer
+    exist invalidate the router as well.
+    """
+
+    _assert_routable(model)
+
+    def _build_router() -> PostgresPartitionRouter:
+        connection = connections[using]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                _PARTITIONS_SQL,
+                (connection.ops.quote_name(model._meta.db_table),),
+            )
+            return PostgresPartitionRouter(model, cursor.fetchall())
+
+    return partition_router_cache.get_or_set(model, using, _build_router)
+
+
+async def aget_partition_router(
+    model: Type[models.Model], using: str
+) -> PostgresPartitionRouter:
+    """Async version of :see:get_partition_router.
+
+    Introspects the partitions over a psycopg 3 async
+    connection, see :see:async_connection.
+    """
+
+    _assert_routable(model)
+
+    partition_router = partition_router_cache.get(model, using)
+    if partition_router is not None:
+        return partition_router
+
+    async with async_connection(using) as aconnection:
+        async with aconnection.cursor() as acursor:
+            await acursor.execute(
+                _PARTITIONS_SQL,
+                (connections[using].ops.quote_name(model._meta.db_table),),
+            )
+            partitions = await acursor.fetchall()
+
+    partition_router = PostgresPartitionRouter(model, partitions)
+    partition_router_cache.set(model, using, partition_router)
+
+    return partition_router
+
+
+def is_undefined_table_error(error: BaseException) -> bool:
+    """Gets whether the specified error was raised because a table, such as
+    a partition that was dropped, does not exist."""
+
+    for candidate in (error, error.__cause__):
+        code = getattr(candidate, "sqlstate", None) or getattr(
+            candidate, "pgcode", None
+        )
+        if code == _UNDEFINED_TABLE_SQLSTATE:
+            return True
+
+    return False
+
+
+def assert_conflict_target_routable(
+    model: Type[models.Model], conflict_target: Any
+) -> None:
+    """Raises when rows cannot be inserted straight into partitions with
+    the specified conflict target.
+
+    Partitions have their own copy of the constraints and
+    indexes of the partitioned table, under other names.
+    Constraint and index targets are therefore inferred
+    from their columns, which only works for plain
+    columns without a condition.
+    """
+
+    if django.VERSION < (2, 2):
+        return
+
+    from django.db.models.constraints import BaseConstraint
+    from django.db.models.indexes import Index
+
+    if not isinstance(conflict_target, (BaseConstraint, Index)):
+        return
+
+    target_fields = get_conflict_target_fields(model, conflict_target)
+    if (
+        not target_fields
+        or any(hstore_key for _, hstore_key in target_fields)
+        or getattr(conflict_target, "condition", None) is not None
+        or getattr(conflict_target, "expressions", None)
+    ):
+        raise SuspiciousOperation(
+            (
+                "Cannot route rows of '%s' to partitions with conflict "
+                "target '%s', only constraints and indexes on plain "
+                "columns without a condition can be used. Specify the "
+                "columns as the conflict target or disable routing."
+            )
+            % (model.__name__, conflict_target.name)
+        )
+
+
+def _assert_routable(model: Type[models.Model]) -> None:
+    meta = getattr(model, "_partitioning_meta", None)
+    if not meta or meta.method not in (
+        PostgresPartitioningMethod.RANGE,
+        PostgresPartitioningMethod.LIST,
+    ):
+        raise SuspiciousOperation(
+            (
+                "Cannot route rows of '%s' to partitions, only models "
+                "partitioned by %s or %s can be routed."
+            )
+            % (
+                model.__name__,
+                PostgresPartitioningMethod.RANGE,
+                PostgresPartitioningMethod.LIST,
+            )
+        )
@@ -0,0 +1,270 @@
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union
+
+from django.core.exceptions import SuspiciousOperation
+from django.db import DEFAULT_DB_ALIAS, connections, models
+from django.db.models import Expression, Q
+from django.db.models.fields import NOT_PROVIDED
+
+from .introspect import model_from_cursor
+from .query import ConflictTarget, PostgresQuerySet
+from .types import ConflictAction
+
+try:
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+except ImportError:
+    is_psycopg3 = False
+
+if is_psycopg3:
+    import psycopg
+
+_NOT_EXECUTED = object()
+
+
+@contextmanager
+def _no_pipeline():
+    """No-op stand-in for pipeline mode on drivers that do not support it.
+
+    `contextlib.nullcontext` only exists on Python 3.7+.
+    """
+
+    yield
+
+
+class PostgresPipelineResult:
+    """What a single statement queued on a :see:PostgresPipeline returned.
+
+    Only available after the pipeline was executed.
+    """
+
+    def __init__(self) -> None:
+        self._value: Any = _NOT_EXECUTED
+
+    @property
+    def value(self) -> Any:
+        """What the statement returned, the same as what calling the
+        equivalent method on the queryset would have returned."""
+
+        if self._value is _NOT_EXECUTED:
+            raise SuspiciousOperation(
+                "The pipeline has not been executed yet, "
+                "results are only available after it was."
+            )
+
+        return self._value
+
+
+class PostgresPipeline:
+    """Queues inserts/upserts into any model and sends them to the database
+    in one go.
+
+    With psycopg 3, the statements are sent using pipeline
+    mode: all statements are sent before waiting for any
+    of the results, saving a round-trip per statement. With
+    psycopg 2, the statements are executed one by one.
+
+    Use as a context manager, the statements are executed
+    when the block is exited without an error:
+
+        with PostgresPipeline() as pipeline:
+            first = pipeline.upsert(MyModel, ["name"], dict(name="a"))
+            second = pipeline.upsert_and_get(
+                MyOtherModel, ["slug"], dict(slug="b")
+            )
+
+        print(first.value, second.value)
+
+    The statements are not executed in a transaction of
+    their own. When one of them fails, the statements
+    after it are not executed. Wrap the block in
+    `transaction.atomic` to undo the statements before it.
+    """
+
+    def __init__(self, using: str = DEFAULT_DB_ALIAS) -> None:
+        """Initializes a new instance of :see:PostgresPipeline.
+
+        Arguments:
+            using:
+                The name of the database connection to
+                send the statements over.
+        """
+
+        self.using = using
+
+        self._statements: List[
+            Tuple[
+                List[Tuple[str, Any]],
+                Callable[[Any], Any],
+                PostgresPipelineResult,
+            ]
+        ] = []
+
+    def __enter__(self) -> "PostgresPipeline":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.execute()
+
+    def upsert(
+        self,
+        model: Type[models.Model],
+        conflict_target: ConflictTarget,
+        fields: Dict[str, Any],
+        index_predicate: Optional[Union[Expression, Q, str]] = None,
+        update_condition: Optional[Union[Expression, Q, str]] = None,
+        update_values: Optional[Dict[str, Union[Any, Expression]]] = None,
+        skip_unchanged: bool = False,
+        returning: Optional[Union[str, List[str]]] = NOT_PROVIDED,  # type: ignore[assignment]
+        return_outcome: bool = False,
+    ) -> PostgresPipelineResult:
+        """Queues an upsert, see :see:PostgresQuerySet.upsert.
+
+        Returns:
+            The result of the upsert, available once
+            the pipeline was executed.
+        """
+
+        queryset = PostgresQuerySet(model).on_conflict(
+            conflict_target,
+            ConflictAction.UPDATE
+            if (update_condition or update_condition is None)
+            else ConflictAction.NOTHING,
+            index_predicate=index_predicate,
+            update_condition=update_condition,
+            update_values=update_values,
+            skip_unchanged=skip_unchanged,
+        )
+
+        returning = PostgresQuerySet._normalize_returning(returning)
+
+        compiler = queryset._build_insert_compiler([fields], using=self.using)
+        compiler.query.returning = returning
+        compiler.query.return_outcome = return_outcome
+
+        return self._queue(
+            compiler.as_sql(return_id=True),
+            lambda cursor: PostgresQuerySet._get_insert_result(
+                cursor, returning, return_outcome
+            ),
+        )
+
+    def upsert_and_get(
+        self,
+        model: Type[models.Model],
+        conflict_target: ConflictTarget,
+        fields: Dict[str, Any],
+        index_predicate: Optional[Union[Expression, Q, str]] = None,
+        update_condition: Optional[Union[Expression, Q, str]] = None,
+        update_values: Optional[Dict[str, Union[Any, Expression]]] = None,
+    ) -> PostgresPipelineResult:
+        """Queues an upsert that gets the entire row, see
+        :see:PostgresQuerySet.upsert_and_get.
+
+        Returns:
+            The result of the upsert, available once
+            the pipeline was executed.
+        """
+
+        queryset = PostgresQuerySet(model).on_conflict(
+            conflict_target,
+            ConflictAction.UPDATE,
+            index_predicate=index_predicate,
+            update_condition=update_condition,
+            update_values=update_values,
+        )
+
+        return self._queue_insert_and_get(queryset, fields)
+
+    def insert_and_get(
+        self,
+        model: Type[models.Model],
+        conflict_target: ConflictTarget,
+        fields: Dict[str, Any],
+        conflict_action: ConflictAction = ConflictAction.NOTHING,
+        index_predicate: Optional[Union[Expression, Q, str]] = None,
+    ) -> PostgresPipelineResult:
+        """Queues an insert that gets the entire row, see
+        :see:PostgresQuerySet.insert_and_get.
+
+        Conflict handling has to be specified, only inserts
+        with conflict handling can be sent in a pipeline.
+
+        Returns:
+            The result of the insert, available once
+            the pipeline was executed.
+        """
+
+        queryset = PostgresQuerySet(model).on_conflict(
+            conflict_target, conflict_action, index_predicate=index_predicate
+        )
+
+        return self._queue_insert_and_get(queryset, fields)
+
+    def execute(self) -> List[Any]:
+        """Sends all queued statements to the database and waits for the
+        results.
+
+        Returns:
+            What each of the statements returned, in the
+            order they were queued.
+        """
+
+        statements, self._statements = self._statements, []
+        if not statements:
+            return []
+
+        connection = connections[self.using]
+        connection.ensure_connection()
+
+        cursors = []
+        try:
+            with connection.wrap_database_errors:
+                with self._pipeline(connection):
+                    for sql_with_params, _, _ in statements:
+                        cursor = connection.cursor()
+                        cursors.append(cursor)
+
+                        for sql, params in sql_with_params:
+                            cursor.execute(sql, params)
+
+                    # the first fetch waits for all results
+                    for cursor, (_, consume, result) in zip(
+                        cursors, statements
+                    ):
+                        result._value = consume(cursor)
+        finally:
+            for cursor in cursors:
+                cursor.close()
+
+        return [result.value for _, _, result in statements]
+
+    def _queue_insert_and_get(
+        self, queryset: PostgresQuerySet, fields: Dict[str, Any]
+    ) -> PostgresPipelineResult:
+        compiler = queryset._build_insert_compiler([fields], using=self.using)
+
+        return self._queue(
+            compiler.as_sql(return_id=False),
+            lambda cursor: model_from_cursor(queryset.model, cursor),
+        )
+
+    def _queue(
+        self,
+        sql_with_params: List[Tuple[str, Any]],
+        consume: Callable[[Any], Any],
+    ) -> PostgresPipelineResult:
+        result = PostgresPipelineResult()
+        self._statements.append((sql_with_params, consume, result))
+
+        return result
+
+    @staticmethod
+    def _pipeline(connection):
+        """Enters pipeline mode on the specified connection, if the driver
+        supports it."""
+
+        if not is_psycopg3 or not psycopg.Pipeline.is_supported():
+            return _no_pipeline()
+
+        return connection.connection.pipeline()
@@ -0,0 +1,158 @@
+import re
+
+from itertools import count
+from typing import Any, Optional, Sequence
+
+from django.conf import settings
+from django.db.backends.utils import CursorWrapper
+
+from .statement_cache import CacheInfo, LRUCache
+
+try:
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+except ImportError:
+    is_psycopg3 = False
+
+_PLACEHOLDER_REGEX = re.compile(r"%(%|s)")
+
+
+class PreparedStatementCache:
+    """Keeps track of the statements prepared on a single database connection
+    using `PREPARE` so that they can be executed over and over again without
+    PostgreSQL having to parse and plan them every time.
+
+    The amount of prepared statements is bounded. The least
+    recently used statement is de-allocated when the limit is
+    reached. When the underlying connection is replaced (for
+    example because it was closed and re-opened), everything
+    is forgotten since prepared statements only live as long
+    as the connection they were prepared on.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        """Initializes a new instance of :see:PreparedStatementCache.
+
+        Arguments:
+            maxsize:
+                The maximum amount of statements to keep
+                prepared on the connection.
+        """
+
+        self._statements: LRUCache[str] = LRUCache(
+            maxsize, on_evict=self._on_evict
+        )
+        self._names = count(1)
+        self._cursor: Optional[CursorWrapper] = None
+        self._raw_connection: Any = None
+
+    def execute(
+        self, cursor: CursorWrapper, sql: str, params: Sequence[Any]
+    ) -> None:
+        """Executes the specified SQL as a prepared statement, preparing it
+        first if it wasn't prepared yet on this connection.
+
+        Arguments:
+            cursor:
+                Django cursor (wrapper) to execute on.
+
+            sql:
+                SQL with `%s` placeholders.
+
+            params:
+                The parameters to bind to the placeholders.
+        """
+
+        # psycopg 3 with server-side binding cannot pass parameters to
+        # EXECUTE, let it prepare the statement using the protocol
+        if _uses_server_side_binding(cursor):
+            with cursor.db.wrap_database_errors:
+                cursor.cursor.execute(sql, params, prepare=True)
+
+            return
+
+        if cursor.db.connection is not self._raw_connection:
+            self.reset()
+            self._raw_connection = cursor.db.connection
+
+        self._cursor = cursor
+        name = self._statements.get_or_set(
+            sql, lambda: self._prepare(cursor, sql)
+        )
+
+        if not params:
+            cursor.execute(f"EXECUTE {name}")
+            return
+
+        placeholders = ", ".join(["%s"] * len(params))
+        cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+
+    def deallocate_all(self, cursor: CursorWrapper) -> None:
+        """De-allocates all statements prepared on the connection and forgets
+        about them."""
+
+        cursor.execute("DEALLOCATE ALL")
+        self.reset()
+
+    def reset(self) -> None:
+        """Forgets about all prepared statements without de-allocating them.
+
+        Use this when the connection they were prepared on is
+        gone.
+        """
+
+        self._statements.clear()
+        self._raw_connection = None
+
+    def info(self) -> CacheInfo:
+        """Gets the amount of hits, misses and prepared statements."""
+
+        return self._statements.info()
+
+    def _prepare(self, cursor: CursorWrapper, sql: str) -> str:
+        name = f"psqlextra_{next(self._names)}"
+
+        placeholder_count = count(1)
+        prepared_sql = _PLACEHOLDER_REGEX.sub(
+            lambda match: "%"
+            if match.group(1) == "%"
+            else f"${next(placeholder_count)}",
+            sql,
+        )
+
+        # without parameters, the driver leaves the SQL as-is
+        cursor.execute(f"PREPARE {name} AS {prepared_sql}")
+        return name
+
+    def _on_evict(self, sql: str, name: str) -> None:
+        if self._cursor is not None:
+            self._cursor.execute(f"DEALLOCATE {name}")
+
+
+def get_prepared_statement_cache(connection) -> PreparedStatementCache:
+    """Gets the cache of prepared statements for the specified connection.
+
+    The psqlextra back-end creates the cache when the connection
+    is created. For other back-ends, it is created on first use.
+    """
+
+    cache = getattr(connection, "prepared_statements", None)
+    if cache is None:
+        cache = PreparedStatementCache(get_prepared_statements_max())
+        connection.prepared_statements = cache
+
+    return cache
+
+
+def get_prepared_statements_max() -> int:
+    """Gets the maximum amount of statements to keep prepared per
+    connection."""
+
+    return getattr(settings, "POSTGRES_EXTRA_PREPARED_STATEMENTS_MAX", 100)
+
+
+def _uses_server_side_binding(cursor: CursorWrapper) -> bool:
+    if not is_psycopg3:
+        return False
+
+    options = cursor.db.settings_dict.get("OPTIONS", {})
+    return bool(options.get("server_side_binding"))
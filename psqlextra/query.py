@@ -1,28 +1,96 @@
+import queue
+import threading
+
 from collections import OrderedDict
-from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
 from typing import (
     TYPE_CHECKING,
     Any,
+    AsyncGenerator,
+    Callable,
     Dict,
+    Generator,
     Generic,
+    Hashable,
     Iterable,
     List,
     Optional,
+    Sequence,
+    Set,
     Tuple,
+    Type,
     TypeVar,
     Union,
 )
 
 from django.core.exceptions import SuspiciousOperation
-from django.db import models, router
+from django.db import (
+    NotSupportedError,
+    ProgrammingError,
+    connections,
+    models,
+    router,
+    transaction,
+)
 from django.db.backends.utils import CursorWrapper
-from django.db.models import Expression, Q, QuerySet
+from django.db.models import Expression, F, Q, QuerySet, Value
 from django.db.models.fields import NOT_PROVIDED
-
-from .expressions import ExcludedCol
+from django.db.models.functions import Coalesce, Greatest
+
+from .adaptive import get_conflict_ratio_tracker
+from .async_connection import FetchedCursor, async_connection, async_cursor
+from .conflict_keys import (
+    ConflictKeyGetter,
+    DedupeMergeFunc,
+    build_aggregate_merge_func,
+    build_conflict_key_getter,
+    dedupe_rows,
+    get_conflict_target_fields,
+    normalize_conflict_key,
+    sort_rows,
+)
+from .expressions import ExcludedCol, KeysIn
 from .introspect import model_from_cursor, models_from_cursor
-from .sql import PostgresInsertQuery, PostgresQuery
-from .types import ConflictAction
+from .merge import (
+    MergeWhen,
+    WhenMatched,
+    WhenNotMatched,
+    WhenNotMatchedBySource,
+)
+from .outcome import UpsertResult, match_returned_rows
+from .partition_routing import (
+    aget_partition_router,
+    assert_conflict_target_routable,
+    get_partition_router,
+    is_undefined_table_error,
+)
+from .prepared_statements import get_prepared_statement_cache
+from .sql import (
+    PostgresGetOrCreateQuery,
+    PostgresInsertQuery,
+    PostgresMergeQuery,
+    PostgresQuery,
+    PostgresUpdateFromValuesQuery,
+)
+from .staging import (
+    STAGING_ORDINAL_COLUMN,
+    STAGING_TABLE_NAME,
+    acopy_rows_to_table,
+    copy_rows_to_table,
+)
+from .statement_cache import (
+    make_cache_key,
+    partition_router_cache,
+    upsert_fields_cache,
+)
+from .types import (
+    ConflictAction,
+    DedupePolicy,
+    InsertEngine,
+    UpsertOutcome,
+    UpsertStrategy,
+)
 
 if TYPE_CHECKING:
     from django.db.models.constraints import BaseConstraint
@@ -41,12 +109,13 @@ else:
     QuerySetBase = QuerySet
 
 
-def peek_iterator(iterable):
-    try:
-        first = next(iterable)
-    except StopIteration:
-        return None
-    return list(chain([first], iterable))
+class RawRow:
+    """Stand-in for a model instance when inserting with `raw=True`.
+
+    Only holds the attributes of the fields that are
+    inserted, there's no validation, no signals and no
+    descriptors.
+    """
 
 
 class PostgresQuerySet(QuerySetBase, Generic[TModel]):
@@ -64,6 +133,7 @@ class PostgresQuerySet(QuerySetBase, Generic[TModel]):
         self.conflict_update_condition = None
         self.index_predicate = None
         self.update_values = None
+        self.skip_unchanged = False
 
     def annotate(self, **annotations) -> "Self":  # type: ignore[valid-type, override]
         """Custom version of the standard annotate function that allows using
@@ -122,6 +192,7 @@ class PostgresQuerySet(QuerySetBase, Generic[TModel]):
         index_predicate: Optional[Union[Expression, Q, str]] = None,
         update_condition: Optional[Union[Expression, Q, str]] = None,
         update_values: Optional[Dict[str, Union[Any, Expression]]] = None,
+        skip_unchanged: bool = False,
     ):
         """Sets the action to take when conflicts arise when attempting to
         insert/create a new row.
@@ -144,6 +215,11 @@ class PostgresQuerySet(QuerySetBase, Generic[TModel]):
                 Optionally, values/expressions to use when rows
                 conflict. If not specified, all columns specified
                 in the rows are updated with the values you specified.
+
+            skip_unchanged (default: False):
+                Only update rows that would actually change. Rows
+                for which every updated column already has the new
+                value are left alone, so that they are not rewritten.
         """
 
         self.conflict_target = fields
@@ -151,6 +227,7 @@ class PostgresQuerySet(QuerySetBase, Generic[TModel]):
         self.conflict_update_condition = update_condition
         self.index_predicate = index_predicate
         self.update_values = update_values
+        self.skip_unchanged = skip_unchanged
 
         return self
 
@@ -159,6 +236,17 @@ class PostgresQuerySet(QuerySetBase, Generic[TModel]):
         rows: Iterable[Dict[str, Any]],
         return_model: bool = False,
         using: Optional[str] = None,
+        engine: Union[InsertEngine, str] = InsertEngine.VALUES,
+        batch_size: Optional[int] = None,
+        max_params: Optional[int] = None,
+        yield_chunks: bool = False,
+        dedupe: Optional[Union[DedupePolicy, str, DedupeMergeFunc]] = None,
+        prepare: bool = False,
+        returning: Optional[Union[str, List[str]]] = NOT_PROVIDED,  # type: ignore[assignment]
+        return_outcome: bool = False,
+        raw: bool = False,
+        sort: bool = False,
+        route_to_partitions: bool = False,
     ):
         """Creates multiple new records in the database.
 
@@ -178,57 +266,187 @@ class PostgresQuerySet(QuerySetBase, Generic[TModel]):
                 Optional name of the database connection to use for
                 this query.
 
+            engine (default: InsertEngine.VALUES):
+                How to send the rows to the database. Only applies
+                when conflict handling was configured.
+
+                :see:InsertEngine.VALUES inserts all rows using
+                a single `INSERT INTO ... VALUES` statement.
+
+                :see:InsertEngine.COPY streams the rows into a
+                temporary staging table using `COPY ... FROM STDIN`
+                and then inserts them with a single
+                `INSERT INTO ... SELECT` statement. This avoids
+                sending a bind parameter for every value and is
+                much faster for large amounts of rows.
+
+                :see:InsertEngine.UNNEST sends a single array
+                parameter per column and inserts the rows using
+                `INSERT INTO ... SELECT * FROM unnest(...)`. The
+                SQL is the same no matter how many rows are
+                inserted, allowing PostgreSQL to re-use plans.
+
+            batch_size:
+                Optionally, the maximum amount of rows to insert
+                in a single query. The rows are consumed lazily, no
+                more than `batch_size` rows are in memory at once.
+
+            max_params:
+                Optionally, the maximum amount of bind parameters
+                to use in a single query. The amount of rows per
+                query is derived from this. PostgreSQL does not
+                allow more than 65535 parameters in a query.
+
+                Does not apply to :see:InsertEngine.COPY and
+                :see:InsertEngine.UNNEST.
+
+            yield_chunks (default: False):
+                Instead of returning a list with all the rows, return
+                a generator that inserts a chunk of rows every time
+                it advances and yields the rows inserted in that
+                chunk. Nothing is inserted until the generator is
+                consumed.
+
+                Use this together with `batch_size` or `max_params`
+                to keep the memory usage flat regardless of how many
+                rows are inserted.
+
+            dedupe:
+                Optionally, what to do with rows that have the same
+                values for the conflict target. Only applies when
+                conflict handling was configured.
+
+                Either a :see:DedupePolicy or a function that takes
+                the row seen so far and the new row with the same
+                values and returns the row to insert.
+
+                Defaults to :see:DedupePolicy.KEEP_FIRST for
+                :see:ConflictAction.NOTHING. No de-duplication is done
+                by default for :see:ConflictAction.UPDATE, PostgreSQL
+                refuses to update the same row twice in a query.
+
+                When inserting in chunks, rows are only de-duplicated
+                against other rows in the same chunk.
+
+            prepare (default: False):
+                Execute the insert as a prepared statement that is
+                kept prepared on the connection, so that PostgreSQL
+                does not have to parse and plan the same statement
+                again. Only useful when the SQL is the same every
+                time, for example with :see:InsertEngine.UNNEST or
+                when inserting the same amount of rows every time.
+                Does not apply to :see:InsertEngine.COPY.
+
+            returning:
+                Optionally, what to return for the inserted rows.
+                Only applies when conflict handling was configured.
+
+                None (or an empty list) to not return anything.
+                Only the amount of affected rows is returned
+                instead of a list.
+
+                A list of field/column names to return only those
+                columns, or "*" to return all columns.
+
+                By default, the primary key is returned, or all
+                columns when returning models.
+
+            return_outcome (default: False):
+                Also return whether each row was inserted, updated
+                or skipped. This is determined by the same query
+                that inserts the rows, no extra queries are done.
+
+            raw (default: False):
+                Do not create model instances for the rows. The
+                values are sent to the database as they are,
+                after preparing them for the database the way
+                the fields normally do. Much faster for large
+                amounts of rows. Only applies when conflict
+                handling was configured.
+
+                Rows cannot contain values that only a model
+                would understand, such as model instances for
+                foreign keys. Specify the primary key instead.
+                Defaults are still applied, but no signals are
+                sent and no validation is done.
+
+            sort (default: False):
+                Sort the rows by the values of the conflict target
+                before inserting them. Concurrent inserts of rows
+                that overlap then always lock those rows in the
+                same order and cannot deadlock each other. Only
+                applies when conflict handling was configured.
+
+                Rows are sorted per chunk, the rows are returned
+                in the sorted order. The amount of rows that were
+                moved is available as `reordered` on the
+                :see:UpsertResult when `return_outcome` is True.
+
+            route_to_partitions (default: False):
+                For models partitioned by RANGE or LIST, group the
+                rows by the partition they belong in and insert
+                them straight into that partition. This skips the
+                routing PostgreSQL does for every row and only
+                the partition's indexes are checked for conflicts.
+                Only applies when conflict handling was configured.
+
+                The partitions are introspected once and cached,
+                see :see:get_partition_router. Rows that do not fit
+                any known partition or that would end up in the
+                default partition are inserted into the model's
+                table as usual.
+
+                Rows are returned grouped by partition. With
+                `yield_chunks`, every partition in a chunk is
+                yielded separately.
+
         Returns:
             A list of either the dicts of the rows inserted, including the pk or
             the models of the rows inserted with defaults for any fields not specified
-        """
-        if rows is None:
-            return []
 
-        rows = peek_iterator(iter(rows))
+            The amount of affected rows when `returning` is None.
 
-        if not rows:
-            return []
-
-        if not self.conflict_target and not self.conflict_action:
-            # no special action required, use the standard Django bulk_create(..)
-            return super().bulk_create(
-                [self.model(**fields) for fields in rows]
-            )
-
-        deduped_rows = rows
-
-        # when we do a ConflictAction.NOTHING, we are actually
-        # doing a ON CONFLICT DO UPDATE with a trick to avoid
-        # touching conflicting rows... however, ON CONFLICT UPDATE
-        # barfs when you specify the exact same row twice:
-        #
-        # > "cannot affect row a second time"
-        #
-        # we filter out the duplicates here to make sure we maintain
-        # the same behaviour as the real ON CONFLICT DO NOTHING
-        if self.conflict_action == ConflictAction.NOTHING:
-            deduped_rows = []
-            for row in rows:
-                if row in deduped_rows:
-                    continue
+            A :see:UpsertResult with the above as `rows` when
+            `return_outcome` is True.
+        """
 
-                deduped_rows.append(row)
+        returning = self._normalize_returning(returning)
+
+        chunks = self._bulk_insert_chunks(
+            rows,
+            return_model,
+            using=using,
+            engine=InsertEngine(engine),
+            batch_size=batch_size,
+            max_params=max_params,
+            dedupe=dedupe,
+            prepare=prepare,
+            returning=returning,
+            return_outcome=return_outcome,
+            raw=raw,
+            sort=sort,
+            route_to_partitions=route_to_partitions,
+        )
 
-        compiler = self._build_insert_compiler(deduped_rows, using=using)
+        if yield_chunks:
+            return chunks
 
-        with compiler.connection.cursor() as cursor:
-            for sql, params in compiler.as_sql(return_id=not return_model):
-                cursor.execute(sql, params)
+        if return_outcome:
+            return sum(chunks, UpsertResult())
 
-                if return_model:
-                    return list(models_from_cursor(self.model, cursor))
+        if returning is None:
+            return sum(chunks)
 
-                return self._consume_cursor_as_dicts(
-                    cursor, original_rows=deduped_rows
-                )
+        return list(chain.from_iterable(chunks))
 
-    def insert(self, using: Optional[str] = None, **fields):
+    def insert(
+        self,
+        using: Optional[str] = None,
+        prepare: bool = False,
+        returning: Optional[Union[str, List[str]]] = NOT_PROVIDED,  # type: ignore[assignment]
+        return_outcome: bool = False,
+        **fields,
+    ):
         """Creates a new record in the database.
 
         This allows specifying custom conflict behavior using .on_conflict().
@@ -242,30 +460,81 @@ class PostgresQuerySet(QuerySetBase, Generic[TModel]):
                 The name of the database connection
                 to use for this query.
 
+            prepare (default: False):
+                Execute the insert as a prepared statement that
+                is kept prepared on the connection. See
+                :see:bulk_insert.
+
+            returning:
+                Optionally, None to only return the amount of
+                affected rows or a list of field/column names
+                (or "*") to return a dict of those columns.
+
+                Only applies when conflict handling was
+                configured.
+
+            return_outcome (default: False):
+                Also return whether the row was inserted, updated
+                or skipped. See :see:bulk_insert.
+
         Returns:
             The primary key of the record that was created.
+
+            A :see:UpsertResult with the above as the only
+            row when `return_outcome` is True.
+        """
+
+        return self._insert_row(
+            fields,
+            using=using,
+            prepare=prepare,
+            returning=returning,
+            return_outcome=return_outcome,
+        )
+
+    def _insert_row(
+        self,
+        fields: Dict[str, Any],
+        *,
+        using: Optional[str],
+        prepare: bool,
+        returning: Optional[Union[str, List[str]]],
+        return_outcome: bool,
+    ):
+        """Inserts the specified row, see :see:insert.
+
+        Takes the fields as a dict so that fields named like one
+        of the options of :see:insert cannot be mistaken for them.
         """
 
+        returning = self._normalize_returning(returning)
+
         if self.conflict_target or self.conflict_action:
             if not self.model or not self.model.pk:
                 return None
 
             compiler = self._build_insert_compiler([fields], using=using)
+            compiler.query.returning = returning
+            compiler.query.return_outcome = return_outcome
 
             with compiler.connection.cursor() as cursor:
                 for sql, params in compiler.as_sql(return_id=True):
-                    cursor.execute(sql, params)
+                    self._execute(cursor, sql, params, prepare=prepare)
 
-                row = cursor.fetchone()
-                if not row:
-                    return None
-
-            return row[0]
+                return self._get_insert_result(
+                    cursor, returning, return_outcome
+                )
 
         # no special action required, use the standard Django create(..)
-        return super().create(**fields).pk
+        pk = super().create(**fields).pk
+        if return_outcome:
+            return UpsertResult(rows=[pk], outcomes=[UpsertOutcome.INSERTED])
 
-    def insert_and_get(self, using: Optional[str] = None, **fields):
+        return pk
+
+    def insert_and_get(
+        self, using: Optional[str] = None, prepare: bool = False, **fields
+    ):
         """Creates a new record in the database and then gets the entire row.
 
         This allows specifying custom conflict behavior using .on_conflict().
@@ -279,10 +548,22 @@ class PostgresQuerySet(QuerySetBase, Generic[TModel]):
                 The name of the database connection
                 to use for this query.
 
+            prepare (default: False):
+                Execute the insert as a prepared statement that
+                is kept prepared on the connection. See
+                :see:bulk_insert.
+
         Returns:
             The model instance representing the row that was created.
         """
 
+        return self._insert_row_and_get(fields, using=using, prepare=prepare)
+
+    def _insert_row_and_get(
+        self, fields: Dict[str, Any], *, using: Optional[str], prepare: bool
+    ):
+        """Inserts the specified row and gets it, see :see:insert_and_get."""
+
         if not self.conflict_target and not self.conflict_action:
             # no special action required, use the standard Django create(..)
             return super().create(**fields)
@@ -291,7 +572,7 @@ class PostgresQuerySet(QuerySetBase, Generic[TModel]):
 
         with compiler.connection.cursor() as cursor:
             for sql, params in compiler.as_sql(return_id=False):
-                cursor.execute(sql, params)
+                self._execute(cursor, sql, params, prepare=prepare)
 
             return model_from_cursor(self.model, cursor)
 
@@ -303,7 +584,11 @@ class PostgresQuerySet(QuerySetBase, Generic[TModel]):
         using: Optional[str] = None,
         update_condition: Optional[Union[Expression, Q, str]] = None,
         update_values: Optional[Dict[str, Union[Any, Expression]]] = None,
-    ) -> int:
+        skip_unchanged: bool = False,
+        prepare: bool = False,
+        returning: Optional[Union[str, List[str]]] = NOT_PROVIDED,  # type: ignore[assignment]
+        return_outcome: bool = False,
+    ):
         """Creates a new record or updates the existing one with the specified
         data.
 
@@ -330,8 +615,30 @@ class PostgresQuerySet(QuerySetBase, Generic[TModel]):
                 conflict. If not specified, all columns specified
                 in the rows are updated with the values you specified.
 
+            skip_unchanged (default: False):
+                Only update rows that would actually change. See
+                :see:on_conflict.
+
+            prepare (default: False):
+                Execute the upsert as a prepared statement that
+                is kept prepared on the connection. See
+                :see:bulk_insert.
+
+            returning:
+                Optionally, None to only return the amount of
+                affected rows or a list of field/column names
+                (or "*") to return a dict of those columns.
+
+            return_outcome (default: False):
+                Also return whether the row was inserted, updated
+                or skipped because of `update_condition`. See
+                :see:bulk_insert.
+
         Returns:
             The primary key of the row that was created/updated.
+
+            A :see:UpsertResult with the above as the only
+            row when `return_outcome` is True.
         """
 
         self.on_conflict(
@@ -342,10 +649,16 @@ class PostgresQuerySet(QuerySetBase, Generic[TModel]):
             index_predicate=index_predicate,
             update_condition=update_condition,
             update_values=update_values,
+            skip_unchanged=skip_unchanged,
         )
 
-        kwargs = {**fields, "using": using}
-        return self.insert(**kwargs)
+        return self._insert_row(
+            fields,
+            using=using,
+            prepare=prepare,
+            returning=returning,
+            return_outcome=return_outcome,
+        )
 
     def upsert_and_get(
         self,
@@ -355,6 +668,7 @@ class PostgresQuerySet(QuerySetBase, Generic[TModel]):
         using: Optional[str] = None,
         update_condition: Optional[Union[Expression, Q, str]] = None,
         update_values: Optional[Dict[str, Union[Any, Expression]]] = None,
+        prepare: bool = False,
     ):
         """Creates a new record or updates the existing one with the specified
         data and then gets the row.
@@ -382,6 +696,11 @@ class PostgresQuerySet(QuerySetBase, Generic[TModel]):
                 conflict. If not specified, all columns specified
                 in the rows are updated with the values you specified.
 
+            prepare (default: False):
+                Execute the upsert as a prepared statement that
+                is kept prepared on the connection. See
+                :see:bulk_insert.
+
         Returns:
             The model instance representing the row
             that was created/updated.
@@ -395,8 +714,50 @@ class PostgresQuerySet(QuerySetBase, Generic[TModel]):
             update_values=update_values,
         )
 
-        kwargs = {**fields, "using": using}
-        return self.insert_and_get(**kwargs)
+        return self._insert_row_and_get(fields, using=using, prepare=prepare)
+
+    def upsert_many(
+        self,
+        upserts: Iterable[Tuple[ConflictTarget, Dict[str, Any]]],
+        using: Optional[str] = None,
+        returning: Optional[Union[str, List[str]]] = NOT_PROVIDED,  # type: ignore[assignment]
+    ) -> List[Any]:
+        """Upserts many single rows that each have their own conflict target
+        without waiting for each upsert to complete.
+
+        The upserts are sent using a :see:PostgresPipeline,
+        use that directly to upsert into different models.
+
+        Arguments:
+            upserts:
+                The conflict target and the fields
+                of every row to upsert.
+
+            using:
+                The name of the database connection
+                to use for this query.
+
+            returning:
+                Optionally, what to return for every row.
+                See :see:upsert.
+
+        Returns:
+            What :see:upsert would have returned for every
+            row, in the same order.
+        """
+
+        from .pipeline import PostgresPipeline
+
+        pipeline = PostgresPipeline(
+            using or self._db or router.db_for_write(self.model, **self._hints)  # type: ignore[attr-defined]
+        )
+
+        for conflict_target, fields in upserts:
+            pipeline.upsert(
+                self.model, conflict_target, fields, returning=returning
+            )
+
+        return pipeline.execute()
 
     def bulk_upsert(
         self,
@@ -407,6 +768,19 @@ class PostgresQuerySet(QuerySetBase, Generic[TModel]):
         using: Optional[str] = None,
         update_condition: Optional[Union[Expression, Q, str]] = None,
         update_values: Optional[Dict[str, Union[Any, Expression]]] = None,
+        skip_unchanged: bool = False,
+        engine: Union[InsertEngine, str] = InsertEngine.VALUES,
+        batch_size: Optional[int] = None,
+        max_params: Optional[int] = None,
+        yield_chunks: bool = False,
+        dedupe: Optional[Union[DedupePolicy, str, DedupeMergeFunc]] = None,
+        prepare: bool = False,
+        returning: Optional[Union[str, List[str]]] = NOT_PROVIDED,  # type: ignore[assignment]
+        return_outcome: bool = False,
+        raw: bool = False,
+        sort: bool = False,
+        route_to_partitions: bool = False,
+        adaptive: bool = False,
     ):
         """Creates a set of new records or updates the existing ones with the
         specified data.
@@ -438,9 +812,77 @@ class PostgresQuerySet(QuerySetBase, Generic[TModel]):
                 conflict. If not specified, all columns specified
                 in the rows are updated with the values you specified.
 
+            skip_unchanged (default: False):
+                Only update rows that would actually change. See
+                :see:on_conflict.
+
+            engine (default: InsertEngine.VALUES):
+                How to send the rows to the database. See
+                :see:bulk_insert for the available engines.
+
+            batch_size:
+                Optionally, the maximum amount of rows to upsert
+                in a single query. See :see:bulk_insert.
+
+            max_params:
+                Optionally, the maximum amount of bind parameters
+                to use in a single query. See :see:bulk_insert.
+
+            yield_chunks (default: False):
+                Return a generator that yields the upserted rows
+                chunk by chunk. See :see:bulk_insert.
+
+            dedupe:
+                Optionally, what to do with rows that have the same
+                values for the conflict target. Without this,
+                PostgreSQL refuses to upsert rows that conflict with
+                each other. See :see:bulk_insert.
+
+            prepare (default: False):
+                Execute the upsert as a prepared statement that
+                is kept prepared on the connection. See
+                :see:bulk_insert.
+
+            returning:
+                Optionally, what to return for the upserted rows.
+                None to only return the amount of affected rows.
+                See :see:bulk_insert.
+
+            return_outcome (default: False):
+                Also return whether each row was inserted, updated
+                or skipped because of `update_condition`. See
+                :see:bulk_insert.
+
+            raw (default: False):
+                Do not create model instances for the rows.
+                See :see:bulk_insert.
+
+            sort (default: False):
+                Sort the rows by the values of the conflict
+                target to avoid deadlocks with concurrent
+                upserts. See :see:bulk_insert.
+
+            route_to_partitions (default: False):
+                Upsert straight into the partitions the rows
+                belong in. See :see:bulk_insert.
+
+            adaptive (default: False):
+                Pick how to upsert every batch based on how many
+                of the rows in recent batches already existed.
+                When most rows are new, rows are upserted with
+                `INSERT ... ON CONFLICT`. When most rows already
+                exist, they are updated with `UPDATE ... FROM`
+                first and only the rows that did not match are
+                inserted. Requires `returning=None`.
+
         Returns:
             A list of either the dicts of the rows upserted, including the pk or
             the models of the rows upserted
+
+            The amount of affected rows when `returning` is None.
+
+            A :see:UpsertResult with the above as `rows` when
+            `return_outcome` is True.
         """
 
         self.on_conflict(
@@ -449,162 +891,2533 @@ class PostgresQuerySet(QuerySetBase, Generic[TModel]):
             index_predicate=index_predicate,
             update_condition=update_condition,
             update_values=update_values,
+            skip_unchanged=skip_unchanged,
         )
 
-        return self.bulk_insert(rows, return_model, using=using)
+        if adaptive:
+            returning = self._normalize_returning(returning)
+            if returning is not None or return_outcome or yield_chunks:
+                raise SuspiciousOperation(
+                    (
+                        "Adaptive upserts only return the amount of "
+                        "affected rows, specify returning=None."
+                    )
+                )
 
-    @staticmethod
-    def _consume_cursor_as_dicts(
-        cursor: CursorWrapper, *, original_rows: Iterable[Dict[str, Any]]
-    ) -> List[dict]:
-        cursor_description = cursor.description
+            return self._adaptive_bulk_upsert(
+                rows,
+                using=using,
+                engine=InsertEngine(engine),
+                batch_size=batch_size,
+                max_params=max_params,
+                dedupe=dedupe,
+                prepare=prepare,
+                raw=raw,
+                sort=sort,
+                route_to_partitions=route_to_partitions,
+            )
 
-        return [
-            {
-                **original_row,
-                **{
-                    column.name: row[column_index]
-                    for column_index, column in enumerate(cursor_description)
-                    if row
-                },
-            }
-            for original_row, row in zip(original_rows, cursor)
-        ]
+        return self.bulk_insert(
+            rows,
+            return_model,
+            using=using,
+            engine=engine,
+            batch_size=batch_size,
+            max_params=max_params,
+            yield_chunks=yield_chunks,
+            dedupe=dedupe,
+            prepare=prepare,
+            returning=returning,
+            return_outcome=return_outcome,
+            raw=raw,
+            sort=sort,
+            route_to_partitions=route_to_partitions,
+        )
 
-    def _build_insert_compiler(
-        self, rows: Iterable[Dict], using: Optional[str] = None
-    ):
-        """Builds the SQL compiler for a insert query.
+    def parallel_bulk_upsert(
+        self,
+        conflict_target: ConflictTarget,
+        rows: Iterable[Dict],
+        workers: int = 4,
+        index_predicate: Optional[Union[Expression, Q, str]] = None,
+        using: Optional[str] = None,
+        update_condition: Optional[Union[Expression, Q, str]] = None,
+        update_values: Optional[Dict[str, Union[Any, Expression]]] = None,
+        skip_unchanged: bool = False,
+        engine: Union[InsertEngine, str] = InsertEngine.VALUES,
+        batch_size: int = 1000,
+        dedupe: Optional[Union[DedupePolicy, str, DedupeMergeFunc]] = None,
+    ) -> int:
+        """Upserts the specified rows using multiple connections at the same
+        time.
+
+        The rows are sharded by the values of the conflict
+        target. Each shard is upserted by its own worker thread
+        on its own connection, in batches. Rows that could
+        conflict with each other always end up in the same
+        shard so that workers never wait for or deadlock
+        against each other.
+
+        Every batch is committed on its own. When a batch fails,
+        no new batches are started and the error is raised once
+        all workers finished.
 
         Arguments:
+            conflict_target:
+                Fields to pass into the ON CONFLICT clause.
+
             rows:
-                An iterable of dictionaries, where each entry
-                describes a record to insert.
+                Rows to upsert. Consumed lazily, only a couple
+                of batches per worker are in memory at once.
+
+            workers (default: 4):
+                The amount of connections to upsert with
+                at the same time.
+
+            index_predicate:
+                The index predicate to satisfy an arbiter partial index (i.e. what partial index to use for checking
+                conflicts)
 
             using:
                 The name of the database connection to use
                 for this query.
 
-        Returns:
-            The SQL compiler for the insert.
-        """
+            update_condition:
+                Only update if this SQL expression evaluates to true.
 
-        # ask the db router which connection to use
-        using = (
-            using or self._db or router.db_for_write(self.model, **self._hints)  # type: ignore[attr-defined]
-        )
+            update_values:
+                Optionally, values/expressions to use when rows
+                conflict. If not specified, all columns specified
+                in the rows are updated with the values you specified.
 
-        # create model objects, we also have to detect cases
-        # such as:
-        #   [dict(first_name='swen'), dict(fist_name='swen', last_name='kooij')]
-        # we need to be certain that each row specifies the exact same
-        # amount of fields/columns
-        objs = []
-        rows_iter = iter(rows)
-        first_row = next(rows_iter)
-        field_count = len(first_row)
-        for index, row in enumerate(chain([first_row], rows_iter)):
-            if field_count != len(row):
-                raise SuspiciousOperation(
-                    (
-                        "In bulk upserts, you cannot have rows with different field "
-                        "configurations. Row {0} has a different field config than "
-                        "the first row."
-                    ).format(index)
-                )
+            skip_unchanged (default: False):
+                Only update rows that would actually change. See
+                :see:on_conflict.
 
-            obj = self.model(**row.copy())
-            obj._state.db = using
-            obj._state.adding = False
-            objs.append(obj)
+            engine (default: InsertEngine.VALUES):
+                How to send the rows to the database. See
+                :see:bulk_insert for the available engines.
 
-        # get the fields to be used during update/insert
-        insert_fields, update_values = self._get_upsert_fields(first_row)
+            batch_size (default: 1000):
+                The maximum amount of rows to upsert in
+                a single query.
 
-        # allow the user to override what should happen on update
-        if self.update_values is not None:
-            update_values = self.update_values
+            dedupe:
+                Optionally, what to do with rows that have the same
+                values for the conflict target. See :see:bulk_insert.
 
-        # build a normal insert query
-        query = PostgresInsertQuery(self.model)
-        query.conflict_action = self.conflict_action
-        query.conflict_target = self.conflict_target
-        query.conflict_update_condition = self.conflict_update_condition
-        query.index_predicate = self.index_predicate
-        query.insert_on_conflict_values(objs, insert_fields, update_values)
+        Returns:
+            The amount of rows that were inserted or updated.
+        """
 
-        compiler = query.get_compiler(using)
-        return compiler
+        if workers < 1:
+            raise SuspiciousOperation("workers must be 1 or larger.")
 
-    def _pre_save_field(
+        if batch_size < 1:
+            raise SuspiciousOperation("batch_size must be 1 or larger.")
+
+        using = using or router.db_for_write(self.model, **self._hints)  # type: ignore[attr-defined]
+        get_conflict_key = build_conflict_key_getter(
+            self.model, conflict_target
+        )
+
+        failed = threading.Event()
+
+        def _upsert_shard(shard_queue: "queue.Queue") -> int:
+            affected_rows = 0
+            error = None
+
+            try:
+                while True:
+                    batch = shard_queue.get()
+                    if batch is None:
+                        break
+
+                    # keep draining the queue so the
+                    # producer never blocks forever
+                    if failed.is_set():
+                        continue
+
+                    try:
+                        affected_rows += self._chain().bulk_upsert(  # type: ignore[attr-defined]
+                            conflict_target,
+                            batch,
+                            index_predicate=index_predicate,
+                            using=using,
+                            update_condition=update_condition,
+                            update_values=update_values,
+                            skip_unchanged=skip_unchanged,
+                            engine=engine,
+                            dedupe=dedupe,
+                            returning=None,
+                        )
+                    except Exception as e:
+                        error = e
+                        failed.set()
+            finally:
+                # every thread has its own connection
+                connections[using].close()
+
+            if error:
+                raise error
+
+            return affected_rows
+
+        shard_queues: List[queue.Queue] = [
+            queue.Queue(maxsize=2) for _ in range(workers)
+        ]
+        batches: List[List[Dict[str, Any]]] = [[] for _ in range(workers)]
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_upsert_shard, shard_queue)
+                for shard_queue in shard_queues
+            ]
+
+            try:
+                for index, row in enumerate(rows):
+                    if failed.is_set():
+                        break
+
+                    # rows with NULL in the conflict target never
+                    # conflict and can go to any worker
+                    key = get_conflict_key(row)
+                    shard = (
+                        index % workers if key is None else hash(key) % workers
+                    )
+
+                    batches[shard].append(row)
+                    if len(batches[shard]) >= batch_size:
+                        shard_queues[shard].put(batches[shard])
+                        batches[shard] = []
+
+                for shard, batch in enumerate(batches):
+                    if batch and not failed.is_set():
+                        shard_queues[shard].put(batch)
+            finally:
+                for shard_queue in shard_queues:
+                    shard_queue.put(None)
+
+            return sum(future.result() for future in futures)
+
+    def bulk_increment(
         self,
-        model_instance: models.Model,
-        field: models.Field,
-        *,
-        is_insert: bool
+        conflict_target: ConflictTarget,
+        rows: Iterable[Dict],
+        sum_fields: Optional[List[str]] = None,
+        max_fields: Optional[List[str]] = None,
+        index_predicate: Optional[Union[Expression, Q, str]] = None,
+        using: Optional[str] = None,
+        engine: Union[InsertEngine, str] = InsertEngine.VALUES,
+        batch_size: Optional[int] = None,
+        returning: Optional[Union[str, List[str]]] = None,
     ):
-        """Pre-saves the model and gets whether the :see:pre_save method makes
-        any modifications to the field value.
+        """Upserts counters, adding to the existing values rather than
+        overwriting them.
+
+        Rows in the same batch with the same values for the
+        conflict target are aggregated into a single row before
+        they are sent, the same way they are aggregated with the
+        existing row. NULL counts as zero:
+
+            ON CONFLICT (...) DO UPDATE SET
+                n = COALESCE(t.n, 0) + COALESCE(EXCLUDED.n, 0),
+                last = GREATEST(t.last, EXCLUDED.last)
+
+        Only a single batch of rows is pulled from the
+        specified iterable at a time.
 
         Arguments:
-            model_instance:
-                The model instance the field is defined on.
+            conflict_target:
+                Fields to pass into the ON CONFLICT clause.
 
-            field:
-                The field to pre-save.
+            rows:
+                Rows to upsert.
 
-            is_insert:
-                Pretend whether this is an insert?
+            sum_fields:
+                Names of the fields to add the values of
+                the rows to.
 
-        Returns:
-            True when this field modifies something.
-        """
+            max_fields:
+                Names of the fields to keep the largest
+                value in.
 
-        # does this field modify someting upon insert?
-        old_value = getattr(model_instance, field.name, None)
-        field.pre_save(model_instance, is_insert)
-        new_value = getattr(model_instance, field.name, None)
+            index_predicate:
+                The index predicate to satisfy an arbiter partial index (i.e. what partial index to use for checking
+                conflicts)
 
-        return old_value != new_value
+            using:
+                The name of the database connection to use
+                for this query.
 
-    def _get_upsert_fields(self, kwargs):
-        """Gets the fields to use in an upsert.
+            engine (default: InsertEngine.VALUES):
+                How to send the rows to the database. See
+                :see:bulk_insert for the available engines.
 
-        This some nice magic. We'll split the fields into
-        a group of "insert fields" and "update fields":
+            batch_size:
+                Optionally, the maximum amount of rows to upsert
+                in a single query. See :see:bulk_insert.
 
-        INSERT INTO bla ("val1", "val2") ON CONFLICT DO UPDATE SET val1 = EXCLUDED.val1
+            returning:
+                Optionally, what to return for the upserted rows.
+                By default, only the amount of affected rows is
+                returned. See :see:bulk_insert.
 
-                         ^^^^^^^^^^^^^^                            ^^^^^^^^^^^^^^^^^^^^
-                         insert_fields                                 update_fields
+        Returns:
+            What :see:bulk_upsert returns.
+        """
 
-        Often, fields appear in both lists. But, for example,
-        a :see:DateTime field with `auto_now_add=True` set, will
-        only appear in "insert_fields", since it won't be set
-        on existing rows.
+        sum_fields = list(sum_fields or [])
+        max_fields = list(max_fields or [])
 
-        Other than that, the user specificies a list of fields
-        in the upsert() call. That migt not be all fields. The
-        user could decide to leave out optional fields. If we
-        end up doing an update, we don't want to overwrite
-        those non-specified fields.
+        if not sum_fields and not max_fields:
+            raise SuspiciousOperation(
+                "Specify at least one of sum_fields or max_fields."
+            )
 
-        We cannot just take the list of fields the user
-        specifies, because as mentioned, some fields
-        make modifications to the model on their own.
+        update_values: Dict[str, Union[Any, Expression]] = {}
+        for name in sum_fields + max_fields:
+            field = self._get_raw_row_field(name)
+            if not field:
+                raise SuspiciousOperation(
+                    "'%s' is not a field of '%s'." % (name, self.model.__name__)
+                )
 
-        We'll have to detect which fields make modifications
-        and include them in the list of insert/update fields.
-        """
+            # NULL counts as zero, NULL + 1 would stay NULL forever,
+            # GREATEST already ignores NULL
+            update_values[field.name] = (
+                Coalesce(F(field.name), Value(0), output_field=field)
+                + Coalesce(ExcludedCol(field), Value(0), output_field=field)
+                if name in sum_fields
+                else Greatest(F(field.name), ExcludedCol(field))
+            )
 
-        insert_fields = []
-        update_values = {}
+        rows_iter = iter(rows)
+        first_row = next(rows_iter, None)
 
-        insert_model_instance = self.model(**kwargs)
+        # all other fields are overwritten as usual
+        for name in first_row or []:
+            field = self._get_raw_row_field(name)
+            if field and field.name not in update_values:
+                update_values[field.name] = ExcludedCol(field)
+
+        # rows are aggregated per batch, rows in different
+        # batches are aggregated by the upsert itself
+        return self.bulk_upsert(
+            conflict_target,
+            chain([first_row], rows_iter) if first_row is not None else [],
+            index_predicate=index_predicate,
+            using=using,
+            update_values=update_values,
+            engine=engine,
+            batch_size=batch_size,
+            dedupe=build_aggregate_merge_func(sum_fields, max_fields),
+            returning=returning,
+        )
+
+    def bulk_merge(
+        self,
+        rows: Iterable[Dict],
+        match_on: List[str],
+        when: Optional[List[MergeWhen]] = None,
+        using: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        raw: bool = False,
+    ) -> int:
+        """Merges the specified rows into the table using a single `MERGE`
+        statement.
+
+        Unlike :see:bulk_upsert, rows are matched against the
+        existing rows on arbitrary columns, no unique constraint
+        is needed. Existing rows can be updated or deleted
+        depending on conditions.
+
+        Requires PostgreSQL 15 or newer.
+
+        Arguments:
+            rows:
+                Rows to merge.
+
+            match_on:
+                Names of the fields to match the rows against
+                existing rows on. Rows match when all of these
+                fields are equal. NULL never matches anything.
+
+            when:
+                The WHEN clauses, evaluated in order for every
+                row. See :see:WhenMatched, :see:WhenNotMatched and
+                :see:WhenNotMatchedBySource.
+
+                By default, matched rows are updated and rows
+                that do not match are inserted.
+
+            using:
+                The name of the database connection to use
+                for this query.
+
+            batch_size:
+                Optionally, the maximum amount of rows to merge
+                in a single statement.
+
+            raw (default: False):
+                Do not create model instances for the rows.
+                See :see:bulk_insert.
+
+        Returns:
+            The amount of rows that were inserted, updated
+            or deleted.
+        """
+
+        when = when if when is not None else [WhenMatched(), WhenNotMatched()]
+
+        using = using or self._db or router.db_for_write(self.model, **self._hints)  # type: ignore[attr-defined]
+        connection = connections[using]
+
+        min_version = 150000
+        if any(isinstance(clause, WhenNotMatchedBySource) for clause in when):
+            # would affect every row that is not in the batch
+            if batch_size:
+                raise SuspiciousOperation(
+                    "WhenNotMatchedBySource cannot be used when "
+                    "merging in batches."
+                )
+
+            min_version = 170000
+
+        if connection.pg_version < min_version:
+            raise NotSupportedError(
+                "Merging with these WHEN clauses requires PostgreSQL %d or newer."
+                % (min_version // 10000)
+            )
+
+        affected_rows = 0
+        for chunk in self._split_bulk_insert_rows(
+            rows,
+            engine=InsertEngine.VALUES,
+            batch_size=batch_size,
+            max_params=None,
+        ):
+            compiler = self._build_insert_compiler(
+                chunk, using=using, raw=raw, query_class=PostgresMergeQuery
+            )
+            compiler.query.match_on = match_on
+            compiler.query.when_clauses = when
+
+            with compiler.connection.cursor() as cursor:
+                for sql, params in compiler.as_sql():
+                    cursor.execute(sql, params)
+                    affected_rows += cursor.rowcount
+
+        return affected_rows
+
+    def get_by_keys(
+        self,
+        keys: Iterable[Union[Sequence[Any], Any]],
+        fields: List[str],
+    ) -> "Self":  # type: ignore[valid-type]
+        """Filters on rows of which the values of the specified fields are
+        one of the specified keys.
+
+        The keys are passed as a single array per field,
+        see :see:KeysIn.
+
+        Arguments:
+            keys:
+                The keys to find, a tuple of values in the
+                same order as `fields`. When there is only a
+                single field, the keys can be plain values.
+
+            fields:
+                Names of the fields the keys consist of.
+
+        Returns:
+            A queryset of the rows with one of the keys.
+        """
+
+        return self.filter(KeysIn(fields, keys))
+
+    def delete_by_keys(
+        self,
+        keys: Iterable[Union[Sequence[Any], Any]],
+        fields: List[str],
+    ) -> Tuple[int, Dict[str, int]]:
+        """Deletes the rows of which the values of the specified fields are
+        one of the specified keys.
+
+        See :see:get_by_keys.
+
+        Returns:
+            The same as Django's `QuerySet.delete`, the total
+            amount of deleted rows and the amount per model.
+        """
+
+        return self.get_by_keys(keys, fields).delete()
+
+    def bulk_update_values(
+        self,
+        rows: Iterable[Dict],
+        key: List[str],
+        fields: Optional[List[str]] = None,
+        using: Optional[str] = None,
+        engine: Union[InsertEngine, str] = InsertEngine.VALUES,
+        batch_size: Optional[int] = None,
+        returning: Optional[Union[str, List[str]]] = None,
+        raw: bool = False,
+    ):
+        """Updates existing rows with the specified values using a single
+        `UPDATE ... FROM (VALUES ...)` statement.
+
+        Unlike Django's `bulk_update`, the size of the statement
+        grows linearly with the amount of rows, regardless of
+        how many fields are updated.
+
+        Arguments:
+            rows:
+                Rows to update, every row has to specify the
+                values of the `key` fields and the fields to
+                update.
+
+            key:
+                Names of the fields to find the rows to update
+                by. Rows are updated when all of these fields
+                are equal. NULL never matches anything. When
+                multiple rows have the same key, only one of
+                them is used.
+
+            fields:
+                Optionally, the names of the fields to update.
+                By default, all fields specified in the rows
+                that are not part of the key are updated.
+
+            using:
+                The name of the database connection to use
+                for this query.
+
+            engine (default: InsertEngine.VALUES):
+                How to send the rows to the database, either
+                :see:InsertEngine.VALUES or :see:InsertEngine.UNNEST.
+                See :see:bulk_insert.
+
+            batch_size:
+                Optionally, the maximum amount of rows to update
+                in a single statement.
+
+            returning:
+                Optionally, a list of field/column names (or "*")
+                of the updated rows to return.
+
+            raw (default: False):
+                Do not create model instances for the rows.
+                See :see:bulk_insert.
+
+        Returns:
+            The amount of rows that were updated.
+
+            A list of dicts with the columns in `returning` of
+            every row that was updated when `returning` is
+            specified.
+        """
+
+        engine = InsertEngine(engine)
+        if engine == InsertEngine.COPY:
+            raise SuspiciousOperation(
+                "Cannot update rows with the '%s' engine." % engine
+            )
+
+        using = using or self._db or router.db_for_write(self.model, **self._hints)  # type: ignore[attr-defined]
+
+        updated_rows: List[Dict[str, Any]] = []
+        affected_rows = 0
+
+        for chunk in self._split_bulk_insert_rows(
+            rows,
+            engine=engine,
+            batch_size=batch_size,
+            max_params=None,
+        ):
+            compiler = self._build_insert_compiler(
+                chunk,
+                using=using,
+                raw=raw,
+                query_class=PostgresUpdateFromValuesQuery,
+            )
+            compiler.query.engine = engine
+            compiler.query.returning = returning
+            compiler.query.match_on = key
+            compiler.query.update_fields = (
+                fields if fields is not None else list(chunk[0].keys())
+            )
+
+            with compiler.connection.cursor() as cursor:
+                for sql, params in compiler.as_sql():
+                    cursor.execute(sql, params)
+                    affected_rows += cursor.rowcount
+
+                    if returning:
+                        columns = [column.name for column in cursor.description]
+                        updated_rows.extend(
+                            dict(zip(columns, row)) for row in cursor.fetchall()
+                        )
+
+        return updated_rows if returning else affected_rows
+
+    def bulk_get_or_create(
+        self,
+        rows: Iterable[Dict],
+        conflict_target: ConflictTarget,
+        index_predicate: Optional[Union[Expression, Q, str]] = None,
+        return_model: bool = False,
+        using: Optional[str] = None,
+        engine: Union[InsertEngine, str] = InsertEngine.VALUES,
+        batch_size: Optional[int] = None,
+        raw: bool = False,
+    ) -> List[Tuple[Any, bool]]:
+        """Gets the rows that exist and creates the ones that do not using a
+        single statement per batch.
+
+        Rows that do not exist yet are inserted with
+        `ON CONFLICT DO NOTHING` and the rows that already
+        existed are selected in the same statement, so that
+        no rows have to be fetched in a separate round-trip.
+
+        Arguments:
+            rows:
+                Rows to get or create. Every row has to specify
+                a value for every field in the conflict target.
+                Rows with the same values for the conflict
+                target are only created once, only the first
+                of them is reported as created.
+
+            conflict_target:
+                Fields that identify a row. There has to be a
+                unique constraint or index on these fields.
+
+            index_predicate:
+                The index predicate to satisfy an arbiter partial
+                index (i.e. what partial index to use for checking
+                conflicts). Existing rows that do not satisfy the
+                predicate are not found.
+
+            return_model (default: False):
+                If model instances should be returned rather than
+                just dicts.
+
+            using:
+                The name of the database connection to use
+                for this query.
+
+            engine (default: InsertEngine.VALUES):
+                How to send the rows to the database, either
+                :see:InsertEngine.VALUES or :see:InsertEngine.UNNEST.
+                See :see:bulk_insert.
+
+            batch_size:
+                Optionally, the maximum amount of rows to get
+                or create in a single statement.
+
+            raw (default: False):
+                Do not create model instances for the rows.
+                See :see:bulk_insert.
+
+        Returns:
+            A `(row, created)` tuple for every row, in the order
+            of the rows, like Django's `get_or_create`. The row
+            is None if it was neither created nor found, which
+            only happens if it was deleted concurrently.
+        """
+
+        engine = InsertEngine(engine)
+        if engine == InsertEngine.COPY:
+            raise SuspiciousOperation(
+                "Cannot get or create rows with the '%s' engine." % engine
+            )
+
+        using = using or self._db or router.db_for_write(self.model, **self._hints)  # type: ignore[attr-defined]
+
+        get_row_key = self._build_row_key_getter(conflict_target)
+
+        def _get_key(row: Dict[str, Any]) -> Tuple:
+            key = get_row_key(row)
+            if key is None:
+                raise SuspiciousOperation(
+                    (
+                        "Cannot get or create rows that do not specify "
+                        "a value for every field in conflict target %s."
+                    )
+                    % str(conflict_target)
+                )
+
+            return key
+
+        if batch_size is not None and batch_size < 1:
+            raise SuspiciousOperation("batch_size must be 1 or larger.")
+
+        self.on_conflict(
+            conflict_target,
+            ConflictAction.NOTHING,
+            index_predicate=index_predicate,
+        )
+
+        # only a single batch of rows is pulled from the specified
+        # rows at a time, rows in a later batch that are the same as
+        # rows in an earlier batch are found by the database
+        rows_iter = iter(rows)
+        results: List[Tuple[Any, bool]] = []
+
+        while True:
+            batch = list(
+                islice(rows_iter, batch_size) if batch_size else rows_iter
+            )
+            if not batch:
+                return results
+
+            keys = [_get_key(row) for row in batch]
+
+            # rows with the same key are only sent once
+            pending_rows: Dict[Tuple, Dict] = {}
+            for key, row in zip(keys, batch):
+                pending_rows.setdefault(key, row)
+
+            batch_results = self._get_or_create_batch(
+                pending_rows,
+                _get_key,
+                return_model=return_model,
+                using=using,
+                engine=engine,
+                raw=raw,
+            )
+
+            for key in keys:
+                result = batch_results.get(key, (None, False))
+                results.append(result)
+
+                # like get_or_create, only the first of the rows
+                # with the same key was created, the others got it
+                if result[1]:
+                    batch_results[key] = (result[0], False)
+
+    def _get_or_create_batch(
+        self,
+        pending_rows: Dict[Tuple, Dict],
+        get_key: Callable[[Dict[str, Any]], Tuple],
+        *,
+        return_model: bool,
+        using: str,
+        engine: InsertEngine,
+        raw: bool,
+    ) -> Dict[Tuple, Tuple[Any, bool]]:
+        """Gets or creates the specified rows in a single statement, see
+        :see:bulk_get_or_create.
+
+        Returns:
+            The row and whether it was created, by key.
+        """
+
+        fields = self.model._meta.concrete_fields
+        attnames = [field.attname for field in fields]
+        columns = [field.column for field in fields]
+
+        results: Dict[Tuple, Tuple[Any, bool]] = {}
+
+        # rows that conflict with rows inserted concurrently are
+        # neither created nor visible to the statement, those
+        # are visible when the statement is executed again
+        for _ in range(2):
+            if not pending_rows:
+                break
+
+            compiler = self._build_insert_compiler(
+                pending_rows.values(),
+                using=using,
+                raw=raw,
+                query_class=PostgresGetOrCreateQuery,
+            )
+            compiler.query.engine = engine
+
+            with compiler.connection.cursor() as cursor:
+                for sql, params in compiler.as_sql():
+                    cursor.execute(sql, params)
+
+                    for *values, created in cursor.fetchall():
+                        row = dict(zip(columns, values))
+                        results[get_key(row)] = (
+                            self.model.from_db(using, attnames, values)
+                            if return_model
+                            else row,
+                            created,
+                        )
+
+            pending_rows = {
+                key: row
+                for key, row in pending_rows.items()
+                if key not in results
+            }
+
+        return results
+
+    async def abulk_insert(
+        self,
+        rows: Iterable[Dict[str, Any]],
+        return_model: bool = False,
+        using: Optional[str] = None,
+        engine: Union[InsertEngine, str] = InsertEngine.VALUES,
+        batch_size: Optional[int] = None,
+        max_params: Optional[int] = None,
+        yield_chunks: bool = False,
+        dedupe: Optional[Union[DedupePolicy, str, DedupeMergeFunc]] = None,
+        prepare: bool = False,
+        returning: Optional[Union[str, List[str]]] = NOT_PROVIDED,  # type: ignore[assignment]
+        return_outcome: bool = False,
+        raw: bool = False,
+        sort: bool = False,
+        route_to_partitions: bool = False,
+    ):
+        """Async version of :see:bulk_insert.
+
+        Runs on a psycopg 3 async connection, see
+        :see:psqlextra.async_connection.async_connection.
+
+        With `yield_chunks=True`, an async generator is returned.
+        """
+
+        returning = self._normalize_returning(returning)
+
+        chunks = self._abulk_insert_chunks(
+            rows,
+            return_model,
+            using=using,
+            engine=InsertEngine(engine),
+            batch_size=batch_size,
+            max_params=max_params,
+            dedupe=dedupe,
+            prepare=prepare,
+            returning=returning,
+            return_outcome=return_outcome,
+            raw=raw,
+            sort=sort,
+            route_to_partitions=route_to_partitions,
+        )
+
+        if yield_chunks:
+            return chunks
+
+        if return_outcome:
+            return sum([chunk async for chunk in chunks], UpsertResult())
+
+        if returning is None:
+            return sum([chunk async for chunk in chunks])
+
+        return [row async for chunk in chunks for row in chunk]
+
+    async def ainsert(
+        self,
+        using: Optional[str] = None,
+        prepare: bool = False,
+        returning: Optional[Union[str, List[str]]] = NOT_PROVIDED,  # type: ignore[assignment]
+        return_outcome: bool = False,
+        **fields,
+    ):
+        """Async version of :see:insert.
+
+        Runs on a psycopg 3 async connection, see
+        :see:psqlextra.async_connection.async_connection.
+        """
+
+        return await self._ainsert_row(
+            fields,
+            using=using,
+            prepare=prepare,
+            returning=returning,
+            return_outcome=return_outcome,
+        )
+
+    async def _ainsert_row(
+        self,
+        fields: Dict[str, Any],
+        *,
+        using: Optional[str],
+        prepare: bool,
+        returning: Optional[Union[str, List[str]]],
+        return_outcome: bool,
+    ):
+        """Async version of :see:_insert_row."""
+
+        returning = self._normalize_returning(returning)
+
+        # resolved here, building the query would resolve
+        # them with a blocking query otherwise
+        (fields,) = await self._aresolve_related_lookups([fields], using)
+
+        # without conflict handling, this is a plain insert, it runs
+        # over the async connection as well instead of Django's
+        # acreate(..), which would use Django's own connection
+        compiler = self._build_insert_compiler([fields], using=using)
+        compiler.query.returning = returning
+        compiler.query.return_outcome = return_outcome
+
+        cursor = await self._aexecute_compiler(
+            compiler, return_id=True, prepare=prepare
+        )
+        return self._get_insert_result(cursor, returning, return_outcome)
+
+    async def ainsert_and_get(
+        self, using: Optional[str] = None, prepare: bool = False, **fields
+    ):
+        """Async version of :see:insert_and_get.
+
+        Runs on a psycopg 3 async connection, see
+        :see:psqlextra.async_connection.async_connection.
+        """
+
+        return await self._ainsert_row_and_get(
+            fields, using=using, prepare=prepare
+        )
+
+    async def _ainsert_row_and_get(
+        self, fields: Dict[str, Any], *, using: Optional[str], prepare: bool
+    ):
+        """Async version of :see:_insert_row_and_get."""
+
+        # a plain insert without conflict handling, see :see:_ainsert_row
+        (fields,) = await self._aresolve_related_lookups([fields], using)
+        compiler = self._build_insert_compiler([fields], using=using)
+
+        cursor = await self._aexecute_compiler(
+            compiler, return_id=False, prepare=prepare
+        )
+        return model_from_cursor(self.model, cursor)
+
+    async def aupsert(
+        self,
+        conflict_target: ConflictTarget,
+        fields: dict,
+        index_predicate: Optional[Union[Expression, Q, str]] = None,
+        using: Optional[str] = None,
+        update_condition: Optional[Union[Expression, Q, str]] = None,
+        update_values: Optional[Dict[str, Union[Any, Expression]]] = None,
+        skip_unchanged: bool = False,
+        prepare: bool = False,
+        returning: Optional[Union[str, List[str]]] = NOT_PROVIDED,  # type: ignore[assignment]
+        return_outcome: bool = False,
+    ):
+        """Async version of :see:upsert."""
+
+        self.on_conflict(
+            conflict_target,
+            ConflictAction.UPDATE
+            if (update_condition or update_condition is None)
+            else ConflictAction.NOTHING,
+            index_predicate=index_predicate,
+            update_condition=update_condition,
+            update_values=update_values,
+            skip_unchanged=skip_unchanged,
+        )
+
+        return await self._ainsert_row(
+            fields,
+            using=using,
+            prepare=prepare,
+            returning=returning,
+            return_outcome=return_outcome,
+        )
+
+    async def aupsert_and_get(
+        self,
+        conflict_target: ConflictTarget,
+        fields: dict,
+        index_predicate: Optional[Union[Expression, Q, str]] = None,
+        using: Optional[str] = None,
+        update_condition: Optional[Union[Expression, Q, str]] = None,
+        update_values: Optional[Dict[str, Union[Any, Expression]]] = None,
+        prepare: bool = False,
+    ):
+        """Async version of :see:upsert_and_get."""
+
+        self.on_conflict(
+            conflict_target,
+            ConflictAction.UPDATE,
+            index_predicate=index_predicate,
+            update_condition=update_condition,
+            update_values=update_values,
+        )
+
+        return await self._ainsert_row_and_get(
+            fields, using=using, prepare=prepare
+        )
+
+    async def abulk_upsert(
+        self,
+        conflict_target: ConflictTarget,
+        rows: Iterable[Dict],
+        index_predicate: Optional[Union[Expression, Q, str]] = None,
+        return_model: bool = False,
+        using: Optional[str] = None,
+        update_condition: Optional[Union[Expression, Q, str]] = None,
+        update_values: Optional[Dict[str, Union[Any, Expression]]] = None,
+        skip_unchanged: bool = False,
+        engine: Union[InsertEngine, str] = InsertEngine.VALUES,
+        batch_size: Optional[int] = None,
+        max_params: Optional[int] = None,
+        yield_chunks: bool = False,
+        dedupe: Optional[Union[DedupePolicy, str, DedupeMergeFunc]] = None,
+        prepare: bool = False,
+        returning: Optional[Union[str, List[str]]] = NOT_PROVIDED,  # type: ignore[assignment]
+        return_outcome: bool = False,
+        raw: bool = False,
+        sort: bool = False,
+        route_to_partitions: bool = False,
+    ):
+        """Async version of :see:bulk_upsert."""
+
+        self.on_conflict(
+            conflict_target,
+            ConflictAction.UPDATE,
+            index_predicate=index_predicate,
+            update_condition=update_condition,
+            update_values=update_values,
+            skip_unchanged=skip_unchanged,
+        )
+
+        return await self.abulk_insert(
+            rows,
+            return_model,
+            using=using,
+            engine=engine,
+            batch_size=batch_size,
+            max_params=max_params,
+            yield_chunks=yield_chunks,
+            dedupe=dedupe,
+            prepare=prepare,
+            returning=returning,
+            return_outcome=return_outcome,
+            raw=raw,
+            sort=sort,
+            route_to_partitions=route_to_partitions,
+        )
+
+    def _bulk_insert_chunks(
+        self,
+        rows: Optional[Iterable[Dict[str, Any]]],
+        return_model: bool,
+        *,
+        using: Optional[str],
+        engine: InsertEngine,
+        batch_size: Optional[int],
+        max_params: Optional[int],
+        dedupe: Optional[Union[DedupePolicy, str, DedupeMergeFunc]],
+        prepare: bool,
+        returning: Optional[Union[str, List[str]]],
+        return_outcome: bool,
+        raw: bool,
+        sort: bool,
+        route_to_partitions: bool,
+    ) -> Generator[Union[List[Any], int], None, None]:
+        """Inserts the specified rows in chunks and yields the rows inserted
+        in each chunk.
+
+        Only a single chunk of rows is pulled from the
+        specified iterable at a time.
+        """
+
+        for chunk in self._split_bulk_insert_rows(
+            rows,
+            engine=engine,
+            batch_size=batch_size,
+            max_params=max_params,
+            using=using,
+            raw=raw,
+        ):
+            for (
+                partition_table_name,
+                partition_rows,
+            ) in self._route_bulk_insert_rows(
+                chunk, using=using, route_to_partitions=route_to_partitions
+            ):
+                yield self._bulk_insert_routed_chunk(
+                    partition_rows,
+                    return_model,
+                    using=using,
+                    engine=engine,
+                    dedupe=dedupe,
+                    prepare=prepare,
+                    returning=returning,
+                    return_outcome=return_outcome,
+                    raw=raw,
+                    sort=sort,
+                    partition_table_name=partition_table_name,
+                )
+
+    def _split_bulk_insert_rows(
+        self,
+        rows: Optional[Iterable[Dict[str, Any]]],
+        *,
+        engine: InsertEngine,
+        batch_size: Optional[int],
+        max_params: Optional[int],
+        using: Optional[str] = None,
+        raw: bool = False,
+    ) -> Generator[List[Dict[str, Any]], None, None]:
+        """Splits the specified rows into the chunks to insert in a single
+        query each.
+
+        Only a single chunk of rows is pulled from the
+        specified iterable at a time.
+        """
+
+        if rows is None:
+            return
+
+        rows_iter = iter(rows)
+
+        first_row = next(rows_iter, None)
+        if first_row is None:
+            return
+
+        rows_iter = chain([first_row], rows_iter)
+
+        chunk_size = self._get_bulk_insert_chunk_size(
+            engine, batch_size, max_params, first_row, using=using, raw=raw
+        )
+        if not chunk_size:
+            yield list(rows_iter)
+            return
+
+        while True:
+            chunk = list(islice(rows_iter, chunk_size))
+            if not chunk:
+                return
+
+            yield chunk
+
+    def _route_bulk_insert_rows(
+        self,
+        rows: List[Dict[str, Any]],
+        *,
+        using: Optional[str],
+        route_to_partitions: bool,
+    ) -> List[Tuple[Optional[str], List[Dict[str, Any]]]]:
+        """Groups the specified rows by the partition they should be
+        inserted into.
+
+        Returns:
+            The name of the partition and the rows to insert
+            into it. The name is None for rows that should be
+            inserted into the model's table itself.
+        """
+
+        if not route_to_partitions:
+            return [(None, rows)]
+
+        # only inserts with conflict handling are built by us,
+        # others are left to the standard Django bulk_create(..)
+        if not self.conflict_target and not self.conflict_action:
+            return [(None, rows)]
+
+        assert_conflict_target_routable(self.model, self.conflict_target)
+
+        partition_router = get_partition_router(
+            self.model,
+            using or self._db or router.db_for_write(self.model, **self._hints),  # type: ignore[attr-defined]
+        )
+
+        return list(partition_router.route(rows).items())
+
+    async def _aroute_bulk_insert_rows(
+        self,
+        rows: List[Dict[str, Any]],
+        *,
+        using: Optional[str],
+        route_to_partitions: bool,
+    ) -> List[Tuple[Optional[str], List[Dict[str, Any]]]]:
+        """Async version of :see:_route_bulk_insert_rows."""
+
+        if not route_to_partitions:
+            return [(None, rows)]
+
+        if not self.conflict_target and not self.conflict_action:
+            return [(None, rows)]
+
+        assert_conflict_target_routable(self.model, self.conflict_target)
+
+        partition_router = await aget_partition_router(
+            self.model,
+            using or self._db or router.db_for_write(self.model, **self._hints),  # type: ignore[attr-defined]
+        )
+
+        return list(partition_router.route(rows).items())
+
+    def _bulk_insert_routed_chunk(
+        self,
+        rows: List[Dict[str, Any]],
+        return_model: bool,
+        *,
+        partition_table_name: Optional[str],
+        **kwargs,
+    ):
+        """Inserts the specified rows into the partition they were routed
+        to, see :see:_bulk_insert_chunk.
+
+        The partition might have been dropped by another
+        process after the router was built. The router is
+        then invalidated and the rows are inserted into the
+        partitioned table itself, which routes them.
+        """
+
+        if partition_table_name is None:
+            return self._bulk_insert_chunk(
+                rows, return_model, partition_table_name=None, **kwargs
+            )
+
+        using = kwargs["using"] or self._db or router.db_for_write(self.model, **self._hints)  # type: ignore[attr-defined]
+
+        try:
+            # in a savepoint, so that the transaction
+            # can go on when the partition is gone
+            with transaction.atomic(using=using):
+                return self._bulk_insert_chunk(
+                    rows,
+                    return_model,
+                    partition_table_name=partition_table_name,
+                    **kwargs,
+                )
+        except ProgrammingError as error:
+            if not is_undefined_table_error(error):
+                raise
+
+        partition_router_cache.invalidate(self.model)
+
+        return self._bulk_insert_chunk(
+            rows, return_model, partition_table_name=None, **kwargs
+        )
+
+    async def _abulk_insert_routed_chunk(
+        self,
+        rows: List[Dict[str, Any]],
+        return_model: bool,
+        *,
+        partition_table_name: Optional[str],
+        **kwargs,
+    ):
+        """Async version of :see:_bulk_insert_routed_chunk."""
+
+        if partition_table_name is not None:
+            try:
+                return await self._abulk_insert_chunk(
+                    rows,
+                    return_model,
+                    partition_table_name=partition_table_name,
+                    **kwargs,
+                )
+            except Exception as error:
+                if not is_undefined_table_error(error):
+                    raise
+
+            partition_router_cache.invalidate(self.model)
+
+        return await self._abulk_insert_chunk(
+            rows, return_model, partition_table_name=None, **kwargs
+        )
+
+    async def _abulk_insert_chunks(
+        self,
+        rows: Optional[Iterable[Dict[str, Any]]],
+        return_model: bool,
+        *,
+        using: Optional[str],
+        engine: InsertEngine,
+        batch_size: Optional[int],
+        max_params: Optional[int],
+        dedupe: Optional[Union[DedupePolicy, str, DedupeMergeFunc]],
+        prepare: bool,
+        returning: Optional[Union[str, List[str]]],
+        return_outcome: bool,
+        raw: bool,
+        sort: bool,
+        route_to_partitions: bool,
+    ) -> AsyncGenerator[Union[List[Any], int], None]:
+        """Async version of :see:_bulk_insert_chunks."""
+
+        for chunk in self._split_bulk_insert_rows(
+            rows,
+            engine=engine,
+            batch_size=batch_size,
+            max_params=max_params,
+            using=using,
+            raw=raw,
+        ):
+            # resolved here, building the query would resolve
+            # them with a blocking query otherwise
+            chunk = await self._aresolve_related_lookups(chunk, using)
+
+            for (
+                partition_table_name,
+                partition_rows,
+            ) in await self._aroute_bulk_insert_rows(
+                chunk, using=using, route_to_partitions=route_to_partitions
+            ):
+                yield await self._abulk_insert_routed_chunk(
+                    partition_rows,
+                    return_model,
+                    using=using,
+                    engine=engine,
+                    dedupe=dedupe,
+                    prepare=prepare,
+                    returning=returning,
+                    return_outcome=return_outcome,
+                    raw=raw,
+                    sort=sort,
+                    partition_table_name=partition_table_name,
+                )
+
+    async def _abulk_insert_chunk(
+        self,
+        rows: List[Dict[str, Any]],
+        return_model: bool,
+        *,
+        using: Optional[str],
+        engine: InsertEngine,
+        dedupe: Optional[Union[DedupePolicy, str, DedupeMergeFunc]],
+        prepare: bool,
+        returning: Optional[Union[str, List[str]]],
+        return_outcome: bool,
+        raw: bool,
+        sort: bool,
+        partition_table_name: Optional[str],
+    ):
+        """Async version of :see:_bulk_insert_chunk."""
+
+        # a plain insert without conflict handling, see :see:_ainsert_row,
+        # returns model instances like bulk_create(..) does
+        if not self.conflict_target and not self.conflict_action:
+            rows = self._fill_plain_insert_rows(rows)
+            dedupe = None
+            sort = False
+            return_model = True
+
+        compiler, deduped_rows, reordered = self._build_bulk_insert_compiler(
+            rows,
+            using=using,
+            engine=engine,
+            dedupe=dedupe,
+            returning=returning,
+            return_outcome=return_outcome,
+            raw=raw,
+            sort=sort,
+            partition_table_name=partition_table_name,
+        )
+
+        if compiler.query.engine == InsertEngine.COPY:
+            cursor = await self._aexecute_compiler_with_copy(
+                compiler, return_id=not return_model
+            )
+        else:
+            cursor = await self._aexecute_compiler(
+                compiler, return_id=not return_model, prepare=prepare
+            )
+
+        result = self._consume_insert_cursor(
+            cursor, compiler, deduped_rows, return_model
+        )
+
+        if return_outcome:
+            result.reordered = reordered
+            result.skipped += len(rows) - len(deduped_rows)
+
+        return result
+
+    @staticmethod
+    async def _aexecute_compiler(
+        compiler, *, return_id: bool, prepare: bool
+    ) -> FetchedCursor:
+        """Executes the insert built by the specified compiler on a psycopg 3
+        async connection and fetches the results."""
+
+        async with async_connection(compiler.using) as aconnection:
+            async with async_cursor(aconnection, prepare=prepare) as acursor:
+                for sql, params in compiler.as_sql(return_id=return_id):
+                    await acursor.execute(sql, params, prepare=prepare or None)
+
+                return await FetchedCursor.fetch(acursor)
+
+    async def _aexecute_compiler_with_copy(
+        self, compiler, *, return_id: bool
+    ) -> FetchedCursor:
+        """Async version of :see:_execute_insert_with_copy."""
+
+        columns, value_rows = self._prepare_staging_table(compiler)
+        qn = compiler.connection.ops.quote_name
+
+        async with async_connection(compiler.using) as aconnection:
+            async with aconnection.transaction():
+                async with aconnection.cursor() as acursor:
+                    await acursor.execute(
+                        compiler.as_create_staging_table_sql()
+                    )
+                    await acopy_rows_to_table(
+                        acursor, qn, STAGING_TABLE_NAME, columns, value_rows
+                    )
+
+                    (sql, params), *_ = compiler.as_sql(return_id=return_id)
+                    await acursor.execute(sql, params)
+                    result = await FetchedCursor.fetch(acursor)
+
+                    await acursor.execute(
+                        "DROP TABLE %s" % qn(STAGING_TABLE_NAME)
+                    )
+
+        return result
+
+    def _get_bulk_insert_chunk_size(
+        self,
+        engine: InsertEngine,
+        batch_size: Optional[int],
+        max_params: Optional[int],
+        first_row: Dict[str, Any],
+        *,
+        using: Optional[str],
+        raw: bool,
+    ) -> Optional[int]:
+        """Gets the maximum amount of rows to insert in a single query, or
+        None if all rows should be inserted at once."""
+
+        if batch_size is not None and batch_size < 1:
+            raise SuspiciousOperation("batch_size must be 1 or larger.")
+
+        # neither engine sends a parameter per value
+        if not max_params or engine in (
+            InsertEngine.COPY,
+            InsertEngine.UNNEST,
+        ):
+            return batch_size
+
+        query_params, row_params = self._count_insert_params(
+            first_row, using=using, raw=raw
+        )
+
+        max_rows = (max_params - query_params) // row_params
+        if max_rows < 1:
+            raise SuspiciousOperation(
+                (
+                    "max_params=%d is too small to insert a single "
+                    "row with %d parameters."
+                )
+                % (max_params, query_params + row_params)
+            )
+
+        if batch_size:
+            return min(batch_size, max_rows)
+
+        return max_rows
+
+    def _count_insert_params(
+        self, row: Dict[str, Any], *, using: Optional[str], raw: bool
+    ) -> Tuple[int, int]:
+        """Counts the parameters an insert of rows like the specified row
+        sends.
+
+        Returns:
+            The amount of parameters the query sends regardless
+            of the amount of rows, such as the parameters of
+            `update_values`, `update_condition` and
+            `index_predicate`, and the amount of parameters
+            every row adds, including those of expressions
+            in the rows.
+        """
+
+        # the standard Django bulk_create(..) is used, every
+        # row can at most specify all concrete fields
+        if not self.conflict_target and not self.conflict_action:
+            return 0, len(self.model._meta.local_concrete_fields) or 1
+
+        # lookups of related rows are resolved to a single
+        # value before inserting, without querying for them
+        row = {
+            key: (
+                None
+                if isinstance(value, dict)
+                and getattr(self._get_raw_row_field(key), "is_relation", False)
+                else value
+            )
+            for key, value in row.items()
+        }
+
+        # compile the insert of one and of two rows, the
+        # difference is what every row adds
+        one_row_params, two_rows_params = (
+            sum(
+                len(params)
+                for _, params in self._build_insert_compiler(
+                    [row] * row_count, using=using, raw=raw
+                ).as_sql()
+            )
+            for row_count in (1, 2)
+        )
+
+        row_params = max(two_rows_params - one_row_params, 1)
+        return one_row_params - row_params, row_params
+
+    def _bulk_insert_chunk(
+        self,
+        rows: List[Dict[str, Any]],
+        return_model: bool,
+        *,
+        using: Optional[str],
+        engine: InsertEngine,
+        dedupe: Optional[Union[DedupePolicy, str, DedupeMergeFunc]],
+        prepare: bool,
+        returning: Optional[Union[str, List[str]]],
+        return_outcome: bool,
+        raw: bool,
+        sort: bool,
+        partition_table_name: Optional[str],
+    ):
+        """Inserts the specified rows in a single query."""
+
+        if not self.conflict_target and not self.conflict_action:
+            # no special action required, use the standard Django bulk_create(..)
+            objs = super().bulk_create(
+                [
+                    self.model(**fields)
+                    for fields in self._resolve_related_lookups(rows, using)
+                ]
+            )
+
+            if return_outcome:
+                return UpsertResult(
+                    rows=[] if returning is None else objs,
+                    outcomes=[UpsertOutcome.INSERTED] * len(objs),
+                )
+
+            return len(objs) if returning is None else objs
+
+        compiler, deduped_rows, reordered = self._build_bulk_insert_compiler(
+            rows,
+            using=using,
+            engine=engine,
+            dedupe=dedupe,
+            returning=returning,
+            return_outcome=return_outcome,
+            raw=raw,
+            sort=sort,
+            partition_table_name=partition_table_name,
+        )
+
+        if compiler.query.engine == InsertEngine.COPY:
+            result = self._execute_insert_with_copy(
+                compiler, deduped_rows, return_model
+            )
+        else:
+            with compiler.connection.cursor() as cursor:
+                for sql, params in compiler.as_sql(return_id=not return_model):
+                    self._execute(cursor, sql, params, prepare=prepare)
+
+                result = self._consume_insert_cursor(
+                    cursor, compiler, deduped_rows, return_model
+                )
+
+        if return_outcome:
+            result.reordered = reordered
+            result.skipped += len(rows) - len(deduped_rows)
+
+        return result
+
+    def _build_bulk_insert_compiler(
+        self,
+        rows: List[Dict[str, Any]],
+        *,
+        using: Optional[str],
+        engine: InsertEngine,
+        dedupe: Optional[Union[DedupePolicy, str, DedupeMergeFunc]],
+        returning: Optional[Union[str, List[str]]],
+        return_outcome: bool,
+        raw: bool,
+        sort: bool,
+        partition_table_name: Optional[str],
+    ):
+        """Builds the SQL compiler for inserting the specified rows in a
+        single query.
+
+        Returns:
+            The SQL compiler, the rows that are actually going
+            to be inserted after de-duplication and sorting and
+            the amount of rows that changed position when sorting.
+        """
+
+        # a real ON CONFLICT DO NOTHING does not mind rows that
+        # conflict with each other, but we would not be able to
+        # tell which of the rows were inserted
+        if dedupe is None and self.conflict_action == ConflictAction.NOTHING:
+            dedupe = DedupePolicy.KEEP_FIRST
+
+        # ON CONFLICT DO UPDATE barfs when the same row is updated twice:
+        #
+        # > "cannot affect row a second time"
+        #
+        # de-duplicating based on the conflict target makes that work
+        deduped_rows = rows = self._resolve_related_lookups(rows, using)
+        if dedupe is not None:
+            deduped_rows = dedupe_rows(
+                rows,
+                build_conflict_key_getter(self.model, self.conflict_target),
+                dedupe,
+            )
+
+        # concurrent inserts that lock the same rows in a
+        # different order can deadlock, always lock them
+        # in the order of the conflict target
+        reordered = 0
+        if sort:
+            if not get_conflict_target_fields(self.model, self.conflict_target):
+                raise SuspiciousOperation(
+                    (
+                        "Cannot sort by conflict target %s, it does not "
+                        "consist of fields."
+                    )
+                    % str(self.conflict_target)
+                )
+
+            deduped_rows, reordered = sort_rows(
+                deduped_rows,
+                build_conflict_key_getter(self.model, self.conflict_target),
+            )
+
+        compiler = self._build_insert_compiler(
+            deduped_rows, using=using, raw=raw
+        )
+        compiler.query.engine = engine
+        compiler.query.returning = returning
+        compiler.query.return_outcome = return_outcome
+        compiler.query.partition_table_name = partition_table_name
+
+        # rows that were skipped are not returned, return the
+        # conflict target to match the returned rows by
+        if returning is not None or return_outcome:
+            compiler.query.return_key_fields = (
+                get_conflict_target_fields(self.model, self.conflict_target)
+                or []
+            )
+
+            if not compiler.query.return_key_fields and self._may_skip_rows(
+                compiler
+            ):
+                raise SuspiciousOperation(
+                    (
+                        "Cannot tell which rows were returned, conflict "
+                        "target %s does not consist of fields and rows "
+                        "might be skipped. Specify the fields as the "
+                        "conflict target or do not return anything."
+                    )
+                    % str(self.conflict_target)
+                )
+
+        return compiler, deduped_rows, reordered
+
+    def _may_skip_rows(self, compiler) -> bool:
+        """Gets whether the insert built by the specified compiler might
+        neither insert nor update some of the rows.
+
+        Those rows are not returned, the returned rows then
+        cannot be matched to the inserted rows by position.
+        """
+
+        if not self.conflict_action:
+            return False
+
+        return (
+            self.conflict_action == ConflictAction.NOTHING
+            or self.conflict_update_condition is not None
+            or self.skip_unchanged
+            # falls back to DO NOTHING, see the compiler
+            or not compiler.query.update_values
+        )
+
+    def _execute_insert_with_copy(
+        self, compiler, rows: List[Dict[str, Any]], return_model: bool
+    ):
+        """Executes a bulk insert by copying the rows into a temporary staging
+        table first and then inserting them all at once from the staging
+        table.
+
+        The staging table only lives for the duration of this
+        insert. Everything happens in a transaction so that the
+        staging table is never visible outside of it.
+        """
+
+        columns, value_rows = self._prepare_staging_table(compiler)
+
+        with transaction.atomic(using=compiler.using):
+            with compiler.connection.cursor() as cursor:
+                cursor.execute(compiler.as_create_staging_table_sql())
+                copy_rows_to_table(
+                    cursor, STAGING_TABLE_NAME, columns, value_rows
+                )
+
+                (sql, params), *_ = compiler.as_sql(return_id=not return_model)
+                cursor.execute(sql, params)
+
+                result = self._consume_insert_cursor(
+                    cursor, compiler, rows, return_model
+                )
+
+            # consuming the cursor might have closed it, the
+            # staging table has to be dropped with a new one
+            with compiler.connection.cursor() as cursor:
+                cursor.execute(
+                    "DROP TABLE %s"
+                    % compiler.connection.ops.quote_name(STAGING_TABLE_NAME)
+                )
+
+        return result
+
+    @staticmethod
+    def _prepare_staging_table(compiler) -> Tuple[List[str], Iterable[list]]:
+        """Configures the compiler to insert from the staging table and gets
+        the columns and values to copy into the staging table."""
+
+        compiler.query.staging_table_name = STAGING_TABLE_NAME
+        columns = [STAGING_ORDINAL_COLUMN] + [
+            field.column for field in compiler.query.fields
+        ]
+
+        value_rows = (
+            [ordinal] + value_row
+            for ordinal, value_row in enumerate(compiler.prepare_value_rows())
+        )
+
+        return columns, value_rows
+
+    @staticmethod
+    def _normalize_returning(
+        returning: Optional[Union[str, List[str]]]
+    ) -> Optional[Union[str, List[str]]]:
+        """Normalizes what to return for inserted rows, an empty list of
+        columns means nothing is returned, just like None."""
+
+        if returning is not NOT_PROVIDED and not returning:
+            return None
+
+        return returning
+
+    @classmethod
+    def _get_insert_result(
+        cls,
+        cursor: CursorWrapper,
+        returning: Optional[Union[str, List[str]]],
+        return_outcome: bool = False,
+    ):
+        """Gets what to return for a single inserted row from the cursor the
+        insert was executed on."""
+
+        if return_outcome:
+            fetched_cursor, _, outcomes = match_returned_rows(
+                cursor, [{}], return_outcome=True
+            )
+            result = cls._get_insert_result(fetched_cursor, returning)
+
+            return UpsertResult(
+                rows=[] if returning is None or result is None else [result],
+                outcomes=outcomes,
+                skipped=outcomes.count(UpsertOutcome.SKIPPED),
+            )
+
+        if returning is None:
+            return cursor.rowcount
+
+        row = cursor.fetchone()
+        if not row:
+            return None
+
+        if returning is not NOT_PROVIDED:
+            return {
+                column.name: value
+                for column, value in zip(cursor.description, row)
+            }
+
+        return row[0]
+
+    def _consume_insert_cursor(
+        self,
+        cursor: CursorWrapper,
+        compiler,
+        rows: List[Dict[str, Any]],
+        return_model: bool,
+    ):
+        """Gets what to return for the rows inserted by a bulk insert from the
+        cursor the insert was executed on."""
+
+        query = compiler.query
+        if query.returning is None and not query.return_outcome:
+            return cursor.rowcount
+
+        fetched_cursor, matched_rows, outcomes = match_returned_rows(
+            cursor,
+            rows,
+            return_outcome=query.return_outcome,
+            **self._get_returned_key_getters(query.return_key_fields),
+        )
+
+        inserted_rows = (
+            self._consume_inserted_rows(
+                fetched_cursor, matched_rows, return_model
+            )
+            if query.returning is not None
+            else []
+        )
+
+        if not query.return_outcome:
+            return inserted_rows
+
+        return UpsertResult(
+            rows=inserted_rows,
+            outcomes=outcomes,
+            skipped=outcomes.count(UpsertOutcome.SKIPPED),
+        )
+
+    def _get_returned_key_getters(
+        self, target_fields: List[Tuple[models.Field, Optional[str]]]
+    ) -> Dict[str, Any]:
+        """Gets the arguments for :see:match_returned_rows to match returned
+        rows to inserted rows by the values of the specified fields (and
+        hstore keys)."""
+
+        if not target_fields:
+            return {}
+
+        # the keys of the rows are normalized the same way
+        return dict(
+            key_count=len(target_fields),
+            get_row_key=build_conflict_key_getter(
+                self.model,
+                [
+                    (field.name, hstore_key)
+                    if hstore_key is not None
+                    else field.name
+                    for field, hstore_key in target_fields
+                ],
+            ),
+            get_returned_key=lambda key: normalize_conflict_key(
+                target_fields, key
+            ),
+        )
+
+    def _consume_inserted_rows(
+        self,
+        cursor: CursorWrapper,
+        rows: List[Dict[str, Any]],
+        return_model: bool,
+    ) -> List[Any]:
+        """Gets the models or dicts of the rows returned by a bulk
+        insert."""
+
+        if return_model:
+            return list(models_from_cursor(self.model, cursor))
+
+        return self._consume_cursor_as_dicts(cursor, original_rows=rows)
+
+    @staticmethod
+    def _execute(
+        cursor: CursorWrapper, sql: str, params, *, prepare: bool
+    ) -> None:
+        """Executes the specified SQL, optionally as a prepared statement."""
+
+        if not prepare:
+            cursor.execute(sql, params)
+            return
+
+        get_prepared_statement_cache(cursor.db).execute(cursor, sql, params)
+
+    @staticmethod
+    def _consume_cursor_as_dicts(
+        cursor: CursorWrapper, *, original_rows: Iterable[Dict[str, Any]]
+    ) -> List[dict]:
+        cursor_description = cursor.description
+
+        return [
+            {
+                **original_row,
+                **{
+                    column.name: row[column_index]
+                    for column_index, column in enumerate(cursor_description)
+                    if row
+                },
+            }
+            for original_row, row in zip(original_rows, cursor)
+        ]
+
+    def _adaptive_bulk_upsert(
+        self,
+        rows: Iterable[Dict[str, Any]],
+        *,
+        using: Optional[str],
+        engine: InsertEngine,
+        batch_size: Optional[int],
+        max_params: Optional[int],
+        dedupe: Optional[Union[DedupePolicy, str, DedupeMergeFunc]],
+        prepare: bool,
+        raw: bool,
+        sort: bool,
+        route_to_partitions: bool,
+    ) -> int:
+        """Upserts the specified rows batch by batch, picking the strategy
+        for every batch based on the conflict ratio observed so far.
+
+        See `bulk_upsert(adaptive=True)`.
+        """
+
+        using = using or self._db or router.db_for_write(self.model, **self._hints)  # type: ignore[attr-defined]
+        tracker = get_conflict_ratio_tracker(
+            self.model, self.conflict_target, using
+        )
+
+        target_fields = get_conflict_target_fields(
+            self.model, self.conflict_target
+        )
+
+        # updating first only does the same as the upsert when
+        # the rows are written as they are, into the whole table
+        can_update_first = (
+            engine != InsertEngine.COPY
+            and not route_to_partitions
+            and self.update_values is None
+            and self.conflict_update_condition is None
+            and self.index_predicate is None
+            and not self.skip_unchanged
+            and bool(target_fields)
+            and all(hstore_key is None for _, hstore_key in target_fields)
+        )
+
+        get_key = (
+            self._build_row_key_getter(self.conflict_target)
+            if can_update_first
+            else None
+        )
+        key_fields = [field for field, _ in target_fields or []]
+        key_names = [field.name for field in key_fields]
+        get_conflict_key = build_conflict_key_getter(
+            self.model, self.conflict_target
+        )
+
+        def _upsert(batch: List[Dict[str, Any]]) -> UpsertResult:
+            return self.bulk_insert(
+                batch,
+                using=using,
+                engine=engine,
+                max_params=max_params,
+                prepare=prepare,
+                returning=None,
+                return_outcome=True,
+                raw=raw,
+                sort=sort,
+                route_to_partitions=route_to_partitions,
+            )
+
+        affected_rows = 0
+
+        for batch in self._split_bulk_insert_rows(
+            rows,
+            engine=engine,
+            batch_size=batch_size,
+            max_params=max_params,
+            using=using,
+            raw=raw,
+        ):
+            # the rows are de-duplicated and sorted the same way
+            # the upsert does it, whichever strategy is chosen
+            batch = self._resolve_related_lookups(batch, using)
+            if dedupe is not None:
+                batch = dedupe_rows(batch, get_conflict_key, dedupe)
+
+            if sort and target_fields:
+                batch, _ = sort_rows(batch, get_conflict_key)
+
+            # the upsert fails on rows that conflict with each other,
+            # updating would silently apply only one of them
+            keys = [get_key(row) for row in batch] if get_key else []
+            non_null_keys = [key for key in keys if key is not None]
+            has_duplicates = len(set(non_null_keys)) < len(non_null_keys)
+
+            # update the same fields the upsert would, including
+            # fields set by `pre_save`, such as `auto_now`
+            _, update_values = self._get_cached_upsert_fields(batch[0])
+            update_fields = [
+                name
+                for name in update_values
+                if self._get_raw_row_field(name) not in key_fields
+            ]
+
+            if (
+                get_key
+                and update_fields
+                and not has_duplicates
+                and tracker.choose() == UpsertStrategy.UPDATE_FIRST
+            ):
+                updated_keys = {
+                    get_key(row)
+                    for row in self.bulk_update_values(
+                        batch,
+                        key=key_names,
+                        fields=update_fields,
+                        using=using,
+                        engine=engine,
+                        returning=key_names,
+                        raw=raw,
+                    )
+                }
+
+                # rows can still conflict with rows that were
+                # inserted concurrently, so keep upserting
+                missing_rows = [
+                    row
+                    for row, key in zip(batch, keys)
+                    if key not in updated_keys
+                ]
+                result = _upsert(missing_rows) if missing_rows else None
+
+                conflicts = len(updated_keys)
+                affected_rows += len(updated_keys)
+            else:
+                result = _upsert(batch)
+                conflicts = 0
+
+            if result is not None:
+                conflicts += result.updated + result.skipped
+                affected_rows += result.inserted + result.updated
+
+            tracker.observe(conflicts, len(batch))
+
+        return affected_rows
+
+    def _build_row_key_getter(
+        self, conflict_target: ConflictTarget
+    ) -> ConflictKeyGetter:
+        """Builds a function that gets the values of the conflict target from
+        a row as a key that compares equal to the key of the same row read
+        back from the database.
+
+        The key is None for rows that have NULL in one of
+        the fields of the conflict target.
+        """
+
+        target_fields = get_conflict_target_fields(self.model, conflict_target)
+        if not target_fields or any(
+            hstore_key is not None for _, hstore_key in target_fields
+        ):
+            raise SuspiciousOperation(
+                (
+                    "Cannot find rows by conflict target %s, it "
+                    "does not consist of fields."
+                )
+                % str(conflict_target)
+            )
+
+        return build_conflict_key_getter(self.model, conflict_target)
+
+    def _build_insert_compiler(
+        self,
+        rows: Iterable[Dict],
+        using: Optional[str] = None,
+        raw: bool = False,
+        query_class: Type[PostgresInsertQuery] = PostgresInsertQuery,
+    ):
+        """Builds the SQL compiler for a insert query.
+
+        Arguments:
+            rows:
+                An iterable of dictionaries, where each entry
+                describes a record to insert.
+
+            using:
+                The name of the database connection to use
+                for this query.
+
+            raw (default: False):
+                Whether to skip creating model instances
+                for the rows. See :see:bulk_insert.
+
+            query_class:
+                The type of query to build, for example
+                :see:PostgresMergeQuery.
+
+        Returns:
+            The SQL compiler for the insert.
+        """
+
+        # ask the db router which connection to use
+        using = (
+            using or self._db or router.db_for_write(self.model, **self._hints)  # type: ignore[attr-defined]
+        )
+
+        rows_iter = iter(self._resolve_related_lookups(rows, using))
+        first_row = next(rows_iter)
+
+        insert_fields, update_values = self._get_cached_upsert_fields(first_row)
+
+        build_obj = (
+            self._build_raw_insert_obj_factory(first_row, insert_fields)
+            if raw
+            else self._build_insert_obj_factory(using)
+        )
+
+        # create model objects, we also have to detect cases
+        # such as:
+        #   [dict(first_name='swen'), dict(fist_name='swen', last_name='kooij')]
+        # we need to be certain that each row specifies the exact same
+        # amount of fields/columns
+        objs = []
+        field_count = len(first_row)
+        for index, row in enumerate(chain([first_row], rows_iter)):
+            if field_count != len(row):
+                raise SuspiciousOperation(
+                    (
+                        "In bulk upserts, you cannot have rows with different field "
+                        "configurations. Row {0} has a different field config than "
+                        "the first row."
+                    ).format(index)
+                )
+
+            objs.append(build_obj(row))
+
+        # allow the user to override what should happen on update
+        if self.update_values is not None:
+            update_values = self.update_values
+
+        # build a normal insert query
+        query = query_class(self.model)
+        query.conflict_action = self.conflict_action
+        query.conflict_target = self.conflict_target
+        query.conflict_update_condition = self.conflict_update_condition
+        query.index_predicate = self.index_predicate
+        query.skip_unchanged = self.skip_unchanged
+        query.insert_on_conflict_values(objs, insert_fields, update_values)
+
+        # fields set by `pre_save`, such as `auto_now`, always
+        # change, only compare the fields that were specified
+        if self.skip_unchanged and self.update_values is None:
+            specified_fields = {
+                self._get_raw_row_field(key) for key in first_row
+            }
+            query.skip_unchanged_fields = [
+                name
+                for name in update_values
+                if self._get_raw_row_field(name) in specified_fields
+            ]
+
+        compiler = query.get_compiler(using)
+        return compiler
+
+    def _fill_plain_insert_rows(
+        self, rows: Iterable[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Fills in the fields that the specified rows do not specify, the
+        way `bulk_create(..)` would, so that rows that specify different
+        fields can be inserted in a single query."""
+
+        fields = self.model._meta.local_concrete_fields  # type: ignore[attr-defined]
+
+        filled_rows = []
+        for row in self._resolve_related_lookups(rows):
+            obj = self.model(**row)
+            filled_rows.append(
+                {
+                    field.attname: getattr(obj, field.attname)
+                    for field in fields
+                    if not field.primary_key
+                    or getattr(obj, field.attname) is not None
+                }
+            )
+
+        return filled_rows
+
+    def _resolve_related_lookups(
+        self, rows: Iterable[Dict[str, Any]], using: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Replaces values of foreign keys that are lookups on the related
+        model with the primary key (or `to_field`) of the related row.
+
+        Like:
+
+            dict(customer=dict(external_id="x"))
+
+        Becomes:
+
+            dict(customer_id=1)
+
+        The lookups on every related model are resolved with a
+        single query, see :see:_build_related_lookups_queryset,
+        rather than with a subquery for every row. The foreign
+        key is set by its attribute name in all rows to keep the
+        rows alike.
+
+        Raises:
+            ObjectDoesNotExist:
+                When a lookup matches no row.
+
+            MultipleObjectsReturned:
+                When a lookup matches more than one row.
+        """
+
+        rows = list(rows)
+        related_lookups = self._collect_related_lookups(rows)
+        if not related_lookups:
+            return rows
+
+        using = using or self._db or router.db_for_write(self.model, **self._hints)  # type: ignore[attr-defined]
+
+        related_keys = {}
+        for key, lookups in related_lookups.items():
+            field = self._get_raw_row_field(key)
+            queryset = self._build_related_lookups_queryset(field, lookups)
+
+            related_keys[key] = self._match_related_lookups(
+                field, lookups, queryset.using(using)
+            )
+
+        return self._apply_related_keys(rows, related_lookups, related_keys)
+
+    async def _aresolve_related_lookups(
+        self, rows: Iterable[Dict[str, Any]], using: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Async version of :see:_resolve_related_lookups."""
+
+        rows = list(rows)
+        related_lookups = self._collect_related_lookups(rows)
+        if not related_lookups:
+            return rows
+
+        using = using or self._db or router.db_for_write(self.model, **self._hints)  # type: ignore[attr-defined]
+
+        related_keys = {}
+        async with async_connection(using) as aconnection:
+            async with aconnection.cursor() as acursor:
+                for key, lookups in related_lookups.items():
+                    field = self._get_raw_row_field(key)
+                    queryset = self._build_related_lookups_queryset(
+                        field, lookups
+                    )
+                    await acursor.execute(
+                        *queryset.query.get_compiler(using).as_sql()
+                    )
+
+                    related_keys[key] = self._match_related_lookups(
+                        field, lookups, await acursor.fetchall()
+                    )
+
+        return self._apply_related_keys(rows, related_lookups, related_keys)
+
+    def _collect_related_lookups(
+        self, rows: List[Dict[str, Any]]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Collects the distinct lookups on related models in the specified
+        rows, by the key of the foreign key in the rows."""
+
+        related_lookups: Dict[str, List[Dict[str, Any]]] = {}
+        for key in rows[0] if rows else []:
+            field = self._get_raw_row_field(key)
+            if not field or not field.is_relation:
+                continue
+
+            # rows often refer to the same related rows
+            lookups: List[Dict[str, Any]] = []
+            cache_keys: Set[Hashable] = set()
+
+            for row in rows:
+                lookup = row.get(key)
+                if not isinstance(lookup, dict):
+                    continue
+
+                cache_key = make_cache_key(field.name, lookup)
+                if cache_key is None or cache_key not in cache_keys:
+                    lookups.append(lookup)
+                    cache_keys.add(cache_key)
+
+            if lookups:
+                related_lookups[key] = lookups
+
+        return related_lookups
+
+    def _build_related_lookups_queryset(
+        self, field: models.Field, lookups: List[Dict[str, Any]]
+    ) -> QuerySet:
+        """Builds the query that selects the rows the specified lookups on
+        the related model match.
+
+        Every lookup is a query of its own, combined with
+        `UNION ALL`, that selects the key of the rows it
+        matches along with the index of the lookup. Django
+        puts the selected fields before the annotations, the
+        async version relies on that order.
+        """
+
+        related_model = field.related_model  # type: ignore[attr-defined]
+        target_attname = field.target_field.attname  # type: ignore[attr-defined]
+
+        querysets = [
+            related_model._base_manager.filter(**lookup)
+            .order_by()
+            .annotate(
+                psqlextra_lookup=Value(
+                    index, output_field=models.IntegerField()
+                )
+            )
+            .values_list(target_attname, "psqlextra_lookup")
+            for index, lookup in enumerate(lookups)
+        ]
+
+        return querysets[0].union(*querysets[1:], all=True)
+
+    @staticmethod
+    def _match_related_lookups(
+        field: models.Field,
+        lookups: List[Dict[str, Any]],
+        matches: Iterable[Tuple[Any, int]],
+    ) -> List[Any]:
+        """Gets the key of the row every lookup matched, from the rows
+        selected by :see:_build_related_lookups_queryset."""
+
+        related_model = field.related_model  # type: ignore[attr-defined]
+
+        keys: Dict[int, List[Any]] = {}
+        for key, index in matches:
+            keys.setdefault(index, []).append(key)
+
+        for index, lookup in enumerate(lookups):
+            if index not in keys:
+                raise related_model.DoesNotExist(
+                    "%s matching %r for '%s' does not exist."
+                    % (related_model._meta.object_name, lookup, field.name)
+                )
+
+            if len(keys[index]) > 1:
+                raise related_model.MultipleObjectsReturned(
+                    "%d %s rows match %r for '%s', it should be one."
+                    % (
+                        len(keys[index]),
+                        related_model._meta.object_name,
+                        lookup,
+                        field.name,
+                    )
+                )
+
+        return [keys[index][0] for index in range(len(lookups))]
+
+    def _apply_related_keys(
+        self,
+        rows: List[Dict[str, Any]],
+        related_lookups: Dict[str, List[Dict[str, Any]]],
+        related_keys: Dict[str, List[Any]],
+    ) -> List[Dict[str, Any]]:
+        """Replaces the lookups in the specified rows with the keys of the
+        rows they matched."""
+
+        # uncacheable lookups are compared by identity, every
+        # one of them was collected separately
+        fields = {key: self._get_raw_row_field(key) for key in related_lookups}
+        indexes = {
+            key: {
+                make_cache_key(fields[key].name, lookup) or id(lookup): index
+                for index, lookup in enumerate(lookups)
+            }
+            for key, lookups in related_lookups.items()
+        }
+
+        resolved_rows = []
+        for row in rows:
+            row = dict(row)
+            for key, field in fields.items():
+                value = row.pop(key)
+
+                if isinstance(value, dict):
+                    value = related_keys[key][
+                        indexes[key][
+                            make_cache_key(field.name, value) or id(value)
+                        ]
+                    ]
+                elif isinstance(value, models.Model):
+                    value = getattr(value, field.target_field.attname)  # type: ignore[attr-defined]
+
+                row[field.attname] = value
+
+            resolved_rows.append(row)
+
+        return resolved_rows
+
+    def _build_insert_obj_factory(
+        self, using: str
+    ) -> Callable[[Dict[str, Any]], models.Model]:
+        """Builds a function that creates the model instance to insert for a
+        row."""
+
+        def _build_obj(row: Dict[str, Any]) -> models.Model:
+            obj = self.model(**row.copy())
+            obj._state.db = using
+            obj._state.adding = False
+            return obj
+
+        return _build_obj
+
+    def _build_raw_insert_obj_factory(
+        self, first_row: Dict[str, Any], insert_fields: List[models.Field]
+    ) -> Callable[[Dict[str, Any]], RawRow]:
+        """Builds a function that creates a :see:RawRow to insert for a row
+        instead of a model instance.
+
+        Which key of the row goes into which attribute is
+        figured out once, using the first row.
+        """
+
+        attnames = {}
+        for key in first_row:
+            field = self._get_raw_row_field(key)
+            if not field:
+                raise SuspiciousOperation(
+                    "'%s' is not a field of '%s'." % (key, self.model.__name__)
+                )
+
+            attnames[key] = field.attname
+
+        # fields that are inserted but not specified in
+        # the rows, such as fields with a default
+        defaults = [
+            (field.attname, field.get_default)
+            for field in insert_fields
+            if field.attname not in attnames.values()
+        ]
+
+        def _build_obj(row: Dict[str, Any]) -> RawRow:
+            obj = RawRow()
+            obj.__dict__.update(
+                (attname, get_default()) for attname, get_default in defaults
+            )
+
+            try:
+                obj.__dict__.update(
+                    (attnames[key], value) for key, value in row.items()
+                )
+            except KeyError as e:
+                raise SuspiciousOperation(
+                    (
+                        "In bulk upserts, you cannot have rows with different field "
+                        "configurations. Field '%s' is not in the first row."
+                    )
+                    % e.args[0]
+                )
+
+            return obj
+
+        return _build_obj
+
+    def _get_raw_row_field(self, key: str) -> Optional[models.Field]:
+        """Gets the concrete field a key in a row refers to, by name,
+        attribute name or column name."""
+
+        meta = self.model._meta
+        if key == "pk":
+            return meta.pk
+
+        for field in meta.local_concrete_fields:
+            if key in (field.name, field.attname, field.column):
+                return field
+
+        return None
+
+    def _pre_save_field(
+        self,
+        model_instance: models.Model,
+        field: models.Field,
+        *,
+        is_insert: bool,
+    ):
+        """Pre-saves the model and gets whether the :see:pre_save method makes
+        any modifications to the field value.
+
+        Arguments:
+            model_instance:
+                The model instance the field is defined on.
+
+            field:
+                The field to pre-save.
+
+            is_insert:
+                Pretend whether this is an insert?
+
+        Returns:
+            True when this field modifies something.
+        """
+
+        # does this field modify someting upon insert?
+        old_value = getattr(model_instance, field.name, None)
+        field.pre_save(model_instance, is_insert)
+        new_value = getattr(model_instance, field.name, None)
+
+        return old_value != new_value
+
+    def _get_cached_upsert_fields(self, row: Dict[str, Any]):
+        """Gets the fields to use in an upsert of rows that specify the same
+        fields as the specified row, see :see:_get_upsert_fields."""
+
+        def _get_upsert_field_names():
+            insert_fields, update_values = self._get_upsert_fields(row)
+            return (
+                tuple(field.name for field in insert_fields),
+                tuple(update_values.keys()),
+            )
+
+        # these only depend on which fields were specified, not on
+        # their values, only names are cached so that the cache does
+        # not keep the model alive
+        insert_names, update_names = upsert_fields_cache.get_or_set(
+            make_cache_key(self.model, sorted(row.keys())),
+            _get_upsert_field_names,
+        )
+
+        meta = self.model._meta
+        return (
+            [meta.get_field(name) for name in insert_names],
+            {name: ExcludedCol(meta.get_field(name)) for name in update_names},
+        )
+
+    def _get_upsert_fields(self, kwargs):
+        """Gets the fields to use in an upsert.
+
+        This some nice magic. We'll split the fields into
+        a group of "insert fields" and "update fields":
+
+        INSERT INTO bla ("val1", "val2") ON CONFLICT DO UPDATE SET val1 = EXCLUDED.val1
+
+                         ^^^^^^^^^^^^^^                            ^^^^^^^^^^^^^^^^^^^^
+                         insert_fields                                 update_fields
+
+        Often, fields appear in both lists. But, for example,
+        a :see:DateTime field with `auto_now_add=True` set, will
+        only appear in "insert_fields", since it won't be set
+        on existing rows.
+
+        Other than that, the user specificies a list of fields
+        in the upsert() call. That migt not be all fields. The
+        user could decide to leave out optional fields. If we
+        end up doing an update, we don't want to overwrite
+        those non-specified fields.
+
+        We cannot just take the list of fields the user
+        specifies, because as mentioned, some fields
+        make modifications to the model on their own.
+
+        We'll have to detect which fields make modifications
+        and include them in the list of insert/update fields.
+        """
+
+        insert_fields = []
+        update_values = {}
+
+        insert_model_instance = self.model(**kwargs)
         update_model_instance = self.model(**kwargs)
         for field in insert_model_instance._meta.local_concrete_fields:
             has_default = field.default != NOT_PROVIDED
-            if field.name in kwargs or field.column in kwargs:
+            if (
+                field.name in kwargs
+                or field.attname in kwargs
+                or field.column in kwargs
+            ):
                 insert_fields.append(field)
                 update_values[field.name] = ExcludedCol(field)
                 continue
@@ -9,12 +9,18 @@ from django.db import connections, models
 from django.db.models import Expression, sql
 from django.db.models.constants import LOOKUP_SEP
 from django.db.models.expressions import Ref
-
-from .compiler import PostgresInsertOnConflictCompiler
+from django.db.models.fields import NOT_PROVIDED
+
+from .compiler import (
+    PostgresGetOrCreateCompiler,
+    PostgresInsertOnConflictCompiler,
+    PostgresMergeCompiler,
+    PostgresUpdateFromValuesCompiler,
+)
 from .compiler import SQLUpdateCompiler as PostgresUpdateCompiler
 from .expressions import HStoreColumn
 from .fields import HStoreField
-from .types import ConflictAction
+from .types import ConflictAction, InsertEngine
 
 
 class PostgresQuery(sql.Query):
@@ -176,6 +182,15 @@ class PostgresInsertQuery(sql.InsertQuery):
         self.conflict_update_condition = None
         self.index_predicate = None
         self.update_values = {}
+        self.skip_unchanged = False
+        self.skip_unchanged_fields = None
+
+        self.engine = InsertEngine.VALUES
+        self.staging_table_name = None
+        self.returning = NOT_PROVIDED
+        self.return_outcome = False
+        self.return_key_fields = []
+        self.partition_table_name = None
 
     def insert_on_conflict_values(
         self,
@@ -215,6 +230,60 @@ class PostgresInsertQuery(sql.InsertQuery):
         return PostgresInsertOnConflictCompiler(self, connection, using)
 
 
+class PostgresGetOrCreateQuery(PostgresInsertQuery):
+    """INSERT query using PostgreSQL that also gets the existing rows the
+    rows being inserted conflict with."""
+
+    def get_compiler(self, using=None, connection=None):
+        if using:
+            connection = connections[using]
+        return PostgresGetOrCreateCompiler(self, connection, using)
+
+
+class PostgresMergeQuery(PostgresInsertQuery):
+    """MERGE query using PostgreSQL.
+
+    Merges rows the same way they would be inserted by
+    :see:PostgresInsertQuery, but matches them against the
+    existing rows on arbitrary columns rather than relying
+    on a unique constraint to conflict with.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Initializes a new instance :see:PostgresMergeQuery."""
+
+        super().__init__(*args, **kwargs)
+
+        self.match_on = []
+        self.when_clauses = []
+
+    def get_compiler(self, using=None, connection=None):
+        if using:
+            connection = connections[using]
+        return PostgresMergeCompiler(self, connection, using)
+
+
+class PostgresUpdateFromValuesQuery(PostgresMergeQuery):
+    """UPDATE query using PostgreSQL that updates existing rows with the
+    values in a list of rows.
+
+    Rows are matched against the existing rows the same
+    way :see:PostgresMergeQuery does.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Initializes a new instance :see:PostgresUpdateFromValuesQuery."""
+
+        super().__init__(*args, **kwargs)
+
+        self.update_fields = []
+
+    def get_compiler(self, using=None, connection=None):
+        if using:
+            connection = connections[using]
+        return PostgresUpdateFromValuesCompiler(self, connection, using)
+
+
 class PostgresUpdateQuery(sql.UpdateQuery):
     """Update query using PostgreSQL."""
 
@@ -0,0 +1,209 @@
+import datetime
+import io
+
+from decimal import Decimal
+from typing import Any, Iterable, Iterator, List, Optional, Sequence
+from uuid import UUID
+
+STAGING_TABLE_NAME = "psqlextra_staging"
+STAGING_ORDINAL_COLUMN = "psqlextra_ordinal"
+
+
+def copy_rows_to_table(
+    cursor, table_name: str, columns: Sequence[str], rows: Iterable[List[Any]]
+) -> None:
+    """Streams the specified rows into a table using `COPY ... FROM STDIN`.
+
+    Works with both psycopg2 and psycopg 3. With psycopg 3, the values
+    are adapted by the driver. With psycopg2, the values are serialized
+    into PostgreSQL's text format by :see:format_copy_value.
+
+    Arguments:
+        cursor:
+            Django cursor (wrapper) to use.
+
+        table_name:
+            Unquoted name of the table to copy the rows into.
+
+        columns:
+            Unquoted names of the columns the values
+            in each row are for.
+
+        rows:
+            Rows of values that were already prepared for
+            the database (e.g. by `get_db_prep_save`).
+    """
+
+    sql = build_copy_sql(cursor.db.ops.quote_name, table_name, columns)
+    raw_cursor = cursor.cursor
+
+    with cursor.db.wrap_database_errors:
+        # psycopg 3
+        if hasattr(raw_cursor, "copy"):
+            with raw_cursor.copy(sql) as copy:
+                for row in rows:
+                    copy.write_row(row)
+
+            return
+
+        raw_cursor.copy_expert(sql, _CopyStream(rows))
+
+
+async def acopy_rows_to_table(
+    acursor,
+    qn,
+    table_name: str,
+    columns: Sequence[str],
+    rows: Iterable[List[Any]],
+) -> None:
+    """Async version of :see:copy_rows_to_table for psycopg 3 async
+    cursors.
+
+    Arguments:
+        acursor:
+            psycopg 3 async cursor to use.
+
+        qn:
+            Function to quote names with.
+
+        table_name:
+            Unquoted name of the table to copy the rows into.
+
+        columns:
+            Unquoted names of the columns the values
+            in each row are for.
+
+        rows:
+            Rows of values that were already prepared for
+            the database (e.g. by `get_db_prep_save`).
+    """
+
+    async with acursor.copy(build_copy_sql(qn, table_name, columns)) as copy:
+        for row in rows:
+            await copy.write_row(row)
+
+
+def build_copy_sql(qn, table_name: str, columns: Sequence[str]) -> str:
+    """Builds the `COPY ... FROM STDIN` statement to copy rows into the
+    specified columns of the specified table."""
+
+    quoted_columns = ", ".join(qn(column) for column in columns)
+    return f"COPY {qn(table_name)} ({quoted_columns}) FROM STDIN"
+
+
+def format_copy_value(value: Any) -> str:
+    """Formats a value that was prepared for the database into PostgreSQL's
+    `COPY` text format.
+
+    See: https://www.postgresql.org/docs/current/sql-copy.html#id-1.9.3.55.9.2
+    """
+
+    if value is None:
+        return "\\N"
+
+    return _escape_copy_text(_format_literal(value))
+
+
+def _format_literal(value: Any) -> str:
+    """Formats a value as the literal text PostgreSQL would accept as input
+    for a column of the corresponding type."""
+
+    # psycopg2 adapters such as Binary and Json/Jsonb as
+    # returned by BinaryField and JSONField
+    if hasattr(value, "adapted"):
+        if hasattr(value, "dumps"):
+            return value.dumps(value.adapted)
+
+        return _format_literal(value.adapted)
+
+    if isinstance(value, bool):
+        return "t" if value else "f"
+
+    if isinstance(value, (int, float, Decimal, UUID)):
+        return str(value)
+
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+
+    if isinstance(value, datetime.timedelta):
+        return f"{value.days} days {value.seconds} seconds {value.microseconds} microseconds"
+
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "\\x" + bytes(value).hex()
+
+    # hstore
+    if isinstance(value, dict):
+        return ", ".join(
+            "%s=>%s"
+            % (
+                _quote_element(str(key)),
+                "NULL" if item is None else _quote_element(str(item)),
+            )
+            for key, item in value.items()
+        )
+
+    if isinstance(value, (list, tuple)):
+        return _format_array(value)
+
+    return str(value)
+
+
+def _format_array(values: Iterable[Any]) -> str:
+    elements = []
+    for value in values:
+        if value is None:
+            elements.append("NULL")
+        elif isinstance(value, (list, tuple)):
+            elements.append(_format_array(value))
+        else:
+            elements.append(_quote_element(_format_literal(value)))
+
+    return "{%s}" % ",".join(elements)
+
+
+def _quote_element(value: str) -> str:
+    escaped_value = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped_value}"'
+
+
+def _escape_copy_text(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+        .replace("\t", "\\t")
+    )
+
+
+class _CopyStream(io.RawIOBase):
+    """File-like object that lazily serializes rows for psycopg2's
+    `copy_expert` so that the rows never have to be in memory as one big
+    buffer."""
+
+    def __init__(self, rows: Iterable[List[Any]]) -> None:
+        self._lines: Iterator[bytes] = (
+            (
+                "\t".join(format_copy_value(value) for value in row) + "\n"
+            ).encode("utf-8")
+            for row in rows
+        )
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        if size is None or size < 0:
+            data = self._buffer + b"".join(self._lines)
+            self._buffer = b""
+            return data
+
+        while len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+
+            self._buffer += line
+
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
@@ -0,0 +1,297 @@
+import threading
+
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    List,
+    NamedTuple,
+    Optional,
+    Type,
+    TypeVar,
+)
+from weakref import WeakKeyDictionary
+
+from django.db import models
+from django.utils import tree
+from django.utils.hashable import make_hashable
+
+TValue = TypeVar("TValue")
+
+
+class CacheInfo(NamedTuple):
+    """Statistics of a :see:LRUCache."""
+
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class LRUCache(Generic[TValue]):
+    """Thread-safe cache that holds a bounded amount of entries and evicts
+    the least recently used entry when full.
+
+    Keeps track of the amount of hits and misses so
+    that the effectiveness of the cache can be observed.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        on_evict: Optional[Callable[[Hashable, TValue], None]] = None,
+    ) -> None:
+        """Initializes a new instance of :see:LRUCache.
+
+        Arguments:
+            maxsize:
+                The maximum amount of entries to hold.
+
+                Nothing is cached when set to zero.
+
+            on_evict:
+                Optionally, a function to call with the key
+                and value of every entry that is evicted
+                because the cache is full.
+        """
+
+        self.maxsize = maxsize
+        self.on_evict = on_evict
+
+        self._entries: "OrderedDict[Hashable, TValue]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get_or_set(
+        self, key: Optional[Hashable], factory: Callable[[], TValue]
+    ) -> TValue:
+        """Gets the entry with the specified key or creates it using the
+        specified factory if there's no such entry.
+
+        Arguments:
+            key:
+                The key of the entry. When None, the
+                cache is bypassed.
+
+            factory:
+                Function that creates the entry.
+        """
+
+        if key is None or self.maxsize <= 0:
+            return factory()
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return self._entries[key]
+
+            self._misses += 1
+
+        # deliberately outside the lock, creating an entry
+        # could take long and might even use the cache itself
+        value = factory()
+
+        evicted_entries = []
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                evicted_entries.append(self._entries.popitem(last=False))
+
+        if self.on_evict:
+            for evicted_key, evicted_value in evicted_entries:
+                self.on_evict(evicted_key, evicted_value)
+
+        return value
+
+    def info(self) -> CacheInfo:
+        """Gets the amount of hits, misses and entries."""
+
+        with self._lock:
+            return CacheInfo(
+                hits=self._hits,
+                misses=self._misses,
+                maxsize=self.maxsize,
+                currsize=len(self._entries),
+            )
+
+    def values(self) -> List[TValue]:
+        """Gets the values of all entries, least recently used first."""
+
+        with self._lock:
+            return list(self._entries.values())
+
+    def clear(self) -> None:
+        """Removes all entries and resets the statistics."""
+
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+
+
+class ModelCache(Generic[TValue]):
+    """Thread-safe cache of entries per model class.
+
+    Only weak references to the model classes are held. When
+    a model class is replaced, for example because the app
+    registry was reloaded, the entries of the old class go
+    away with it and everything is resolved again for the
+    new class.
+    """
+
+    def __init__(self) -> None:
+        """Initializes a new instance of :see:ModelCache."""
+
+        self._entries: "WeakKeyDictionary[Type[Any], Dict[Hashable, TValue]]" = (
+            WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    def get_or_set(
+        self,
+        model: Type[Any],
+        key: Optional[Hashable],
+        factory: Callable[[], TValue],
+    ) -> TValue:
+        """Gets the entry with the specified key for the specified model or
+        creates it using the specified factory if there's no such entry.
+
+        Arguments:
+            model:
+                The model class the entry belongs to.
+
+            key:
+                The key of the entry. When None, the
+                cache is bypassed.
+
+            factory:
+                Function that creates the entry.
+        """
+
+        if key is None:
+            return factory()
+
+        with self._lock:
+            model_entries = self._entries.get(model)
+            if model_entries is not None and key in model_entries:
+                return model_entries[key]
+
+        value = factory()
+
+        with self._lock:
+            self._entries.setdefault(model, {})[key] = value
+
+        return value
+
+    def get(self, model: Type[Any], key: Hashable) -> Optional[TValue]:
+        """Gets the entry with the specified key for the specified model or
+        None if there's no such entry."""
+
+        with self._lock:
+            return self._entries.get(model, {}).get(key)
+
+    def set(self, model: Type[Any], key: Hashable, value: TValue) -> None:
+        """Sets the entry with the specified key for the specified model."""
+
+        with self._lock:
+            self._entries.setdefault(model, {})[key] = value
+
+    def invalidate(self, model: Type[Any]) -> None:
+        """Removes all entries of the specified model."""
+
+        with self._lock:
+            self._entries.pop(model, None)
+
+    def clear(self) -> None:
+        """Removes all entries."""
+
+        with self._lock:
+            self._entries.clear()
+
+
+def make_cache_key(*parts: Any) -> Optional[Hashable]:
+    """Builds a cache key from the specified parts.
+
+    Values are keyed together with their type so that
+    values that compare equal but are sent to the database
+    differently (such as `1` and `True`) get a different key,
+    also when they are nested in expressions and Q objects. Model classes
+    are keyed by their label, so that the key does not keep
+    them alive, see :see:ModelCache.
+
+    Returns:
+        The key or None if any of the parts cannot be hashed.
+    """
+
+    try:
+        key = tuple(_make_hashable_part(part) for part in parts)
+        hash(key)
+    except TypeError:
+        return None
+
+    return key
+
+
+def _make_hashable_part(value: Any) -> Hashable:
+    if isinstance(value, type) and issubclass(value, models.Model):
+        return (models.Model, value._meta.label)
+
+    if isinstance(value, dict):
+        return (
+            dict,
+            tuple(
+                (key, _make_hashable_part(item)) for key, item in value.items()
+            ),
+        )
+
+    if isinstance(value, (list, tuple)):
+        return (type(value), tuple(_make_hashable_part(item) for item in value))
+
+    if isinstance(value, tree.Node):
+        return (
+            type(value),
+            value.connector,
+            value.negated,
+            _make_hashable_part(tuple(value.children)),
+        )
+
+    # expressions compare equal when their arguments
+    # do, `Value(1)` equals `Value(True)`
+    identity = getattr(value, "identity", None)
+    if isinstance(identity, tuple):
+        return (type(value), _make_hashable_part(identity))
+
+    return (type(value), make_hashable(value))
+
+
+# Fields to insert and update per model and set of columns
+# specified in the rows, see :see:PostgresQuerySet._get_upsert_fields
+upsert_fields_cache: LRUCache = LRUCache(maxsize=1024)
+
+# Fields (and hstore keys) that conflict targets consist
+# of per model, see :see:get_conflict_target_fields
+conflict_target_fields_cache: ModelCache = ModelCache()
+
+# `ON CONFLICT ...` clauses without action per model and
+# conflict target, see
+# :see:PostgresInsertOnConflictCompiler._build_on_conflict_clause
+conflict_target_clause_cache: ModelCache = ModelCache()
+
+# Compiled `ON CONFLICT ... RETURNING ...` clauses, see
+# :see:PostgresInsertOnConflictCompiler._build_on_conflict_suffix
+on_conflict_clause_cache: LRUCache = LRUCache(maxsize=1024)
+
+# Partitions that rows of partitioned models are routed
+# into per model and database, see :see:get_partition_router
+partition_router_cache: ModelCache = ModelCache()
+
+# Conflict ratios observed by adaptive upserts per model,
+# conflict target and database, see :see:get_conflict_ratio_tracker
+conflict_ratio_cache: ModelCache = ModelCache()
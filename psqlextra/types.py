@@ -32,6 +32,71 @@ class ConflictAction(Enum):
         return self.value
 
 
+class DedupePolicy(StrEnum):
+    """What to do with rows in a bulk insert that have the same values for
+    the conflict target."""
+
+    # keep the first row, ignore the others
+    KEEP_FIRST = "keep_first"
+
+    # keep the last row, ignore the others
+    KEEP_LAST = "keep_last"
+
+    # merge the rows, values from later rows that are
+    # not None override values from earlier rows
+    MERGE = "merge"
+
+
+class InsertEngine(StrEnum):
+    """Possible ways of sending rows to PostgreSQL in bulk inserts."""
+
+    # INSERT INTO ... VALUES (...), (...)
+    VALUES = "values"
+
+    # COPY into a temporary staging table, then
+    # INSERT INTO ... SELECT ... FROM staging
+    COPY = "copy"
+
+    # INSERT INTO ... SELECT * FROM unnest(%s::type[], ...)
+    # with one array parameter per column
+    UNNEST = "unnest"
+
+
+class UpsertOutcome(StrEnum):
+    """What happened to a row in an insert/upsert."""
+
+    # the row did not exist yet and was inserted
+    INSERTED = "inserted"
+
+    # the row conflicted with an existing row that was updated
+    UPDATED = "updated"
+
+    # the row conflicted with an existing row that was left
+    # alone because of DO NOTHING or the update condition
+    SKIPPED = "skipped"
+
+
+class UpsertStrategy(StrEnum):
+    """Ways of upserting a batch of rows, see `bulk_upsert(adaptive=True)`."""
+
+    # INSERT INTO ... ON CONFLICT DO UPDATE, cheapest
+    # when most rows do not exist yet
+    INSERT = "insert"
+
+    # UPDATE ... FROM (VALUES ...) and then INSERT the rows
+    # that did not match, cheapest when most rows exist
+    UPDATE_FIRST = "update_first"
+
+
+class MergeAction(StrEnum):
+    """Possible actions in the WHEN clauses of a MERGE statement."""
+
+    INSERT = "insert"
+    UPDATE = "update"
+    DELETE = "delete"
+    NOTHING = "nothing"
+
+
 class PostgresPartitioningMethod(StrEnum):
     """Methods of partitioning supported by PostgreSQL 11.x native support for
     table partitioning."""
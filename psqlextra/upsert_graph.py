@@ -0,0 +1,266 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type, Union
+
+from django.core.exceptions import SuspiciousOperation
+from django.db import DEFAULT_DB_ALIAS, connections, models
+from django.db.models import Expression, Q
+
+from .query import ConflictTarget, PostgresQuerySet
+from .types import ConflictAction
+
+# prefix of the names of the CTEs every model is upserted in
+UPSERT_GRAPH_ALIAS_PREFIX = "psqlextra_graph_"
+
+
+class UpsertGraphRef(Expression):
+    """References the primary key of a row upserted by an earlier
+    :see:UpsertGraphNode, by the values of some of its fields.
+
+    Rows that were inserted or updated by the node are found
+    in the rows the node returned. Rows that the node left
+    alone are found in the table itself:
+
+        COALESCE(
+            (SELECT "id" FROM "psqlextra_graph_0" WHERE "name" = %s),
+            (SELECT "id" FROM "author" WHERE "name" = %s)
+        )
+    """
+
+    contains_aggregate = False
+    contains_over_clause = False
+
+    def __init__(
+        self,
+        node: "UpsertGraphNode",
+        key: List[Tuple[models.Field, Any]],
+    ) -> None:
+        super().__init__(output_field=node.model._meta.pk)
+
+        self.node = node
+        self.key = key
+
+    def resolve_expression(self, *args, **kwargs):
+        clone = self.copy()
+        clone.key = [
+            (
+                field,
+                value.resolve_expression(*args, **kwargs)
+                if hasattr(value, "resolve_expression")
+                else value,
+            )
+            for field, value in self.key
+        ]
+
+        return clone
+
+    def as_sql(self, compiler, connection):
+        qn = connection.ops.quote_name
+
+        conditions = []
+        params: List[Any] = []
+
+        for field, value in self.key:
+            if hasattr(value, "as_sql"):
+                value_sql, value_params = compiler.compile(value)
+            else:
+                if isinstance(value, models.Model):
+                    value = value.pk
+
+                value_sql = "%s"
+                value_params = [
+                    field.get_db_prep_value(value, connection, prepared=False)
+                ]
+
+            conditions.append(f"{qn(field.column)} = {value_sql}")
+            params.extend(value_params)
+
+        condition = " AND ".join(conditions)
+        pk_column = qn(self.node.model._meta.pk.column)
+
+        return (
+            (
+                f"COALESCE("
+                f"(SELECT {pk_column} FROM {qn(self.node.alias)} WHERE {condition}), "
+                f"(SELECT {pk_column} FROM {qn(self.node.model._meta.db_table)} WHERE {condition})"
+                f")"
+            ),
+            params + params,
+        )
+
+
+class UpsertGraphNode:
+    """The rows of a single model that are upserted by an
+    :see:UpsertGraph."""
+
+    def __init__(
+        self,
+        model: Type[models.Model],
+        alias: str,
+        sql_with_params: Tuple[str, Any],
+    ) -> None:
+        self.model = model
+        self.alias = alias
+        self.sql_with_params = sql_with_params
+
+        self._queryset = PostgresQuerySet(model)
+
+    def ref(self, **key) -> UpsertGraphRef:
+        """References the primary key of the row with the specified values,
+        to use as the value of a foreign key in rows of models that are
+        upserted after this one.
+
+        The values can be references themselves.
+        """
+
+        if not key:
+            raise SuspiciousOperation(
+                "Specify the values of the row to reference."
+            )
+
+        fields = []
+        for name, value in key.items():
+            field = self._queryset._get_raw_row_field(name)
+            if not field:
+                raise SuspiciousOperation(
+                    "'%s' is not a field of '%s'." % (name, self.model.__name__)
+                )
+
+            fields.append((field, value))
+
+        return UpsertGraphRef(self, fields)
+
+
+class UpsertGraph:
+    """Upserts rows of multiple models that refer to each other in a single
+    statement.
+
+    Every model is upserted in a data-modifying CTE. Rows
+    can refer to rows of models upserted before them using
+    :see:UpsertGraphNode.ref, which resolves the primary key
+    of the referenced row in the database:
+
+        graph = UpsertGraph()
+        authors = graph.upsert(Author, ["name"], [dict(name="a")])
+        graph.upsert(
+            Book,
+            ["author", "title"],
+            [dict(author=authors.ref(name="a"), title="b")],
+        )
+
+        graph.execute()
+
+    Referenced rows must have been upserted by the graph or
+    exist before the statement starts.
+    """
+
+    def __init__(self, using: str = DEFAULT_DB_ALIAS) -> None:
+        """Initializes a new instance of :see:UpsertGraph.
+
+        Arguments:
+            using:
+                The name of the database connection to use.
+        """
+
+        self.using = using
+        self._nodes: List[UpsertGraphNode] = []
+
+    def upsert(
+        self,
+        model: Type[models.Model],
+        conflict_target: ConflictTarget,
+        rows: Iterable[Dict[str, Any]],
+        index_predicate: Optional[Union[Expression, Q, str]] = None,
+        update_condition: Optional[Union[Expression, Q, str]] = None,
+        update_values: Optional[Dict[str, Union[Any, Expression]]] = None,
+    ) -> UpsertGraphNode:
+        """Adds rows to upsert, see :see:PostgresQuerySet.bulk_upsert.
+
+        Values of foreign keys can be references to rows upserted
+        before these, see :see:UpsertGraphNode.ref.
+
+        Returns:
+            The node to reference the upserted rows by.
+        """
+
+        rows = list(rows)
+        if not rows:
+            raise SuspiciousOperation("Specify at least one row to upsert.")
+
+        queryset = PostgresQuerySet(model)
+
+        # foreign keys cannot be set to references by name,
+        # only the attribute that holds the raw value can
+        rows = [
+            {
+                self._get_attname(queryset, name, value): value
+                for name, value in row.items()
+            }
+            for row in rows
+        ]
+
+        queryset.on_conflict(
+            conflict_target,
+            ConflictAction.UPDATE,
+            index_predicate=index_predicate,
+            update_condition=update_condition,
+            update_values=update_values,
+        )
+
+        # rows are never turned into model instances, foreign
+        # keys cannot be set to references on model instances
+        compiler = queryset._build_insert_compiler(
+            rows, using=self.using, raw=True
+        )
+        compiler.query.returning = "*"
+
+        ((sql, params),) = compiler.as_sql(return_id=False)
+
+        node = UpsertGraphNode(
+            model,
+            f"{UPSERT_GRAPH_ALIAS_PREFIX}{len(self._nodes)}",
+            (sql, params),
+        )
+        self._nodes.append(node)
+
+        return node
+
+    @staticmethod
+    def _get_attname(queryset: PostgresQuerySet, name: str, value: Any) -> str:
+        if not isinstance(value, UpsertGraphRef):
+            return name
+
+        field = queryset._get_raw_row_field(name)
+        return field.attname if field else name
+
+    def execute(self) -> List[int]:
+        """Upserts the rows of all models in a single statement.
+
+        Returns:
+            The amount of rows inserted or updated for every
+            model, in the order they were added.
+        """
+
+        nodes, self._nodes = self._nodes, []
+        if not nodes:
+            return []
+
+        connection = connections[self.using]
+        qn = connection.ops.quote_name
+
+        ctes = []
+        params: List[Any] = []
+
+        for node in nodes:
+            sql, node_params = node.sql_with_params
+            ctes.append(f"{qn(node.alias)} AS ({sql})")
+            params.extend(node_params)
+
+        counts = ", ".join(
+            f"(SELECT COUNT(*) FROM {qn(node.alias)})" for node in nodes
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"WITH {', '.join(ctes)} SELECT {counts}", tuple(params)
+            )
+
+            return list(cursor.fetchone())
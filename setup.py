@@ -57,6 +57,7 @@ setup(
     extras_require={
         # Python 3.6 - Python 3.13
         ':python_version <= "3.6"': ["dataclasses"],
+        "async": ["psycopg>=3.1", "psycopg-pool>=3.1"],
         "dev": [
             "poethepoet==0.34.0; python_version >= '3.9'",
             "poethepoet==0.30.0; python_version >= '3.8' and python_version < '3.9'",
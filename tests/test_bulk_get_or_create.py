@@ -0,0 +1,160 @@
+import pytest
+
+from django.core.exceptions import SuspiciousOperation
+from django.db import connection, models
+
+from psqlextra.types import InsertEngine
+
+from .fake_model import get_fake_model
+
+
+@pytest.fixture
+def model():
+    return get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "count": models.IntegerField(default=0),
+        }
+    )
+
+
+@pytest.mark.parametrize("engine", [InsertEngine.VALUES, InsertEngine.UNNEST])
+def test_bulk_get_or_create(model, engine):
+    """Tests whether existing rows are fetched and missing rows are created
+    in a single statement, in the order of the specified rows."""
+
+    existing_obj = model.objects.create(name="joe", count=1)
+
+    executed_sql = []
+
+    def _capture(execute, sql, params, many, context):
+        executed_sql.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(_capture):
+        results = model.objects.bulk_get_or_create(
+            [
+                dict(name="jane", count=2),
+                dict(name="joe", count=3),
+                dict(name="jane", count=4),
+            ],
+            ["name"],
+            engine=engine,
+        )
+
+    assert len(executed_sql) == 1
+
+    (jane, jane_created), (joe, joe_created), (jane_again, _) = results
+    assert jane_created
+    assert jane["name"] == "jane" and jane["count"] == 2
+    assert jane_again == jane
+    assert not joe_created
+    assert joe == dict(id=existing_obj.id, name="joe", count=1)
+
+    assert model.objects.count() == 2
+
+
+def test_bulk_get_or_create_return_model(model):
+    """Tests whether model instances can be returned."""
+
+    existing_obj = model.objects.create(name="joe", count=1)
+
+    results = model.objects.bulk_get_or_create(
+        [dict(name="joe"), dict(name="jane")], ["name"], return_model=True
+    )
+
+    assert results == [
+        (existing_obj, False),
+        (model.objects.get(name="jane"), True),
+    ]
+    assert results[0][0].count == 1
+
+
+def test_bulk_get_or_create_batches(model):
+    """Tests whether rows can be fetched and created in batches."""
+
+    model.objects.create(name="1")
+
+    results = model.objects.bulk_get_or_create(
+        [dict(name=str(index)) for index in range(5)],
+        ["name"],
+        batch_size=2,
+        raw=True,
+    )
+
+    assert [row["name"] for row, _ in results] == [
+        str(index) for index in range(5)
+    ]
+    assert [created for _, created in results] == [
+        True,
+        False,
+        True,
+        True,
+        True,
+    ]
+
+
+@pytest.mark.parametrize("batch_size", [None, 2])
+def test_bulk_get_or_create_duplicates(model, batch_size):
+    """Tests whether only the first of multiple rows with the same key is
+    reported as created and every row gets the row that was created."""
+
+    results = model.objects.bulk_get_or_create(
+        [
+            dict(name="jane", count=1),
+            dict(name="jane", count=2),
+            dict(name="joe", count=3),
+            dict(name="jane", count=4),
+        ],
+        ["name"],
+        batch_size=batch_size,
+    )
+
+    assert [(row["name"], created) for row, created in results] == [
+        ("jane", True),
+        ("jane", False),
+        ("joe", True),
+        ("jane", False),
+    ]
+    assert {row["id"] for row, _ in results if row["name"] == "jane"} == {
+        model.objects.get(name="jane").id
+    }
+    assert model.objects.get(name="jane").count == 1
+
+
+def test_bulk_get_or_create_lazy(model):
+    """Tests whether rows are only pulled from the specified iterable one
+    batch at a time."""
+
+    pulled_rows = []
+
+    def _rows():
+        for index in range(4):
+            pulled_rows.append(index)
+            yield dict(name=str(index))
+
+    executed_sql = []
+
+    def _capture(execute, sql, params, many, context):
+        executed_sql.append(len(pulled_rows))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(_capture):
+        model.objects.bulk_get_or_create(_rows(), ["name"], batch_size=2)
+
+    assert executed_sql == [2, 4]
+
+
+@pytest.mark.parametrize(
+    "rows,kwargs",
+    [
+        ([dict(count=1)], dict()),
+        ([dict(name="joe")], dict(engine=InsertEngine.COPY)),
+    ],
+)
+def test_bulk_get_or_create_invalid(model, rows, kwargs):
+    """Tests whether rows without a key and unsupported engines are
+    refused."""
+
+    with pytest.raises(SuspiciousOperation):
+        model.objects.bulk_get_or_create(rows, ["name"], **kwargs)
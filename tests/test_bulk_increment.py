@@ -0,0 +1,154 @@
+import datetime
+
+import pytest
+
+from django.core.exceptions import SuspiciousOperation
+from django.db import connection, models
+
+from .fake_model import get_fake_model
+
+
+@pytest.fixture
+def model():
+    return get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "hits": models.IntegerField(default=0),
+            "last_seen": models.DateField(null=True),
+            "title": models.CharField(max_length=255, null=True),
+        }
+    )
+
+
+def _get_rows(model):
+    return {
+        name: (hits, last_seen, title)
+        for name, hits, last_seen, title in model.objects.values_list(
+            "name", "hits", "last_seen", "title"
+        )
+    }
+
+
+def test_bulk_increment(model):
+    """Tests whether duplicate rows are aggregated before they are sent and
+    whether they are aggregated with the existing rows."""
+
+    day = datetime.date(2020, 1, 1)
+    model.objects.create(
+        name="joe", hits=10, last_seen=day + datetime.timedelta(days=5)
+    )
+
+    executed_sql = []
+
+    def _capture(execute, sql, params, many, context):
+        executed_sql.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(_capture):
+        affected_rows = model.objects.bulk_increment(
+            ["name"],
+            [
+                dict(name="joe", hits=1, last_seen=day, title="a"),
+                dict(name="jane", hits=2, last_seen=day, title="b"),
+                dict(name="joe", hits=3, last_seen=None, title="c"),
+                dict(
+                    name="jane",
+                    hits=4,
+                    last_seen=day + datetime.timedelta(days=1),
+                    title="d",
+                ),
+            ],
+            sum_fields=["hits"],
+            max_fields=["last_seen"],
+        )
+
+    assert affected_rows == 2
+    assert len(executed_sql) == 1
+    assert "GREATEST" in executed_sql[0][0]
+    assert len(executed_sql[0][1]) == 10
+
+    assert _get_rows(model) == {
+        "joe": (14, day + datetime.timedelta(days=5), "c"),
+        "jane": (6, day + datetime.timedelta(days=1), "d"),
+    }
+
+
+def test_bulk_increment_batches(model):
+    """Tests whether rows are added up across batches."""
+
+    model.objects.bulk_increment(
+        ["name"],
+        [dict(name=str(index % 3), hits=1) for index in range(10)],
+        sum_fields=["hits"],
+        batch_size=2,
+    )
+
+    assert sorted(model.objects.values_list("name", "hits")) == [
+        ("0", 4),
+        ("1", 3),
+        ("2", 3),
+    ]
+
+
+@pytest.mark.parametrize(
+    "kwargs", [dict(), dict(sum_fields=["nope"]), dict(max_fields=["nope"])]
+)
+def test_bulk_increment_invalid(model, kwargs):
+    """Tests whether invalid fields are refused."""
+
+    with pytest.raises(SuspiciousOperation):
+        model.objects.bulk_increment(
+            ["name"], [dict(name="joe", hits=1)], **kwargs
+        )
+
+
+def test_bulk_increment_null():
+    """Tests whether NULL counters are counted from zero."""
+
+    nullable_model = get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "hits": models.IntegerField(null=True),
+        }
+    )
+    nullable_model.objects.create(name="joe", hits=None)
+
+    nullable_model.objects.bulk_increment(
+        ["name"],
+        [dict(name="joe", hits=2), dict(name="jane", hits=None)],
+        sum_fields=["hits"],
+    )
+    nullable_model.objects.bulk_increment(
+        ["name"], [dict(name="jane", hits=1)], sum_fields=["hits"]
+    )
+
+    assert sorted(nullable_model.objects.values_list("name", "hits")) == [
+        ("jane", 1),
+        ("joe", 2),
+    ]
+
+
+def test_bulk_increment_lazy(model):
+    """Tests whether rows are pulled from the iterable one batch at a time
+    instead of all at once."""
+
+    pulled_rows = []
+
+    def _rows():
+        for index in range(4):
+            pulled_rows.append(index)
+            yield dict(name="joe", hits=1)
+
+    executed_rows = []
+
+    def _capture(execute, sql, params, many, context):
+        executed_rows.append(len(pulled_rows))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(_capture):
+        model.objects.bulk_increment(
+            ["name"], _rows(), sum_fields=["hits"], batch_size=2
+        )
+
+    assert executed_rows == [2, 4]
+    assert model.objects.get().hits == 4
@@ -0,0 +1,182 @@
+import pytest
+
+from django.core.exceptions import SuspiciousOperation
+from django.db import connection, models
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+
+from psqlextra.types import InsertEngine
+
+from .fake_model import get_fake_model
+
+
+def _insert_queries(ctx):
+    return [query for query in ctx if "ON CONFLICT" in query["sql"]]
+
+
+@pytest.mark.parametrize("engine", [InsertEngine.VALUES, InsertEngine.COPY])
+def test_bulk_upsert_batch_size(engine):
+    """Tests whether rows are upserted in multiple queries when a batch size
+    is specified."""
+
+    model = get_fake_model(
+        {"name": models.CharField(max_length=255, unique=True)}
+    )
+
+    names = [f"name-{index}" for index in range(10)]
+
+    with CaptureQueriesContext(connection) as ctx:
+        rows = model.objects.bulk_upsert(
+            conflict_target=["name"],
+            rows=[dict(name=name) for name in names],
+            batch_size=3,
+            engine=engine,
+        )
+
+    assert len(_insert_queries(ctx)) == 4
+    assert [row["name"] for row in rows] == names
+    assert model.objects.count() == 10
+
+
+def test_bulk_upsert_max_params():
+    """Tests whether the amount of rows per query is derived from the
+    maximum amount of parameters."""
+
+    model = get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "count": models.IntegerField(),
+        }
+    )
+
+    with CaptureQueriesContext(connection) as ctx:
+        model.objects.bulk_upsert(
+            conflict_target=["name"],
+            rows=[dict(name=str(index), count=index) for index in range(5)],
+            max_params=7,
+        )
+
+    # name and count, so three rows per query
+    insert_queries = _insert_queries(ctx)
+    assert len(insert_queries) == 2
+    assert model.objects.count() == 5
+
+
+def test_bulk_upsert_max_params_conflict_clause():
+    """Tests whether the parameters of the conflict clause are counted when
+    deriving the amount of rows per query."""
+
+    model = get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "count": models.IntegerField(),
+        }
+    )
+
+    executed_params = []
+
+    def _capture(execute, sql, params, many, context):
+        if "ON CONFLICT" in sql:
+            executed_params.append(params)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(_capture):
+        model.objects.bulk_upsert(
+            conflict_target=["name"],
+            rows=[dict(name=str(index), count=index) for index in range(5)],
+            update_condition=Q(count__in=[1, 2, 3, 4]),
+            max_params=9,
+        )
+
+    # 4 parameters for the condition and 2 per row
+    assert [len(params) for params in executed_params] == [8, 8, 6]
+    assert model.objects.count() == 5
+
+
+def test_bulk_upsert_max_params_and_batch_size():
+    """Tests whether the smallest of the batch size and the amount of rows
+    derived from the maximum amount of parameters is used."""
+
+    model = get_fake_model(
+        {"name": models.CharField(max_length=255, unique=True)}
+    )
+
+    with CaptureQueriesContext(connection) as ctx:
+        model.objects.bulk_upsert(
+            conflict_target=["name"],
+            rows=[dict(name=str(index)) for index in range(6)],
+            batch_size=5,
+            max_params=4,
+        )
+
+    assert len(_insert_queries(ctx)) == 2
+
+
+def test_bulk_upsert_yield_chunks_is_lazy():
+    """Tests whether rows are pulled from the input and upserted chunk by
+    chunk when yielding chunks."""
+
+    model = get_fake_model(
+        {"name": models.CharField(max_length=255, unique=True)}
+    )
+
+    consumed = []
+
+    def _rows():
+        for index in range(5):
+            consumed.append(index)
+            yield dict(name=str(index))
+
+    chunks = model.objects.bulk_upsert(
+        conflict_target=["name"],
+        rows=_rows(),
+        batch_size=2,
+        yield_chunks=True,
+    )
+
+    assert not consumed
+    assert model.objects.count() == 0
+
+    first_chunk = next(chunks)
+    assert [row["name"] for row in first_chunk] == ["0", "1"]
+    assert len(consumed) == 2
+    assert model.objects.count() == 2
+
+    remaining_chunks = list(chunks)
+    assert [len(chunk) for chunk in remaining_chunks] == [2, 1]
+    assert model.objects.count() == 5
+
+
+def test_bulk_insert_batch_size_without_conflict_handling():
+    """Tests whether batching also works when falling back to Django's
+    standard bulk_create."""
+
+    model = get_fake_model({"name": models.CharField(max_length=255)})
+
+    objs = model.objects.bulk_insert(
+        (dict(name=str(index)) for index in range(5)), batch_size=2
+    )
+
+    assert len(objs) == 5
+    assert model.objects.count() == 5
+
+
+@pytest.mark.parametrize(
+    "kwargs", [dict(batch_size=0), dict(batch_size=-1), dict(max_params=1)]
+)
+def test_bulk_upsert_invalid_chunk_size(kwargs):
+    """Tests whether nonsensical batch sizes are rejected."""
+
+    model = get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "count": models.IntegerField(),
+        }
+    )
+
+    with pytest.raises(SuspiciousOperation):
+        model.objects.bulk_upsert(
+            conflict_target=["name"],
+            rows=[dict(name="joe", count=1)],
+            **kwargs,
+        )
@@ -0,0 +1,219 @@
+import datetime
+
+import pytest
+
+from django.db import models
+from django.db.utils import ProgrammingError
+from django.test import override_settings
+
+from psqlextra.fields import HStoreField
+from psqlextra.query import ConflictAction
+from psqlextra.types import DedupePolicy
+
+from .fake_model import get_fake_model
+
+
+@pytest.mark.parametrize(
+    "dedupe,expected_values",
+    [
+        (DedupePolicy.KEEP_FIRST, {"a": (1, None), "b": (2, "x")}),
+        (DedupePolicy.KEEP_LAST, {"a": (None, "z"), "b": (2, "x")}),
+        (DedupePolicy.MERGE, {"a": (1, "z"), "b": (2, "x")}),
+        ("keep_last", {"a": (None, "z"), "b": (2, "x")}),
+    ],
+)
+def test_bulk_upsert_dedupe(dedupe, expected_values):
+    """Tests whether rows with the same conflict target values are
+    de-duplicated according to the specified policy."""
+
+    model = get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "count": models.IntegerField(null=True),
+            "label": models.CharField(max_length=255, null=True),
+        }
+    )
+
+    rows = model.objects.bulk_upsert(
+        conflict_target=["name"],
+        rows=[
+            dict(name="a", count=1, label=None),
+            dict(name="b", count=2, label="x"),
+            dict(name="a", count=None, label="z"),
+        ],
+        dedupe=dedupe,
+    )
+
+    assert [row["name"] for row in rows] == ["a", "b"]
+    assert {
+        obj.name: (obj.count, obj.label) for obj in model.objects.all()
+    } == expected_values
+
+
+def test_bulk_upsert_dedupe_custom_merge():
+    """Tests whether a function can be used to merge rows with the same
+    conflict target values."""
+
+    model = get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "count": models.IntegerField(),
+        }
+    )
+
+    model.objects.bulk_upsert(
+        conflict_target=["name"],
+        rows=[dict(name="a", count=1), dict(name="a", count=2)],
+        dedupe=lambda existing_row, row: {
+            **row,
+            "count": existing_row["count"] + row["count"],
+        },
+    )
+
+    assert model.objects.get().count == 3
+
+
+def test_bulk_upsert_without_dedupe_fails_on_duplicates():
+    """Tests whether duplicate rows are passed to PostgreSQL as-is when
+    upserting without a de-duplication policy."""
+
+    model = get_fake_model(
+        {"name": models.CharField(max_length=255, unique=True)}
+    )
+
+    with pytest.raises(ProgrammingError):
+        model.objects.bulk_upsert(
+            conflict_target=["name"],
+            rows=[dict(name="a"), dict(name="a")],
+        )
+
+
+def test_bulk_upsert_dedupe_hstore_key():
+    """Tests whether rows are de-duplicated on hstore keys in the conflict
+    target."""
+
+    model = get_fake_model(
+        {
+            "title": HStoreField(uniqueness=["en"]),
+            "count": models.IntegerField(),
+        }
+    )
+
+    model.objects.bulk_upsert(
+        conflict_target=[("title", "en")],
+        rows=[
+            dict(title={"en": "a", "ro": "x"}, count=1),
+            dict(title={"en": "a", "ro": "y"}, count=2),
+            dict(title={"en": "b"}, count=3),
+        ],
+        dedupe=DedupePolicy.KEEP_LAST,
+    )
+
+    assert {obj.title["en"]: obj.count for obj in model.objects.all()} == {
+        "a": 2,
+        "b": 3,
+    }
+
+
+def test_bulk_upsert_dedupe_null_never_conflicts():
+    """Tests whether rows with NULL in the conflict target are not
+    de-duplicated because they never conflict."""
+
+    model = get_fake_model(
+        {
+            "name": models.CharField(max_length=255, null=True, unique=True),
+            "count": models.IntegerField(),
+        }
+    )
+
+    model.objects.bulk_upsert(
+        conflict_target=["name"],
+        rows=[dict(name=None, count=1), dict(name=None, count=2)],
+        dedupe=DedupePolicy.KEEP_FIRST,
+    )
+
+    assert model.objects.count() == 2
+
+
+def test_bulk_upsert_dedupe_unique_together_and_foreign_key():
+    """Tests whether rows are de-duplicated on multiple columns when some
+    of the rows specify the foreign key as a model instance."""
+
+    other_model = get_fake_model({})
+
+    model = get_fake_model(
+        {
+            "other": models.ForeignKey(other_model, on_delete=models.CASCADE),
+            "name": models.CharField(max_length=255),
+            "count": models.IntegerField(),
+        },
+        meta_options={"unique_together": ("other", "name")},
+    )
+
+    other_obj = other_model.objects.create()
+
+    model.objects.bulk_upsert(
+        conflict_target=["other", "name"],
+        rows=[
+            dict(other=other_obj, name="a", count=1),
+            dict(other_id=other_obj.pk, name="a", count=2),
+            dict(other_id=other_obj.pk, name="b", count=3),
+        ],
+        dedupe=DedupePolicy.KEEP_LAST,
+    )
+
+    assert dict(model.objects.values_list("name", "count")) == {
+        "a": 2,
+        "b": 3,
+    }
+
+
+def test_bulk_insert_on_conflict_nothing_dedupes_on_conflict_target():
+    """Tests whether rows that only differ outside the conflict target are
+    de-duplicated by default with :see:ConflictAction.NOTHING."""
+
+    model = get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "count": models.IntegerField(),
+        }
+    )
+
+    rows = model.objects.on_conflict(
+        ["name"], ConflictAction.NOTHING
+    ).bulk_insert([dict(name="a", count=1), dict(name="a", count=2)])
+
+    assert len(rows) == 1
+    assert rows[0]["count"] == 1
+    assert model.objects.get().count == 1
+
+
+@override_settings(USE_TZ=True, TIME_ZONE="UTC")
+def test_bulk_upsert_dedupe_normalizes_values():
+    """Tests whether rows are de-duplicated by the values that end up in the
+    database rather than the values as they were specified."""
+
+    model = get_fake_model(
+        {
+            "number": models.IntegerField(),
+            "timestamp": models.DateTimeField(),
+            "count": models.IntegerField(),
+        },
+        meta_options={"unique_together": ("number", "timestamp")},
+    )
+
+    naive_timestamp = datetime.datetime(2024, 1, 1, 12, 0)
+    aware_timestamp = datetime.datetime(
+        2024, 1, 1, 12, 0, tzinfo=datetime.timezone.utc
+    )
+
+    model.objects.bulk_upsert(
+        conflict_target=["number", "timestamp"],
+        rows=[
+            dict(number=1, timestamp=naive_timestamp, count=1),
+            dict(number="1", timestamp=aware_timestamp, count=2),
+        ],
+        dedupe=DedupePolicy.KEEP_LAST,
+    )
+
+    assert model.objects.get().count == 2
@@ -0,0 +1,251 @@
+import datetime
+import uuid
+
+import pytest
+
+from django.contrib.postgres.fields import ArrayField
+from django.core.exceptions import SuspiciousOperation
+from django.db import connection, models
+from django.db.models import F, Q, Value
+from django.db.models.functions import Upper
+from django.test.utils import CaptureQueriesContext
+
+from psqlextra.expressions import ExcludedCol
+from psqlextra.fields import HStoreField
+from psqlextra.query import ConflictAction
+from psqlextra.types import InsertEngine
+
+from .fake_model import get_fake_model
+
+ENGINES = [InsertEngine.VALUES, InsertEngine.COPY, InsertEngine.UNNEST]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_bulk_insert_engine_upsert(engine):
+    """Tests whether rows are inserted and updated with every engine."""
+
+    model = get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "count": models.IntegerField(),
+        }
+    )
+
+    model.objects.create(name="joe", count=1)
+
+    rows = model.objects.bulk_upsert(
+        conflict_target=["name"],
+        rows=[dict(name="joe", count=2), dict(name="john", count=3)],
+        engine=engine,
+    )
+
+    assert [row["name"] for row in rows] == ["joe", "john"]
+    assert all(row["id"] for row in rows)
+
+    assert dict(model.objects.values_list("name", "count")) == {
+        "joe": 2,
+        "john": 3,
+    }
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_bulk_insert_engine_return_model(engine):
+    """Tests whether models are returned in the order the rows were
+    specified in."""
+
+    model = get_fake_model(
+        {"name": models.CharField(max_length=255, unique=True)}
+    )
+
+    names = [str(uuid.uuid4()) for _ in range(100)]
+
+    objs = model.objects.bulk_upsert(
+        conflict_target=["name"],
+        rows=[dict(name=name) for name in names],
+        return_model=True,
+        engine=engine,
+    )
+
+    assert [obj.name for obj in objs] == names
+    assert all(isinstance(obj, model) for obj in objs)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_bulk_insert_engine_types(engine):
+    """Tests whether values of all sorts of types end up in the database
+    unchanged."""
+
+    model = get_fake_model(
+        {
+            "name": models.TextField(unique=True),
+            "title": HStoreField(null=True),
+            "data": models.JSONField(null=True),
+            "amount": models.DecimalField(
+                max_digits=10, decimal_places=2, null=True
+            ),
+            "active": models.BooleanField(null=True),
+            "created_at": models.DateTimeField(null=True),
+            "duration": models.DurationField(null=True),
+            "blob": models.BinaryField(null=True),
+            "reference": models.UUIDField(null=True),
+        }
+    )
+
+    row = dict(
+        name='tab\tnewline\nbackslash\\quote"',
+        title={"en": 'a "quoted" \\ value', "ro": None},
+        data={"list": [1, "two", None], "nested": {"a": True}},
+        amount="12.34",
+        active=False,
+        created_at=datetime.datetime(
+            2024, 1, 1, 12, 30, tzinfo=datetime.timezone.utc
+        ),
+        duration=datetime.timedelta(days=2, seconds=3, microseconds=4),
+        blob=b"\x00\x01\xff",
+        reference=uuid.UUID("2c7b7f9e-d0a3-4a7c-8a55-1c6e2f0ae001"),
+    )
+
+    model.objects.bulk_upsert(
+        conflict_target=["name"],
+        rows=[row, {**{key: None for key in row}, "name": "empty"}],
+        engine=engine,
+    )
+
+    obj = model.objects.get(name=row["name"])
+    assert obj.title == row["title"]
+    assert obj.data == row["data"]
+    assert str(obj.amount) == row["amount"]
+    assert obj.active is False
+    assert obj.created_at == row["created_at"]
+    assert obj.duration == row["duration"]
+    assert bytes(obj.blob) == row["blob"]
+    assert obj.reference == row["reference"]
+
+    obj = model.objects.get(name="empty")
+    assert obj.title is None
+    assert obj.data is None
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_bulk_insert_engine_update_condition_and_values(engine):
+    """Tests whether the update condition and custom update values are
+    respected with every engine."""
+
+    model = get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "count": models.IntegerField(default=0),
+            "active": models.BooleanField(default=True),
+        }
+    )
+
+    model.objects.create(name="joe", count=1)
+    model.objects.create(name="john", count=1, active=False)
+
+    model.objects.bulk_upsert(
+        conflict_target=["name"],
+        rows=[dict(name="joe"), dict(name="john"), dict(name="jane")],
+        update_condition=Q(active=True),
+        update_values=dict(count=F("count") + ExcludedCol("count") + 1),
+        engine=engine,
+    )
+
+    assert dict(model.objects.values_list("name", "count")) == {
+        "joe": 2,
+        "john": 1,
+        "jane": 0,
+    }
+
+
+def test_bulk_insert_engine_copy_on_conflict_nothing():
+    """Tests whether the COPY engine can be used with
+    :see:ConflictAction.NOTHING."""
+
+    model = get_fake_model(
+        {"name": models.CharField(max_length=255, unique=True)}
+    )
+
+    model.objects.create(name="joe")
+
+    with CaptureQueriesContext(connection) as ctx:
+        model.objects.on_conflict(["name"], ConflictAction.NOTHING).bulk_insert(
+            [dict(name="joe"), dict(name="john")], engine="copy"
+        )
+
+    insert_sql = next(
+        query["sql"] for query in ctx if "ON CONFLICT" in query["sql"]
+    )
+    assert "DO NOTHING" in insert_sql
+    assert "VALUES" not in insert_sql
+    assert model.objects.count() == 2
+
+
+@pytest.mark.parametrize("engine", [InsertEngine.COPY, InsertEngine.UNNEST])
+def test_bulk_insert_engine_expressions_not_allowed(engine):
+    """Tests whether using expressions as values with engines that send the
+    values separately from the SQL raises a descriptive error."""
+
+    model = get_fake_model(
+        {"name": models.CharField(max_length=255, unique=True)}
+    )
+
+    with pytest.raises(SuspiciousOperation):
+        model.objects.bulk_upsert(
+            conflict_target=["name"],
+            rows=[dict(name=Upper(Value("joe")))],
+            engine=engine,
+        )
+
+
+def test_bulk_insert_engine_unnest_constant_sql():
+    """Tests whether the UNNEST engine sends the same SQL no matter how many
+    rows are inserted."""
+
+    model = get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "count": models.IntegerField(),
+        }
+    )
+
+    executed_sql = []
+
+    def _capture_sql(execute, sql, params, many, context):
+        executed_sql.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(_capture_sql):
+        for row_count in [1, 5, 50]:
+            model.objects.bulk_upsert(
+                conflict_target=["name"],
+                rows=[
+                    dict(name=str(index), count=row_count)
+                    for index in range(row_count)
+                ],
+                engine=InsertEngine.UNNEST,
+            )
+
+    assert len(executed_sql) == 3
+    assert len(set(executed_sql)) == 1
+    assert "unnest(" in executed_sql[0]
+    assert model.objects.count() == 50
+    assert set(model.objects.values_list("count", flat=True)) == {50}
+
+
+def test_bulk_insert_engine_unnest_array_field_not_allowed():
+    """Tests whether inserting into array fields with the UNNEST engine
+    raises a descriptive error."""
+
+    model = get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "tags": ArrayField(models.TextField()),
+        }
+    )
+
+    with pytest.raises(SuspiciousOperation):
+        model.objects.bulk_upsert(
+            conflict_target=["name"],
+            rows=[dict(name="joe", tags=["a", "b"])],
+            engine=InsertEngine.UNNEST,
+        )
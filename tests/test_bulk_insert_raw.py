@@ -0,0 +1,95 @@
+import uuid
+
+import pytest
+
+from django.core.exceptions import SuspiciousOperation
+from django.db import models
+from django.db.models.signals import pre_init
+
+from psqlextra.fields import HStoreField
+from psqlextra.types import InsertEngine
+
+from .fake_model import get_fake_model
+
+
+@pytest.fixture
+def model():
+    other_model = get_fake_model({"name": models.CharField(max_length=255)})
+
+    return get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "title": HStoreField(null=True),
+            "token": models.UUIDField(default=uuid.uuid4),
+            "updated_at": models.DateTimeField(auto_now=True),
+            "other": models.ForeignKey(
+                other_model, null=True, on_delete=models.CASCADE
+            ),
+        }
+    )
+
+
+@pytest.mark.parametrize("engine", list(InsertEngine))
+def test_bulk_upsert_raw(model, engine):
+    """Tests whether rows can be upserted without creating model instances
+    with every engine."""
+
+    other = model._meta.get_field("other").related_model.objects.create()
+
+    def _upsert(title):
+        return model.objects.bulk_upsert(
+            conflict_target=["name"],
+            rows=[
+                dict(name="joe", title=title, other_id=other.pk),
+                dict(name="jane", title=title, other_id=None),
+            ],
+            engine=engine,
+            raw=True,
+        )
+
+    _upsert({"en": "beer"})
+    rows = _upsert({"en": "wine"})
+
+    assert [row["name"] for row in rows] == ["joe", "jane"]
+
+    joe, jane = model.objects.order_by("-name")
+    assert joe.title == {"en": "wine"}
+    assert joe.other_id == other.pk
+    assert jane.other_id is None
+    assert joe.token != jane.token
+    assert joe.updated_at and jane.updated_at
+
+
+def test_bulk_upsert_raw_no_model_instances(model):
+    """Tests whether no model instances are created for the rows."""
+
+    instances = []
+
+    def _on_pre_init(sender, **kwargs):
+        instances.append(kwargs)
+
+    pre_init.connect(_on_pre_init, sender=model)
+    try:
+        model.objects.bulk_upsert(
+            conflict_target=["name"],
+            rows=[dict(name=str(index)) for index in range(10)],
+            raw=True,
+        )
+    finally:
+        pre_init.disconnect(_on_pre_init, sender=model)
+
+    # only the instances used to figure out which fields to upsert
+    assert len(instances) <= 2
+    assert model.objects.count() == 10
+
+
+def test_bulk_upsert_raw_different_fields(model):
+    """Tests whether rows with different fields than the first row are
+    rejected."""
+
+    with pytest.raises(SuspiciousOperation):
+        model.objects.bulk_upsert(
+            conflict_target=["name"],
+            rows=[dict(name="joe", title=None), dict(name="jane", other=None)],
+            raw=True,
+        )
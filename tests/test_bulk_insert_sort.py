@@ -0,0 +1,119 @@
+import pytest
+
+from django.core.exceptions import SuspiciousOperation
+from django.db import connection, models
+from django.db.models import Q, UniqueConstraint
+from django.db.models.functions import Lower
+
+from psqlextra.conflict_keys import build_conflict_key_getter, sort_rows
+from psqlextra.types import InsertEngine
+
+from .fake_model import get_fake_model
+
+
+@pytest.fixture
+def model():
+    return get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True, null=True),
+            "count": models.IntegerField(default=0),
+        }
+    )
+
+
+@pytest.mark.parametrize("engine", list(InsertEngine))
+def test_bulk_upsert_sort(model, engine):
+    """Tests whether rows are sent in the order of the conflict target."""
+
+    captured_params = []
+
+    def _capture(execute, sql, params, many, context):
+        captured_params.append(params)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(_capture):
+        result = model.objects.bulk_upsert(
+            conflict_target=["name"],
+            rows=[
+                dict(name="c", count=1),
+                dict(name="a", count=2),
+                dict(name="b", count=3),
+            ],
+            engine=engine,
+            returning=["name", "count"],
+            return_outcome=True,
+            sort=True,
+        )
+
+    assert [row["name"] for row in result.rows] == ["a", "b", "c"]
+    assert [row["count"] for row in result.rows] == [2, 3, 1]
+    assert result.reordered == 3
+
+    if engine == InsertEngine.VALUES:
+        assert list(captured_params[-1])[:6] == ["a", 2, "b", 3, "c", 1]
+
+
+def test_sort_rows():
+    """Tests whether sorting is stable, puts rows without a key last and
+    counts the rows that moved."""
+
+    model = get_fake_model(
+        {
+            "name": models.CharField(max_length=255, null=True),
+            "count": models.IntegerField(default=0),
+        }
+    )
+
+    rows = [
+        dict(name=None, count=1),
+        dict(name="b", count=2),
+        dict(name="a", count=3),
+        dict(name="b", count=4),
+        dict(name="c", count=5),
+    ]
+
+    sorted_rows, reordered = sort_rows(
+        rows, build_conflict_key_getter(model, ["name"])
+    )
+
+    assert [row["count"] for row in sorted_rows] == [3, 2, 4, 5, 1]
+    assert reordered == 4
+
+
+def test_sort_rows_already_sorted(model):
+    """Tests whether nothing is reported as reordered when the rows were
+    already sorted."""
+
+    rows = [dict(name=str(index)) for index in range(5)]
+
+    sorted_rows, reordered = sort_rows(
+        rows, build_conflict_key_getter(model, ["name"])
+    )
+
+    assert sorted_rows == rows
+    assert reordered == 0
+
+
+def test_bulk_upsert_sort_expression_conflict_target():
+    """Tests whether sorting is refused when the conflict target does not
+    consist of fields."""
+
+    model = get_fake_model(
+        {"name": models.CharField(max_length=255)},
+        meta_options={
+            "constraints": [
+                UniqueConstraint(
+                    Lower("name"),
+                    name="sort_lower_name",
+                    condition=Q(name__isnull=False),
+                )
+            ]
+        },
+    )
+
+    with pytest.raises(SuspiciousOperation):
+        model.objects.bulk_upsert(
+            conflict_target=model._meta.constraints[0],
+            rows=[dict(name="a")],
+            sort=True,
+        )
@@ -0,0 +1,151 @@
+import pytest
+
+from django.core.exceptions import SuspiciousOperation
+from django.db import connection, models
+from django.db.models import F, Q
+
+from psqlextra.expressions import MergeSourceCol
+from psqlextra.merge import WhenMatched, WhenNotMatched, WhenNotMatchedBySource
+from psqlextra.types import MergeAction
+
+from .fake_model import get_fake_model
+
+
+@pytest.fixture(autouse=True)
+def require_merge():
+    if connection.pg_version < 150000:
+        pytest.skip("MERGE requires PostgreSQL 15 or newer")
+
+
+@pytest.fixture
+def model():
+    # deliberately no unique constraint on name
+    return get_fake_model(
+        {
+            "name": models.CharField(max_length=255),
+            "count": models.IntegerField(default=0),
+            "deleted": models.BooleanField(default=False),
+        }
+    )
+
+
+def _get_counts(model):
+    return dict(model.objects.values_list("name", "count"))
+
+
+def test_bulk_merge(model):
+    """Tests whether matched rows are updated and other rows are inserted by
+    default."""
+
+    model.objects.create(name="joe", count=1)
+
+    affected_rows = model.objects.bulk_merge(
+        [dict(name="joe", count=2), dict(name="jane", count=3)],
+        match_on=["name"],
+    )
+
+    assert affected_rows == 2
+    assert _get_counts(model) == {"joe": 2, "jane": 3}
+
+
+def test_bulk_merge_conditional(model):
+    """Tests whether matched rows can be deleted or updated depending on a
+    condition."""
+
+    model.objects.create(name="joe", count=5)
+    model.objects.create(name="jane", count=1)
+    model.objects.create(name="john", count=1)
+
+    model.objects.bulk_merge(
+        [
+            dict(name="joe", count=2, deleted=False),
+            dict(name="jane", count=2, deleted=False),
+            dict(name="john", count=2, deleted=True),
+            dict(name="jack", count=2, deleted=False),
+        ],
+        match_on=["name"],
+        when=[
+            WhenMatched(
+                MergeAction.DELETE, condition=MergeSourceCol("deleted")
+            ),
+            WhenMatched(
+                MergeAction.UPDATE,
+                condition=Q(count__lt=MergeSourceCol("count")),
+                update_values=dict(count=F("count") + MergeSourceCol("count")),
+            ),
+            WhenNotMatched(),
+        ],
+    )
+
+    assert _get_counts(model) == {"joe": 5, "jane": 3, "jack": 2}
+    assert not model.objects.filter(deleted=True).exists()
+
+
+def test_bulk_merge_not_matched_by_source(model):
+    """Tests whether rows that are not in the merged rows can be deleted to
+    reconcile a snapshot."""
+
+    if connection.pg_version < 170000:
+        pytest.skip("WHEN NOT MATCHED BY SOURCE requires PostgreSQL 17")
+
+    model.objects.create(name="joe", count=1)
+    model.objects.create(name="gone", count=1)
+
+    affected_rows = model.objects.bulk_merge(
+        [dict(name="joe", count=2), dict(name="jane", count=3)],
+        match_on=["name"],
+        when=[WhenMatched(), WhenNotMatched(), WhenNotMatchedBySource()],
+    )
+
+    assert affected_rows == 3
+    assert _get_counts(model) == {"joe": 2, "jane": 3}
+
+
+def test_bulk_merge_batches(model):
+    """Tests whether rows can be merged in batches."""
+
+    affected_rows = model.objects.bulk_merge(
+        [dict(name=str(index), count=index) for index in range(5)],
+        match_on=["name"],
+        batch_size=2,
+    )
+
+    assert affected_rows == 5
+    assert model.objects.count() == 5
+
+
+def test_bulk_merge_not_matched_by_source_batches(model):
+    """Tests whether deleting rows that are not merged is refused when
+    merging in batches since every batch would delete the others."""
+
+    with pytest.raises(SuspiciousOperation):
+        model.objects.bulk_merge(
+            [dict(name="joe")],
+            match_on=["name"],
+            when=[WhenNotMatchedBySource()],
+            batch_size=1,
+        )
+
+
+@pytest.mark.parametrize(
+    "factory",
+    [
+        lambda: WhenMatched(MergeAction.INSERT),
+        lambda: WhenNotMatched(MergeAction.DELETE),
+        lambda: WhenNotMatched(update_values=dict(count=1)),
+        lambda: WhenNotMatchedBySource(MergeAction.UPDATE),
+    ],
+)
+def test_bulk_merge_invalid_when(factory):
+    """Tests whether actions PostgreSQL does not allow are refused."""
+
+    with pytest.raises(SuspiciousOperation):
+        factory()
+
+
+def test_bulk_merge_invalid_match_on(model):
+    """Tests whether matching on something that is not a field is
+    refused."""
+
+    with pytest.raises(SuspiciousOperation):
+        model.objects.bulk_merge([dict(name="joe")], match_on=["nope"])
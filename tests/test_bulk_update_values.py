@@ -0,0 +1,127 @@
+import pytest
+
+from django.core.exceptions import SuspiciousOperation
+from django.db import connection, models
+
+from psqlextra.types import InsertEngine
+
+from .fake_model import get_fake_model
+
+
+@pytest.fixture
+def model():
+    return get_fake_model(
+        {
+            "name": models.CharField(max_length=255),
+            "count": models.IntegerField(default=0),
+            "title": models.CharField(max_length=255, null=True),
+        }
+    )
+
+
+def _get_rows(model):
+    return {
+        name: (count, title)
+        for name, count, title in model.objects.values_list(
+            "name", "count", "title"
+        )
+    }
+
+
+@pytest.mark.parametrize("engine", [InsertEngine.VALUES, InsertEngine.UNNEST])
+def test_bulk_update_values(model, engine):
+    """Tests whether existing rows are updated with a single statement and
+    rows that do not exist are ignored."""
+
+    model.objects.create(name="joe", count=1, title="a")
+    model.objects.create(name="jane", count=1, title="b")
+    model.objects.create(name="john", count=1, title="c")
+
+    executed_sql = []
+
+    def _capture(execute, sql, params, many, context):
+        executed_sql.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(_capture):
+        affected_rows = model.objects.bulk_update_values(
+            [
+                dict(name="joe", count=2, title=None),
+                dict(name="jane", count=3, title="x"),
+                dict(name="nope", count=4, title="y"),
+            ],
+            key=["name"],
+            engine=engine,
+        )
+
+    assert affected_rows == 2
+    assert len(executed_sql) == 1
+    assert executed_sql[0].startswith("UPDATE")
+    assert _get_rows(model) == {
+        "joe": (2, None),
+        "jane": (3, "x"),
+        "john": (1, "c"),
+    }
+
+
+def test_bulk_update_values_fields(model):
+    """Tests whether only the specified fields are updated."""
+
+    obj = model.objects.create(name="joe", count=1, title="a")
+
+    model.objects.bulk_update_values(
+        [dict(id=obj.id, name="jane", count=2)],
+        key=["id"],
+        fields=["count"],
+    )
+
+    assert _get_rows(model) == {"joe": (2, "a")}
+
+
+def test_bulk_update_values_returning(model):
+    """Tests whether the updated rows can be returned."""
+
+    obj = model.objects.create(name="joe", count=1)
+
+    updated_rows = model.objects.bulk_update_values(
+        [dict(name="joe", count=5), dict(name="nope", count=6)],
+        key=["name"],
+        returning=["id", "count"],
+    )
+
+    assert updated_rows == [dict(id=obj.id, count=5)]
+
+
+def test_bulk_update_values_batches(model):
+    """Tests whether rows can be updated in batches."""
+
+    for index in range(5):
+        model.objects.create(name=str(index))
+
+    affected_rows = model.objects.bulk_update_values(
+        [dict(name=str(index), count=index) for index in range(5)],
+        key=["name"],
+        batch_size=2,
+        raw=True,
+    )
+
+    assert affected_rows == 5
+    assert sorted(model.objects.values_list("count", flat=True)) == list(
+        range(5)
+    )
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        dict(key=["nope"]),
+        dict(key=["name"], fields=["nope"]),
+        dict(key=["name"], fields=["name"]),
+        dict(key=["name"], engine=InsertEngine.COPY),
+    ],
+)
+def test_bulk_update_values_invalid(model, kwargs):
+    """Tests whether invalid keys, fields and engines are refused."""
+
+    with pytest.raises(SuspiciousOperation):
+        model.objects.bulk_update_values([dict(name="joe", count=1)], **kwargs)
@@ -0,0 +1,196 @@
+from datetime import timedelta
+
+import pytest
+
+from django.core.exceptions import SuspiciousOperation
+from django.db import ProgrammingError, connection, models
+from django.utils import timezone
+
+from psqlextra.adaptive import ConflictRatioTracker
+from psqlextra.types import DedupePolicy, UpsertStrategy
+
+from .fake_model import get_fake_model
+
+
+@pytest.fixture
+def model():
+    return get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "count": models.IntegerField(default=0),
+        }
+    )
+
+
+def _bulk_upsert(model, rows, **kwargs):
+    executed_sql = []
+
+    def _capture(execute, sql, params, many, context):
+        executed_sql.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(_capture):
+        affected_rows = model.objects.bulk_upsert(
+            ["name"], rows, returning=None, adaptive=True, **kwargs
+        )
+
+    return affected_rows, [sql.split(" ")[0] for sql in executed_sql]
+
+
+@pytest.fixture
+def update_first(monkeypatch):
+    monkeypatch.setattr(
+        ConflictRatioTracker,
+        "choose",
+        lambda self: UpsertStrategy.UPDATE_FIRST,
+    )
+
+
+def test_conflict_ratio_tracker():
+    """Tests whether the tracker switches strategies once the conflict ratio
+    moves past the threshold."""
+
+    tracker = ConflictRatioTracker(smoothing=0.5)
+    assert tracker.choose() == UpsertStrategy.INSERT
+
+    tracker.observe(0, 10)
+    tracker.observe(10, 10)
+    assert tracker.ratio == 0.5
+    assert tracker.choose() == UpsertStrategy.INSERT
+
+    tracker.observe(10, 10)
+    assert tracker.ratio == 0.75
+    assert tracker.choose() == UpsertStrategy.UPDATE_FIRST
+
+
+def test_bulk_upsert_adaptive(model):
+    """Tests whether rows are updated first once most rows turn out to
+    exist already, and inserted first again once most rows are new."""
+
+    affected_rows, statements = _bulk_upsert(
+        model, [dict(name=str(index)) for index in range(10)]
+    )
+    assert affected_rows == 10
+    assert statements == ["INSERT"]
+
+    # mostly existing rows and a new one every time
+    for count in range(1, 11):
+        affected_rows, statements = _bulk_upsert(
+            model,
+            [dict(name=str(index), count=count) for index in range(10 + count)],
+        )
+        assert affected_rows == 10 + count
+
+        if statements[0] == "UPDATE":
+            break
+
+    assert statements == ["UPDATE", "INSERT"]
+    assert sorted(model.objects.values_list("name", "count")) == sorted(
+        (str(index), count) for index in range(10 + count)
+    )
+
+    # only new rows
+    for attempt in range(10):
+        affected_rows, statements = _bulk_upsert(
+            model, [dict(name=f"new-{attempt}-{index}") for index in range(10)]
+        )
+        assert affected_rows == 10
+
+        if statements == ["INSERT"]:
+            break
+
+    assert statements == ["INSERT"]
+
+
+def test_bulk_upsert_adaptive_returning(model):
+    """Tests whether adaptive upserts refuse to return rows."""
+
+    with pytest.raises(SuspiciousOperation):
+        model.objects.bulk_upsert(["name"], [dict(name="joe")], adaptive=True)
+
+
+def test_bulk_upsert_adaptive_update_first_auto_now(monkeypatch):
+    """Tests whether updating first also sets fields that are set by
+    `pre_save`, the same way the upsert would."""
+
+    model = get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "count": models.IntegerField(default=0),
+            "updated_at": models.DateTimeField(auto_now=True),
+        }
+    )
+
+    obj = model.objects.create(name="joe")
+    model.objects.update(updated_at=obj.updated_at - timedelta(days=1))
+
+    monkeypatch.setattr(
+        ConflictRatioTracker,
+        "choose",
+        lambda self: UpsertStrategy.UPDATE_FIRST,
+    )
+
+    affected_rows, statements = _bulk_upsert(model, [dict(name="joe", count=1)])
+    assert affected_rows == 1
+    assert statements == ["UPDATE"]
+
+    obj.refresh_from_db()
+    assert obj.count == 1
+    assert obj.updated_at > timezone.now() - timedelta(minutes=1)
+
+
+def test_bulk_upsert_adaptive_update_first_dedupe(model, update_first):
+    """Tests whether updating first de-duplicates the rows the same way the
+    upsert would."""
+
+    model.objects.create(name="joe")
+
+    affected_rows, statements = _bulk_upsert(
+        model,
+        [dict(name="joe", count=1), dict(name="joe", count=2)],
+        dedupe=DedupePolicy.KEEP_LAST,
+    )
+    assert affected_rows == 1
+    assert statements == ["UPDATE"]
+    assert model.objects.get(name="joe").count == 2
+
+
+def test_bulk_upsert_adaptive_update_first_duplicates(model, update_first):
+    """Tests whether updating first refuses duplicate rows the same way the
+    upsert does, instead of silently applying one of them."""
+
+    model.objects.create(name="joe")
+
+    with pytest.raises(ProgrammingError, match="a second time"):
+        _bulk_upsert(
+            model, [dict(name="joe", count=1), dict(name="joe", count=2)]
+        )
+
+
+def test_bulk_upsert_adaptive_update_first_sort(model, update_first):
+    """Tests whether updating first sorts the rows by the conflict target
+    the same way the upsert would."""
+
+    model.objects.bulk_create([model(name="a"), model(name="b")])
+
+    executed_params = []
+
+    def _capture(execute, sql, params, many, context):
+        executed_params.append(params)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(_capture):
+        model.objects.bulk_upsert(
+            ["name"],
+            [dict(name="b", count=2), dict(name="a", count=1)],
+            returning=None,
+            adaptive=True,
+            sort=True,
+        )
+
+    names = [param for param in executed_params[0] if param in ("a", "b")]
+    assert names == ["a", "b"]
+    assert sorted(model.objects.values_list("name", "count")) == [
+        ("a", 1),
+        ("b", 2),
+    ]
@@ -0,0 +1,280 @@
+import datetime
+
+import pytest
+
+from django.core.exceptions import SuspiciousOperation
+from django.db import connection, models
+from django.db.models import Q, UniqueConstraint
+
+from psqlextra.backend.schema import PostgresSchemaEditor
+from psqlextra.partition_routing import (
+    PostgresPartitionRouter,
+    get_partition_router,
+)
+from psqlextra.types import InsertEngine, PostgresPartitioningMethod
+
+from .fake_model import define_fake_partitioned_model, get_fake_model
+
+
+@pytest.fixture
+def model():
+    model = define_fake_partitioned_model(
+        {
+            "name": models.TextField(),
+            "timestamp": models.DateField(),
+            "count": models.IntegerField(default=0),
+        },
+        {"method": PostgresPartitioningMethod.RANGE, "key": ["timestamp"]},
+        {
+            "constraints": [
+                UniqueConstraint(
+                    fields=["name", "timestamp"],
+                    name="routing_name_timestamp",
+                )
+            ]
+        },
+    )
+
+    schema_editor = PostgresSchemaEditor(connection)
+    schema_editor.create_partitioned_model(model)
+    schema_editor.add_range_partition(model, "jan", "2024-01-01", "2024-02-01")
+    schema_editor.add_range_partition(model, "feb", "2024-02-01", "2024-03-01")
+    schema_editor.add_default_partition(model, "default")
+
+    return model
+
+
+def _count_rows(table_name):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT COUNT(*) FROM ONLY %s"
+            % connection.ops.quote_name(table_name)
+        )
+        return cursor.fetchone()[0]
+
+
+@pytest.mark.parametrize("engine", list(InsertEngine))
+def test_bulk_upsert_route_to_partitions(model, engine):
+    """Tests whether rows are upserted straight into the partitions they
+    belong in."""
+
+    table_name = model._meta.db_table
+
+    executed_sql = []
+
+    def _capture(execute, sql, params, many, context):
+        executed_sql.append(sql)
+        return execute(sql, params, many, context)
+
+    rows = [
+        dict(name="a", timestamp=datetime.date(2024, 1, 5), count=1),
+        dict(name="b", timestamp=datetime.date(2024, 2, 5), count=1),
+        dict(name="c", timestamp="2024-01-31", count=1),
+        dict(name="d", timestamp=datetime.date(2024, 5, 1), count=1),
+    ]
+
+    with connection.execute_wrapper(_capture):
+        model.objects.bulk_upsert(
+            conflict_target=["name", "timestamp"],
+            rows=rows,
+            engine=engine,
+            route_to_partitions=True,
+        )
+
+    assert any(f'INTO "{table_name}_jan" AS' in sql for sql in executed_sql)
+    assert any(f'INTO "{table_name}_feb" AS' in sql for sql in executed_sql)
+
+    assert _count_rows(f"{table_name}_jan") == 2
+    assert _count_rows(f"{table_name}_feb") == 1
+    assert _count_rows(f"{table_name}_default") == 1
+
+    upserted_rows = model.objects.bulk_upsert(
+        conflict_target=["name", "timestamp"],
+        rows=[{**row, "count": 2} for row in rows],
+        engine=engine,
+        returning=["name", "count"],
+        route_to_partitions=True,
+    )
+
+    assert sorted(row["name"] for row in upserted_rows) == ["a", "b", "c", "d"]
+    assert model.objects.count() == 4
+    assert set(model.objects.values_list("count", flat=True)) == {2}
+
+
+def test_bulk_upsert_route_to_partitions_new_partition(model):
+    """Tests whether partitions that are added after rows were routed are
+    used."""
+
+    get_partition_router(model, "default")
+
+    schema_editor = PostgresSchemaEditor(connection)
+    schema_editor.add_range_partition(model, "mar", "2024-03-01", "2024-04-01")
+
+    model.objects.bulk_upsert(
+        conflict_target=["name", "timestamp"],
+        rows=[dict(name="a", timestamp=datetime.date(2024, 3, 1))],
+        route_to_partitions=True,
+    )
+
+    assert _count_rows(f"{model._meta.db_table}_mar") == 1
+
+
+def test_bulk_upsert_route_to_partitions_dropped_partition(model):
+    """Tests whether rows are upserted through the partitioned table when
+    the partition they were routed to was dropped by another process."""
+
+    table_name = model._meta.db_table
+    get_partition_router(model, "default")
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "DROP TABLE %s" % connection.ops.quote_name(f"{table_name}_jan")
+        )
+
+    model.objects.bulk_upsert(
+        conflict_target=["name", "timestamp"],
+        rows=[dict(name="a", timestamp=datetime.date(2024, 1, 5))],
+        route_to_partitions=True,
+    )
+
+    assert _count_rows(f"{table_name}_default") == 1
+    assert (
+        get_partition_router(model, "default").get_table_name(
+            dict(timestamp=datetime.date(2024, 1, 5))
+        )
+        is None
+    )
+
+
+def test_bulk_upsert_route_to_partitions_constraint_target(model):
+    """Tests whether rows can be routed with a constraint as the conflict
+    target, even though the partitions' copies of the constraint have other
+    names."""
+
+    (constraint,) = model._meta.constraints
+    table_name = model._meta.db_table
+
+    rows = [
+        dict(name="a", timestamp=datetime.date(2024, 1, 5), count=1),
+        dict(name="b", timestamp=datetime.date(2024, 2, 5), count=1),
+    ]
+
+    for count in (1, 2):
+        upserted_rows = model.objects.bulk_upsert(
+            conflict_target=constraint,
+            rows=[{**row, "count": count} for row in rows],
+            returning=["name", "count"],
+            route_to_partitions=True,
+        )
+
+        assert sorted(row["name"] for row in upserted_rows) == ["a", "b"]
+
+    assert _count_rows(f"{table_name}_jan") == 1
+    assert _count_rows(f"{table_name}_feb") == 1
+    assert set(model.objects.values_list("count", flat=True)) == {2}
+
+
+def test_bulk_upsert_route_to_partitions_conditional_constraint(model):
+    """Tests whether routing with a constraint that cannot be inferred from
+    its columns is refused."""
+
+    constraint = UniqueConstraint(
+        fields=["name", "timestamp"],
+        condition=Q(count__gt=0),
+        name="routing_name_timestamp_positive",
+    )
+
+    with pytest.raises(SuspiciousOperation):
+        model.objects.bulk_upsert(
+            conflict_target=constraint,
+            rows=[dict(name="a", timestamp=datetime.date(2024, 1, 5))],
+            route_to_partitions=True,
+        )
+
+
+def test_partition_router_ignores_other_schemas(model):
+    """Tests whether partitions of a table with the same name in another
+    schema are not used."""
+
+    table_name = connection.ops.quote_name(model._meta.db_table)
+
+    with connection.cursor() as cursor:
+        cursor.execute("CREATE SCHEMA routing_other")
+        cursor.execute(
+            "CREATE TABLE routing_other.%s (timestamp date) "
+            "PARTITION BY RANGE (timestamp)" % table_name
+        )
+        cursor.execute(
+            "CREATE TABLE routing_other.other_mar "
+            "PARTITION OF routing_other.%s "
+            "FOR VALUES FROM ('2024-03-01') TO ('2024-04-01')" % table_name
+        )
+
+    router = get_partition_router(model, "default")
+
+    assert router.get_table_name(dict(timestamp="2024-01-05")) is not None
+    assert router.get_table_name(dict(timestamp="2024-03-05")) is None
+
+
+def test_partition_router_range():
+    """Tests whether rows are routed to the range partitions they fit in,
+    taking MINVALUE/MAXVALUE and exclusive upper bounds into account."""
+
+    model = define_fake_partitioned_model(
+        {"a": models.IntegerField(), "b": models.IntegerField()},
+        {"method": PostgresPartitioningMethod.RANGE, "key": ["a", "b"]},
+    )
+
+    router = PostgresPartitionRouter(
+        model,
+        [
+            ("p1", "FOR VALUES FROM (MINVALUE, MINVALUE) TO (10, 5)"),
+            ("p2", "FOR VALUES FROM (10, 5) TO (20, MAXVALUE)"),
+            ("p3", "DEFAULT"),
+        ],
+    )
+
+    assert router.get_table_name(dict(a=-100, b=0)) == "p1"
+    assert router.get_table_name(dict(a=10, b=4)) == "p1"
+    assert router.get_table_name(dict(a=10, b=5)) == "p2"
+    assert router.get_table_name(dict(a="20", b=1000)) == "p2"
+    assert router.get_table_name(dict(a=21, b=0)) is None
+    assert router.get_table_name(dict(a=None, b=0)) is None
+
+
+def test_partition_router_list():
+    """Tests whether rows are routed to the list partitions that contain
+    their value."""
+
+    model = define_fake_partitioned_model(
+        {"category": models.TextField()},
+        {"method": PostgresPartitioningMethod.LIST, "key": ["category"]},
+    )
+
+    router = PostgresPartitionRouter(
+        model,
+        [
+            ("p1", "FOR VALUES IN ('it''s', 'a,b', NULL)"),
+            ("p2", "FOR VALUES IN ('x')"),
+        ],
+    )
+
+    assert router.get_table_name(dict(category="it's")) == "p1"
+    assert router.get_table_name(dict(category="a,b")) == "p1"
+    assert router.get_table_name(dict(category="x")) == "p2"
+    assert router.get_table_name(dict(category="y")) is None
+    assert router.get_table_name(dict(category=None)) is None
+
+
+def test_bulk_upsert_route_to_partitions_not_partitioned():
+    """Tests whether routing rows of a model that is not partitioned is
+    refused."""
+
+    model = get_fake_model({"name": models.TextField(unique=True)})
+
+    with pytest.raises(SuspiciousOperation):
+        model.objects.bulk_upsert(
+            conflict_target=["name"],
+            rows=[dict(name="a")],
+            route_to_partitions=True,
+        )
@@ -0,0 +1,132 @@
+import pytest
+
+from django.db import connection, models
+
+from .fake_model import get_fake_model
+
+
+@pytest.fixture
+def customer_model():
+    return get_fake_model(
+        {
+            "external_id": models.CharField(max_length=255, unique=True),
+            "region": models.CharField(max_length=255, null=True),
+        }
+    )
+
+
+@pytest.fixture
+def order_model(customer_model):
+    return get_fake_model(
+        {
+            "number": models.CharField(max_length=255, unique=True),
+            "customer": models.ForeignKey(
+                customer_model, on_delete=models.CASCADE
+            ),
+        }
+    )
+
+
+def test_bulk_upsert_related_lookups(customer_model, order_model):
+    """Tests whether foreign keys can be specified as a lookup on the
+    related model, and whether all lookups are resolved with a single
+    query."""
+
+    customer_a = customer_model.objects.create(external_id="a", region="eu")
+    customer_b = customer_model.objects.create(external_id="b", region="us")
+
+    executed_sql = []
+
+    def _capture(execute, sql, params, many, context):
+        executed_sql.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(_capture):
+        order_model.objects.bulk_upsert(
+            ["number"],
+            [
+                dict(number="1", customer=dict(external_id="a")),
+                dict(number="2", customer=customer_b),
+                dict(number="3", customer=dict(external_id="b", region="us")),
+                dict(number="4", customer=dict(external_id="a")),
+            ],
+            returning=None,
+        )
+
+    assert len(executed_sql) == 2
+    assert "UNION ALL" in executed_sql[0]
+    assert executed_sql[1].startswith("INSERT")
+
+    assert dict(order_model.objects.values_list("number", "customer_id")) == {
+        "1": customer_a.id,
+        "2": customer_b.id,
+        "3": customer_b.id,
+        "4": customer_a.id,
+    }
+
+
+def test_upsert_related_lookups(customer_model, order_model):
+    """Tests whether single upserts resolve lookups as well, and whether
+    the foreign key is updated on conflict."""
+
+    customer_a = customer_model.objects.create(external_id="a")
+    customer_b = customer_model.objects.create(external_id="b")
+
+    for customer in (customer_a, customer_b):
+        obj = order_model.objects.upsert_and_get(
+            ["number"],
+            dict(number="1", customer=dict(external_id=customer.external_id)),
+        )
+
+        assert obj.customer_id == customer.id
+
+
+def test_bulk_upsert_related_lookups_missing(customer_model):
+    """Tests whether a lookup that matches no row fails rather than silently
+    setting the foreign key to NULL."""
+
+    order_model = get_fake_model(
+        {
+            "number": models.CharField(max_length=255, unique=True),
+            "customer": models.ForeignKey(
+                customer_model, null=True, on_delete=models.CASCADE
+            ),
+        }
+    )
+
+    customer_model.objects.create(external_id="a")
+
+    with pytest.raises(customer_model.DoesNotExist, match="nope"):
+        order_model.objects.bulk_upsert(
+            ["number"],
+            [
+                dict(number="1", customer=dict(external_id="a")),
+                dict(number="2", customer=dict(external_id="nope")),
+            ],
+        )
+
+    assert not order_model.objects.exists()
+
+
+def test_bulk_upsert_related_lookups_multiple(customer_model, order_model):
+    """Tests whether a lookup that matches more than one row fails."""
+
+    customer_model.objects.create(external_id="a", region="eu")
+    customer_model.objects.create(external_id="b", region="eu")
+
+    with pytest.raises(customer_model.MultipleObjectsReturned):
+        order_model.objects.bulk_upsert(
+            ["number"], [dict(number="1", customer=dict(region="eu"))]
+        )
+
+
+def test_bulk_insert_related_lookups_raw(customer_model, order_model):
+    """Tests whether lookups are resolved for raw rows."""
+
+    customer = customer_model.objects.create(external_id="a")
+
+    order_model.objects.bulk_insert(
+        [dict(number="1", customer=dict(external_id="a"))], raw=True
+    )
+
+    assert order_model.objects.get().customer_id == customer.id
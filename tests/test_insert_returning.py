@@ -0,0 +1,155 @@
+import pytest
+
+from django.core.exceptions import SuspiciousOperation
+from django.db import connection, models
+from django.test.utils import CaptureQueriesContext
+
+from psqlextra.query import ConflictAction
+from psqlextra.types import InsertEngine
+
+from .fake_model import get_fake_model
+
+
+@pytest.fixture
+def model():
+    return get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "count": models.IntegerField(default=0),
+        }
+    )
+
+
+@pytest.mark.parametrize("returning", [None, []])
+@pytest.mark.parametrize("engine", list(InsertEngine))
+def test_bulk_upsert_returning_none(model, engine, returning):
+    """Tests whether only the amount of affected rows is returned and nothing
+    is returned by PostgreSQL when `returning` is None or empty."""
+
+    model.objects.create(name="joe")
+
+    with CaptureQueriesContext(connection) as ctx:
+        affected_rows = model.objects.bulk_upsert(
+            conflict_target=["name"],
+            rows=[dict(name="joe", count=1), dict(name="jane", count=2)],
+            engine=engine,
+            returning=returning,
+        )
+
+    assert affected_rows == 2
+    assert not any("RETURNING" in query["sql"] for query in ctx)
+    assert model.objects.get(name="joe").count == 1
+
+
+def test_bulk_upsert_returning_none_in_chunks(model):
+    """Tests whether the amount of affected rows is summed up over all chunks
+    and yielded per chunk."""
+
+    rows = [dict(name=str(index)) for index in range(5)]
+
+    assert (
+        model.objects.bulk_upsert(
+            conflict_target=["name"], rows=rows, batch_size=2, returning=None
+        )
+        == 5
+    )
+
+    chunks = model.objects.bulk_upsert(
+        conflict_target=["name"],
+        rows=rows,
+        batch_size=2,
+        returning=None,
+        yield_chunks=True,
+    )
+
+    assert list(chunks) == [2, 2, 1]
+
+
+def test_bulk_insert_on_conflict_nothing_returning_none(model):
+    """Tests whether rows that were not inserted because of a conflict are not
+    counted."""
+
+    model.objects.create(name="joe")
+
+    affected_rows = model.objects.on_conflict(
+        ["name"], ConflictAction.NOTHING
+    ).bulk_insert([dict(name="joe"), dict(name="jane")], returning=None)
+
+    assert affected_rows == 1
+
+
+def test_bulk_insert_returning_none_without_conflict_handling(model):
+    """Tests whether the amount of inserted rows is returned when falling back
+    to Django's standard bulk_create."""
+
+    assert (
+        model.objects.bulk_insert(
+            [dict(name="joe"), dict(name="jane")], returning=None
+        )
+        == 2
+    )
+
+
+@pytest.mark.parametrize("returning", [["count"], "count"])
+def test_bulk_upsert_returning_columns(model, returning):
+    """Tests whether only the specified columns are returned and merged into
+    the rows."""
+
+    with CaptureQueriesContext(connection) as ctx:
+        rows = model.objects.bulk_upsert(
+            conflict_target=["name"],
+            rows=[dict(name="joe", count=1)],
+            returning=returning,
+        )
+
+    assert rows == [dict(name="joe", count=1)]
+    assert 'RETURNING "count"' in ctx[0]["sql"]
+
+
+def test_bulk_upsert_returning_all(model):
+    """Tests whether all columns are returned with "*"."""
+
+    rows = model.objects.bulk_upsert(
+        conflict_target=["name"], rows=[dict(name="joe")], returning="*"
+    )
+
+    assert rows == [
+        dict(id=model.objects.get().id, name="joe", count=0),
+    ]
+
+
+def test_upsert_returning(model):
+    """Tests whether :see:upsert returns the amount of affected rows or the
+    specified columns."""
+
+    assert (
+        model.objects.upsert(
+            conflict_target=["name"], fields=dict(name="joe"), returning=None
+        )
+        == 1
+    )
+
+    assert (
+        model.objects.upsert(
+            conflict_target=["name"], fields=dict(name="joe"), returning=[]
+        )
+        == 1
+    )
+
+    assert model.objects.upsert(
+        conflict_target=["name"],
+        fields=dict(name="joe", count=3),
+        returning=["name", "count"],
+    ) == dict(name="joe", count=3)
+
+
+def test_upsert_returning_invalid_field(model):
+    """Tests whether specifying a field that does not exist raises a
+    descriptive error."""
+
+    with pytest.raises(SuspiciousOperation):
+        model.objects.upsert(
+            conflict_target=["name"],
+            fields=dict(name="joe"),
+            returning=["beer"],
+        )
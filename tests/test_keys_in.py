@@ -0,0 +1,95 @@
+import pytest
+
+from django.core.exceptions import SuspiciousOperation
+from django.db import connection, models
+
+from psqlextra.expressions import KeysIn
+
+from .fake_model import get_fake_model
+
+
+@pytest.fixture
+def tenant_model():
+    return get_fake_model({"name": models.CharField(max_length=255)})
+
+
+@pytest.fixture
+def model(tenant_model):
+    return get_fake_model(
+        {
+            "tenant": models.ForeignKey(tenant_model, on_delete=models.CASCADE),
+            "external_id": models.CharField(max_length=255),
+        }
+    )
+
+
+@pytest.fixture
+def objs(model, tenant_model):
+    tenant_a = tenant_model.objects.create(name="a")
+    tenant_b = tenant_model.objects.create(name="b")
+
+    return [
+        model.objects.create(tenant=tenant, external_id=external_id)
+        for tenant in (tenant_a, tenant_b)
+        for external_id in ("1", "2")
+    ]
+
+
+def test_get_by_keys(model, objs):
+    """Tests whether rows are found by composite keys using a single array
+    per field."""
+
+    executed_sql = []
+
+    def _capture(execute, sql, params, many, context):
+        executed_sql.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(_capture):
+        found_objs = list(
+            model.objects.get_by_keys(
+                [(objs[0].tenant_id, "1"), (objs[3].tenant, "2"), (0, "1")],
+                fields=["tenant", "external_id"],
+            ).order_by("id")
+        )
+
+    assert found_objs == [objs[0], objs[3]]
+    assert "unnest" in executed_sql[0]
+    assert " OR " not in executed_sql[0]
+
+
+def test_get_by_keys_single_field(model, objs):
+    """Tests whether keys can be plain values when there is only a single
+    field."""
+
+    found_objs = model.objects.get_by_keys(
+        [objs[1].id, objs[2].id], fields=["id"]
+    )
+
+    assert set(found_objs) == {objs[1], objs[2]}
+
+
+def test_get_by_keys_empty(model, objs):
+    """Tests whether nothing is found without keys."""
+
+    assert not model.objects.get_by_keys([], fields=["id"]).exists()
+
+
+def test_delete_by_keys(model, objs):
+    """Tests whether rows are deleted by composite keys."""
+
+    deleted, _ = model.objects.delete_by_keys(
+        [(objs[0].tenant_id, "1"), (objs[2].tenant_id, "1")],
+        fields=["tenant_id", "external_id"],
+    )
+
+    assert deleted == 2
+    assert set(model.objects.all()) == {objs[1], objs[3]}
+
+
+def test_keys_in_invalid_key():
+    """Tests whether keys that do not have a value for every field are
+    refused."""
+
+    with pytest.raises(SuspiciousOperation):
+        KeysIn(["tenant", "external_id"], [(1,)])
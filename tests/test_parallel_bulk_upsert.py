@@ -0,0 +1,99 @@
+import pytest
+
+from django.core.exceptions import SuspiciousOperation
+from django.db import models
+from django.db.utils import DataError
+
+from psqlextra.types import DedupePolicy
+
+from .fake_model import get_fake_model
+
+# workers use their own connections that cannot see
+# anything done in the transaction of the test
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def model():
+    return get_fake_model(
+        {
+            "name": models.CharField(max_length=10, unique=True, null=True),
+            "count": models.IntegerField(),
+        }
+    )
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_parallel_bulk_upsert(model, workers):
+    """Tests whether all rows are upserted when sharded over multiple
+    workers."""
+
+    model.objects.create(name="0", count=-1)
+
+    affected_rows = model.objects.parallel_bulk_upsert(
+        conflict_target=["name"],
+        rows=(dict(name=str(index), count=index) for index in range(100)),
+        workers=workers,
+        batch_size=7,
+    )
+
+    assert affected_rows == 100
+    assert model.objects.count() == 100
+    assert all(obj.count == int(obj.name) for obj in model.objects.all())
+
+
+def test_parallel_bulk_upsert_same_key_same_worker(model):
+    """Tests whether rows with the same key are upserted in order because
+    they always end up at the same worker."""
+
+    model.objects.parallel_bulk_upsert(
+        conflict_target=["name"],
+        rows=[dict(name=str(index % 10), count=index) for index in range(100)],
+        workers=4,
+        batch_size=1,
+    )
+
+    assert dict(model.objects.values_list("name", "count")) == {
+        str(index): 90 + index for index in range(10)
+    }
+
+
+def test_parallel_bulk_upsert_null_keys(model):
+    """Tests whether rows with NULL in the conflict target are spread over
+    the workers and all inserted."""
+
+    model.objects.parallel_bulk_upsert(
+        conflict_target=["name"],
+        rows=[dict(name=None, count=index) for index in range(10)],
+        workers=3,
+        batch_size=2,
+        dedupe=DedupePolicy.KEEP_LAST,
+    )
+
+    assert model.objects.count() == 10
+
+
+def test_parallel_bulk_upsert_error(model):
+    """Tests whether an error in one of the workers is raised."""
+
+    with pytest.raises(DataError):
+        model.objects.parallel_bulk_upsert(
+            conflict_target=["name"],
+            rows=[
+                dict(name="way too long for this", count=1),
+                *[dict(name=str(index), count=index) for index in range(50)],
+            ],
+            workers=2,
+            batch_size=1,
+        )
+
+
+@pytest.mark.parametrize("kwargs", [dict(workers=0), dict(batch_size=0)])
+def test_parallel_bulk_upsert_invalid(model, kwargs):
+    """Tests whether nonsensical amounts of workers or batch sizes are
+    rejected."""
+
+    with pytest.raises(SuspiciousOperation):
+        model.objects.parallel_bulk_upsert(
+            conflict_target=["name"], rows=[dict(name="a", count=1)], **kwargs
+        )
@@ -0,0 +1,108 @@
+import pytest
+
+from django.core.exceptions import SuspiciousOperation
+from django.db import IntegrityError, models, transaction
+
+from psqlextra.pipeline import PostgresPipeline
+from psqlextra.types import ConflictAction
+
+from .fake_model import get_fake_model
+
+
+@pytest.fixture
+def model():
+    return get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "count": models.IntegerField(default=0),
+        }
+    )
+
+
+@pytest.fixture
+def other_model():
+    return get_fake_model(
+        {
+            "slug": models.CharField(max_length=255, unique=True),
+            "title": models.CharField(max_length=255, null=True),
+        }
+    )
+
+
+def test_pipeline(model, other_model):
+    """Tests whether upserts into different models can be sent in a single
+    pipeline and each return their own result."""
+
+    obj = model.objects.create(name="joe", count=1)
+
+    with PostgresPipeline() as pipeline:
+        first = pipeline.upsert(model, ["name"], dict(name="joe", count=2))
+        second = pipeline.upsert_and_get(
+            other_model, ["slug"], dict(slug="a", title="b")
+        )
+        third = pipeline.insert_and_get(model, ["name"], dict(name="joe"))
+        fourth = pipeline.upsert(
+            model,
+            ["name"],
+            dict(name="jane", count=3),
+            returning=["name", "count"],
+            return_outcome=True,
+        )
+
+    assert first.value == obj.pk
+    assert isinstance(second.value, other_model)
+    assert second.value.title == "b"
+    assert third.value is None
+    assert fourth.value.rows == [dict(name="jane", count=3)]
+    assert fourth.value.inserted == 1
+
+    assert model.objects.get(name="joe").count == 2
+
+
+def test_pipeline_not_executed(model):
+    """Tests whether results cannot be used before the pipeline was
+    executed."""
+
+    pipeline = PostgresPipeline()
+    result = pipeline.upsert(model, ["name"], dict(name="joe"))
+
+    with pytest.raises(SuspiciousOperation):
+        result.value
+
+    assert pipeline.execute() == [result.value]
+    assert pipeline.execute() == []
+
+
+def test_pipeline_error(model, other_model):
+    """Tests whether errors are raised and the pipeline can be undone with
+    a transaction."""
+
+    with pytest.raises(IntegrityError):
+        with transaction.atomic():
+            with PostgresPipeline() as pipeline:
+                pipeline.upsert(other_model, ["slug"], dict(slug="a"))
+                pipeline.insert_and_get(
+                    model,
+                    ["name"],
+                    dict(name=None),
+                    conflict_action=ConflictAction.UPDATE,
+                )
+
+    assert not other_model.objects.exists()
+
+
+def test_upsert_many(model):
+    """Tests whether many rows can be upserted with their own conflict
+    target."""
+
+    model.objects.create(name="joe", count=1)
+
+    results = model.objects.upsert_many(
+        [
+            (["name"], dict(name="joe", count=2)),
+            (["id"], dict(id=100, name="jane", count=3)),
+        ],
+        returning=["name", "count"],
+    )
+
+    assert results == [dict(name="joe", count=2), dict(name="jane", count=3)]
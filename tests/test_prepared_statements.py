@@ -0,0 +1,145 @@
+import pytest
+
+from django.db import connection, models
+from django.test.utils import CaptureQueriesContext
+
+from psqlextra.prepared_statements import (
+    PreparedStatementCache,
+    get_prepared_statement_cache,
+)
+from psqlextra.types import InsertEngine
+
+from .fake_model import get_fake_model
+
+
+@pytest.fixture(autouse=True)
+def deallocate_prepared_statements():
+    cache = get_prepared_statement_cache(connection)
+
+    with connection.cursor() as cursor:
+        cache.deallocate_all(cursor)
+
+    yield
+
+    with connection.cursor() as cursor:
+        cache.deallocate_all(cursor)
+
+
+def _get_prepared_statement_count() -> int:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM pg_prepared_statements")
+        return cursor.fetchone()[0]
+
+
+def test_upsert_prepare():
+    """Tests whether upserting with `prepare=True` prepares the statement
+    once and then re-uses it."""
+
+    model = get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "count": models.IntegerField(),
+        }
+    )
+
+    with CaptureQueriesContext(connection) as ctx:
+        pks = [
+            model.objects.upsert(
+                conflict_target=["name"],
+                fields=dict(name="joe", count=index),
+                prepare=True,
+            )
+            for index in range(3)
+        ]
+
+    assert len(set(pks)) == 1
+    assert model.objects.get().count == 2
+
+    sqls = [query["sql"] for query in ctx]
+    assert len([sql for sql in sqls if sql.startswith("PREPARE")]) == 1
+    assert len([sql for sql in sqls if sql.startswith("EXECUTE")]) == 3
+
+    info = get_prepared_statement_cache(connection).info()
+    assert info.hits == 2
+    assert info.misses == 1
+
+
+def test_upsert_and_get_prepare():
+    """Tests whether a prepared upsert can return the entire row."""
+
+    model = get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "label": models.CharField(max_length=255, null=True),
+        }
+    )
+
+    obj = model.objects.upsert_and_get(
+        conflict_target=["name"],
+        fields=dict(name="100%", label="a"),
+        prepare=True,
+    )
+
+    assert obj.name == "100%"
+    assert obj.label == "a"
+
+
+@pytest.mark.parametrize("engine", [InsertEngine.VALUES, InsertEngine.UNNEST])
+def test_bulk_upsert_prepare(engine):
+    """Tests whether bulk upserts can be executed as prepared statements."""
+
+    model = get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "count": models.IntegerField(),
+        }
+    )
+
+    for count in range(2):
+        rows = model.objects.bulk_upsert(
+            conflict_target=["name"],
+            rows=[
+                dict(name="joe", count=count),
+                dict(name="jane", count=count),
+            ],
+            engine=engine,
+            prepare=True,
+        )
+
+    assert [row["name"] for row in rows] == ["joe", "jane"]
+    assert set(model.objects.values_list("count", flat=True)) == {1}
+    assert _get_prepared_statement_count() == 1
+
+
+def test_prepared_statement_cache_evicts():
+    """Tests whether the least recently used statement is de-allocated when
+    the maximum amount of prepared statements is reached."""
+
+    cache = PreparedStatementCache(maxsize=2)
+
+    with connection.cursor() as cursor:
+        for value in range(3):
+            cache.execute(cursor, f"SELECT {value} + %s", [1])
+            assert cursor.fetchone()[0] == value + 1
+
+    assert cache.info().currsize == 2
+    assert _get_prepared_statement_count() == 2
+
+
+def test_prepared_statement_cache_new_connection():
+    """Tests whether statements are prepared again when the underlying
+    connection was replaced."""
+
+    cache = PreparedStatementCache(maxsize=10)
+
+    with connection.cursor() as cursor:
+        cache.execute(cursor, "SELECT %s::integer", [1])
+
+        # pretend the statement was prepared on another connection
+        cache._raw_connection = object()
+
+        cache.execute(cursor, "SELECT %s::integer", [2])
+        assert cursor.fetchone()[0] == 2
+
+    assert cache.info().misses == 1
+    assert _get_prepared_statement_count() == 2
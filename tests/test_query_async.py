@@ -0,0 +1,411 @@
+import asyncio
+
+from functools import partial
+
+import pytest
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, models
+from django.db.models import UniqueConstraint
+
+import psqlextra.async_connection as async_connection_module
+
+from psqlextra.async_connection import is_psycopg3
+from psqlextra.backend.schema import PostgresSchemaEditor
+from psqlextra.fields import HStoreField
+from psqlextra.query import ConflictAction
+from psqlextra.statement_cache import partition_router_cache
+from psqlextra.types import InsertEngine, PostgresPartitioningMethod
+
+from .fake_model import define_fake_partitioned_model, get_fake_model
+
+psycopg_pool = pytest.importorskip("psycopg_pool")
+
+pytestmark = [
+    pytest.mark.skipif(not is_psycopg3, reason="requires psycopg 3"),
+    # the async API uses its own connection that cannot see
+    # anything done in the transaction of the test
+    pytest.mark.django_db(transaction=True),
+]
+
+
+def _run(coroutine, **pool_kwargs):
+    """Runs the specified coroutine with a pool configured for the async
+    API."""
+
+    async def _run_with_pool():
+        pool = psycopg_pool.AsyncConnectionPool(
+            conninfo="",
+            kwargs=async_connection_module.get_async_connection_params(
+                "default"
+            ),
+            configure=partial(
+                async_connection_module.configure_async_connection,
+                using="default",
+            ),
+            open=False,
+            **pool_kwargs,
+        )
+
+        await pool.open()
+        async_connection_module.set_async_pool(pool, using="default")
+
+        try:
+            return await coroutine
+        finally:
+            async_connection_module.set_async_pool(None, using="default")
+            await pool.close()
+
+    return asyncio.run(_run_with_pool())
+
+
+@pytest.fixture
+def model():
+    return get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "count": models.IntegerField(default=0),
+            "title": HStoreField(null=True),
+        }
+    )
+
+
+def test_aupsert(model):
+    """Tests whether :see:aupsert inserts and then updates a row."""
+
+    async def _upsert():
+        first_pk = await model.objects.aupsert(
+            conflict_target=["name"], fields=dict(name="joe", count=1)
+        )
+        second_pk = await model.objects.aupsert(
+            conflict_target=["name"],
+            fields=dict(name="joe", count=2, title={"en": "beer"}),
+        )
+
+        return first_pk, second_pk
+
+    first_pk, second_pk = _run(_upsert())
+
+    assert first_pk == second_pk
+
+    obj = model.objects.get()
+    assert obj.pk == first_pk
+    assert obj.count == 2
+    assert obj.title == {"en": "beer"}
+
+
+def test_aupsert_and_get(model):
+    """Tests whether :see:aupsert_and_get returns the entire row as a model
+    instance."""
+
+    obj = _run(
+        model.objects.aupsert_and_get(
+            conflict_target=["name"],
+            fields=dict(name="joe", title={"en": "beer"}),
+            prepare=True,
+        )
+    )
+
+    assert isinstance(obj, model)
+    assert obj.pk == model.objects.get().pk
+    assert obj.name == "joe"
+    assert obj.count == 0
+    assert obj.title == {"en": "beer"}
+
+
+def test_ainsert_on_conflict_nothing(model):
+    """Tests whether :see:ainsert returns nothing when the row already
+    exists."""
+
+    model.objects.create(name="joe")
+
+    pk = _run(
+        model.objects.on_conflict(["name"], ConflictAction.NOTHING).ainsert(
+            name="joe"
+        )
+    )
+
+    assert pk is None
+
+
+@pytest.mark.parametrize("engine", list(InsertEngine))
+def test_abulk_upsert(model, engine):
+    """Tests whether :see:abulk_upsert upserts all rows with every
+    engine."""
+
+    model.objects.create(name="joe", count=1)
+
+    rows = _run(
+        model.objects.abulk_upsert(
+            conflict_target=["name"],
+            rows=[dict(name="joe", count=2), dict(name="jane", count=3)],
+            engine=engine,
+        )
+    )
+
+    assert [row["name"] for row in rows] == ["joe", "jane"]
+    assert dict(model.objects.values_list("name", "count")) == {
+        "joe": 2,
+        "jane": 3,
+    }
+
+
+def test_abulk_upsert_yield_chunks(model):
+    """Tests whether chunks are upserted as the async generator advances."""
+
+    async def _upsert():
+        chunks = await model.objects.abulk_upsert(
+            conflict_target=["name"],
+            rows=[dict(name=str(index)) for index in range(5)],
+            batch_size=2,
+            yield_chunks=True,
+            returning=None,
+        )
+
+        return [chunk async for chunk in chunks]
+
+    assert _run(_upsert()) == [2, 2, 1]
+    assert model.objects.count() == 5
+
+
+def test_abulk_upsert_concurrently(model):
+    """Tests whether many upserts can run concurrently in a single event
+    loop."""
+
+    async def _upsert():
+        return await asyncio.gather(
+            *[
+                model.objects.abulk_upsert(
+                    conflict_target=["name"],
+                    rows=[dict(name=f"{index}-a"), dict(name=f"{index}-b")],
+                    return_model=True,
+                )
+                for index in range(10)
+            ]
+        )
+
+    results = _run(_upsert())
+
+    assert [len(objs) for objs in results] == [2] * 10
+    assert model.objects.count() == 20
+
+
+def test_abulk_upsert_return_outcome(model):
+    """Tests whether :see:abulk_upsert tells how many rows were inserted and
+    updated."""
+
+    model.objects.create(name="joe", count=1)
+
+    result = _run(
+        model.objects.abulk_upsert(
+            conflict_target=["name"],
+            rows=[dict(name="joe", count=2), dict(name="jane", count=3)],
+            returning=None,
+            return_outcome=True,
+        )
+    )
+
+    assert (result.inserted, result.updated, result.skipped) == (1, 1, 0)
+
+
+def test_aupsert_fields_named_like_options():
+    """Tests whether fields that are named like options of :see:aupsert are
+    inserted instead of being mistaken for those options."""
+
+    model = get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "prepare": models.BooleanField(default=False),
+            "returning": models.CharField(max_length=255, null=True),
+        }
+    )
+
+    pk = _run(
+        model.objects.aupsert(
+            conflict_target=["name"],
+            fields=dict(name="joe", prepare=True, returning="a"),
+        )
+    )
+
+    obj = model.objects.get(pk=pk)
+    assert obj.prepare is True
+    assert obj.returning == "a"
+
+
+def test_abulk_upsert_route_to_partitions():
+    """Tests whether rows are routed to partitions without touching the
+    synchronous connection."""
+
+    model = define_fake_partitioned_model(
+        {"name": models.TextField(), "category": models.TextField()},
+        {"method": PostgresPartitioningMethod.LIST, "key": ["category"]},
+        {
+            "constraints": [
+                UniqueConstraint(
+                    fields=["name", "category"], name="async_routing_name"
+                )
+            ]
+        },
+    )
+
+    schema_editor = PostgresSchemaEditor(connection)
+    schema_editor.create_partitioned_model(model)
+    schema_editor.add_list_partition(model, "a", ["a"])
+    schema_editor.add_default_partition(model, "default")
+
+    partition_router_cache.invalidate(model)
+
+    affected_rows = _run(
+        model.objects.abulk_upsert(
+            conflict_target=["name", "category"],
+            rows=[
+                dict(name="joe", category="a"),
+                dict(name="joe", category="b"),
+            ],
+            returning=None,
+            route_to_partitions=True,
+        )
+    )
+
+    assert affected_rows == 2
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT COUNT(*) FROM ONLY %s"
+            % connection.ops.quote_name(f"{model._meta.db_table}_a")
+        )
+        assert cursor.fetchone()[0] == 1
+
+
+def test_async_connection_hstore_type_cached(model, monkeypatch):
+    """Tests whether the hstore type is only looked up once per database
+    instead of for every new connection."""
+
+    monkeypatch.setattr(async_connection_module, "_hstore_type_infos", {})
+
+    fetch = async_connection_module.TypeInfo.fetch
+    fetched_types = []
+
+    async def _fetch(aconnection, name):
+        fetched_types.append(name)
+        return await fetch(aconnection, name)
+
+    monkeypatch.setattr(async_connection_module.TypeInfo, "fetch", _fetch)
+
+    # every pool opens its own, new connection
+    for count in range(2):
+        _run(
+            model.objects.aupsert(
+                conflict_target=["name"],
+                fields=dict(name="joe", count=count, title={"en": "a"}),
+            ),
+            min_size=1,
+        )
+
+    assert fetched_types == ["hstore"]
+    assert model.objects.get().title == {"en": "a"}
+
+
+def test_aupsert_prepare(model):
+    """Tests whether `prepare=True` really prepares the statement on the
+    async connection."""
+
+    async def _upsert():
+        for count in range(2):
+            await model.objects.aupsert(
+                conflict_target=["name"],
+                fields=dict(name="joe", count=count),
+                prepare=True,
+            )
+
+        async with async_connection_module.async_connection(
+            "default"
+        ) as aconnection:
+            acursor = await aconnection.execute(
+                "SELECT statement FROM pg_prepared_statements"
+            )
+            return [row[0] for row in await acursor.fetchall()]
+
+    statements = _run(_upsert(), min_size=1, max_size=1)
+
+    assert len(statements) == 1
+    assert "ON CONFLICT" in statements[0]
+    assert model.objects.get().count == 1
+
+
+def test_ainsert_without_conflict_handling(model):
+    """Tests whether inserts without conflict handling run over the async
+    connection as well."""
+
+    async def _insert():
+        pk = await model.objects.ainsert(name="joe")
+        obj = await model.objects.ainsert_and_get(name="jane")
+        objs = await model.objects.abulk_insert(
+            [dict(name="a"), dict(name="b", count=2)]
+        )
+
+        return pk, obj, objs
+
+    pk, obj, objs = _run(_insert())
+
+    assert model.objects.get(pk=pk).name == "joe"
+    assert obj.name == "jane"
+    assert [(obj.name, obj.count) for obj in objs] == [("a", 0), ("b", 2)]
+    assert model.objects.count() == 4
+
+
+def test_async_connection_requires_pool(model):
+    """Tests whether using the async API without a pool is refused instead
+    of opening a new connection for every call."""
+
+    with pytest.raises(ImproperlyConfigured):
+        asyncio.run(
+            model.objects.aupsert(
+                conflict_target=["name"], fields=dict(name="joe")
+            )
+        )
+
+
+def test_abulk_upsert_related_lookups():
+    """Tests whether lookups of related rows are resolved over the async
+    connection, rather than with a blocking query."""
+
+    customer_model = get_fake_model(
+        {"external_id": models.CharField(max_length=255, unique=True)}
+    )
+    order_model = get_fake_model(
+        {
+            "number": models.CharField(max_length=255, unique=True),
+            "customer": models.ForeignKey(
+                customer_model, null=True, on_delete=models.CASCADE
+            ),
+        }
+    )
+
+    customer = customer_model.objects.create(external_id="a")
+
+    async def _upsert():
+        await order_model.objects.aupsert(
+            conflict_target=["number"],
+            fields=dict(number="1", customer=dict(external_id="a")),
+        )
+        await order_model.objects.abulk_upsert(
+            conflict_target=["number"],
+            rows=[dict(number="2", customer=dict(external_id="a"))],
+            max_params=100,
+        )
+
+    _run(_upsert())
+
+    assert dict(order_model.objects.values_list("number", "customer_id")) == {
+        "1": customer.id,
+        "2": customer.id,
+    }
+
+    with pytest.raises(customer_model.DoesNotExist):
+        _run(
+            order_model.objects.aupsert(
+                conflict_target=["number"],
+                fields=dict(number="3", customer=dict(external_id="nope")),
+            )
+        )
@@ -0,0 +1,299 @@
+import gc
+import weakref
+
+from unittest import mock
+
+import pytest
+
+from django.apps import apps
+from django.db import connection, models
+from django.db.models import F, Q, Value
+from django.test.utils import CaptureQueriesContext
+
+from psqlextra import conflict_keys
+from psqlextra.conflict_keys import get_conflict_target_fields
+from psqlextra.fields import HStoreField
+from psqlextra.statement_cache import (
+    LRUCache,
+    ModelCache,
+    conflict_target_clause_cache,
+    make_cache_key,
+    on_conflict_clause_cache,
+    upsert_fields_cache,
+)
+
+from .fake_model import define_fake_model, get_fake_model, undefine_fake_model
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    on_conflict_clause_cache.clear()
+    upsert_fields_cache.clear()
+    conflict_target_clause_cache.clear()
+
+    yield
+
+    on_conflict_clause_cache.clear()
+    upsert_fields_cache.clear()
+    conflict_target_clause_cache.clear()
+
+
+def test_lru_cache_evicts_least_recently_used():
+    """Tests whether the least recently used entry is evicted once the cache
+    is full."""
+
+    cache = LRUCache(maxsize=2)
+
+    cache.get_or_set("a", lambda: 1)
+    cache.get_or_set("b", lambda: 2)
+    cache.get_or_set("a", lambda: 3)
+    cache.get_or_set("c", lambda: 4)
+
+    assert cache.get_or_set("a", lambda: 5) == 1
+    assert cache.get_or_set("b", lambda: 6) == 6
+
+    info = cache.info()
+    assert info.hits == 2
+    assert info.misses == 4
+    assert info.currsize == 2
+
+
+def test_lru_cache_bypass():
+    """Tests whether nothing is cached without a key or when the maximum
+    size is zero."""
+
+    cache = LRUCache(maxsize=0)
+    assert cache.get_or_set("a", lambda: 1) == 1
+    assert cache.get_or_set("a", lambda: 2) == 2
+
+    cache = LRUCache(maxsize=10)
+    assert cache.get_or_set(None, lambda: 1) == 1
+    assert cache.get_or_set(None, lambda: 2) == 2
+
+    assert cache.info().currsize == 0
+
+
+def test_make_cache_key():
+    """Tests whether values that compare equal but have a different type get
+    a different key and whether unhashable values result in no key."""
+
+    assert make_cache_key({"a": [1, 2]}) == make_cache_key({"a": [1, 2]})
+    assert make_cache_key({"a": 1}) != make_cache_key({"a": True})
+    assert (
+        make_cache_key(
+            object.__new__(type("Unhashable", (), {"__hash__": None}))
+        )
+        is None
+    )
+
+
+def test_make_cache_key_nested_types():
+    """Tests whether values that compare equal but have a different type get
+    a different key when they are nested in expressions."""
+
+    assert make_cache_key(F("a") + Value(1)) == make_cache_key(
+        F("a") + Value(1)
+    )
+    assert make_cache_key(F("a") + Value(1)) != make_cache_key(
+        F("a") + Value(True)
+    )
+    assert make_cache_key(Q(a=Value(1))) != make_cache_key(Q(a=Value(True)))
+
+
+def test_make_cache_key_does_not_keep_models_alive():
+    """Tests whether cache keys refer to models by their label rather than
+    keeping the model classes alive."""
+
+    model = define_fake_model({"name": models.TextField()})
+    model_ref = weakref.ref(model)
+
+    key = make_cache_key(model, ["name"])
+    assert key == make_cache_key(model, ["name"])
+
+    undefine_fake_model(model)
+    apps.clear_cache()
+    del model
+    gc.collect()
+
+    assert model_ref() is None
+
+
+def test_upsert_statement_cache_hits():
+    """Tests whether upserting rows of the same shape re-uses the previously
+    built statement."""
+
+    model = get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "count": models.IntegerField(),
+        }
+    )
+
+    for index in range(3):
+        model.objects.upsert(
+            conflict_target=["name"], fields=dict(name="joe", count=index)
+        )
+
+    assert on_conflict_clause_cache.info().misses == 1
+    assert on_conflict_clause_cache.info().hits == 2
+    assert upsert_fields_cache.info().misses == 1
+    assert upsert_fields_cache.info().hits == 2
+
+    assert model.objects.get().count == 2
+
+
+def test_upsert_statement_cache_shapes():
+    """Tests whether upserts of a different shape do not re-use each other's
+    statements."""
+
+    model = get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "count": models.IntegerField(default=0),
+            "active": models.BooleanField(default=False),
+        }
+    )
+
+    model.objects.upsert(
+        conflict_target=["name"], fields=dict(name="joe", count=1)
+    )
+    model.objects.upsert(conflict_target=["name"], fields=dict(name="joe"))
+    model.objects.upsert(
+        conflict_target=["name"],
+        fields=dict(name="joe"),
+        update_values=dict(count=F("count") + 1),
+    )
+    model.objects.upsert(
+        conflict_target=["name"],
+        fields=dict(name="joe"),
+        update_values=dict(count=F("count") + 1),
+        update_condition=Q(count__gt=1),
+    )
+    model.objects.upsert(
+        conflict_target=["name"],
+        fields=dict(name="joe"),
+        update_values=dict(active=True),
+    )
+    model.objects.upsert(
+        conflict_target=["name"],
+        fields=dict(name="joe"),
+        update_values=dict(count=1),
+    )
+
+    assert on_conflict_clause_cache.info().hits == 0
+
+    obj = model.objects.get()
+    assert obj.count == 1
+    assert obj.active
+
+
+def test_upsert_statement_cache_hstore_conflict_target():
+    """Tests whether statements with hstore keys in the conflict target are
+    re-used."""
+
+    model = get_fake_model(
+        {
+            "title": HStoreField(uniqueness=["key1"]),
+            "cookies": models.TextField(null=True),
+        }
+    )
+
+    with CaptureQueriesContext(connection) as ctx:
+        for cookies in ["a", "b"]:
+            model.objects.upsert(
+                conflict_target=[("title", "key1")],
+                fields=dict(title={"key1": "beer"}, cookies=cookies),
+            )
+
+    assert len(ctx) == 2
+    assert on_conflict_clause_cache.info().hits == 1
+    assert model.objects.get().cookies == "b"
+
+
+def test_upsert_statement_cache_dict_update_values():
+    """Tests whether update values that are dictionaries are taken into
+    account when re-using statements."""
+
+    model = get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "title": HStoreField(null=True),
+        }
+    )
+
+    for title in [{"en": "a"}, {"en": "b"}]:
+        model.objects.upsert(
+            conflict_target=["name"],
+            fields=dict(name="joe"),
+            update_values=dict(title=title),
+        )
+
+    assert model.objects.get().title == {"en": "b"}
+
+
+def test_model_cache_drops_replaced_models():
+    """Tests whether entries go away together with the model class they
+    belong to."""
+
+    cache = ModelCache()
+
+    model = type("Model", (), {})
+    assert cache.get_or_set(model, "a", lambda: 1) == 1
+    assert cache.get_or_set(model, "a", lambda: 2) == 1
+    assert cache.get_or_set(type("Model", (), {}), "a", lambda: 3) == 3
+
+    cache.invalidate(model)
+    assert cache.get_or_set(model, "a", lambda: 4) == 4
+
+    del model
+    gc.collect()
+    assert len(cache._entries) == 0
+
+
+def test_upsert_index_conflict_target_no_schema_editor():
+    """Tests whether conflict targets that match an index are resolved once
+    per model."""
+
+    index = models.Index(fields=["name"], name="upsert_name_idx")
+    model = get_fake_model(
+        {"name": models.CharField(max_length=255)},
+        meta_options={"indexes": [index]},
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE UNIQUE INDEX "unique_upsert_name" ON %s ("name")'
+            % connection.ops.quote_name(model._meta.db_table)
+        )
+
+    with mock.patch.object(
+        connection, "schema_editor", wraps=connection.schema_editor
+    ) as schema_editor:
+        for _ in range(3):
+            # force the statement to be built again
+            on_conflict_clause_cache.clear()
+
+            model.objects.upsert(
+                conflict_target=["name"], fields=dict(name="joe")
+            )
+
+    assert schema_editor.call_count == 1
+    assert model.objects.count() == 1
+
+
+def test_get_conflict_target_fields_cached():
+    """Tests whether conflict targets are resolved into fields once per
+    model."""
+
+    model = get_fake_model({"title": HStoreField(null=True)})
+
+    with mock.patch.object(
+        conflict_keys,
+        "_get_model_field",
+        wraps=conflict_keys._get_model_field,
+    ) as get_model_field:
+        for _ in range(3):
+            fields = get_conflict_target_fields(model, [("title", "en")])
+
+    assert get_model_field.call_count == 1
+    assert fields == [(model._meta.get_field("title"), "en")]
@@ -505,3 +505,36 @@ def test_upsert_extra_columns_in_schema():
     )
 
     assert obj.name == "joe"
+
+
+def test_upsert_fields_named_like_options():
+    """Tests whether fields that are named like options of :see:upsert are
+    inserted instead of being mistaken for those options."""
+
+    model = get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "prepare": models.BooleanField(default=False),
+            "returning": models.CharField(max_length=255, null=True),
+            "using": models.CharField(max_length=255, null=True),
+        }
+    )
+
+    pk = model.objects.upsert(
+        conflict_target=["name"],
+        fields=dict(name="joe", prepare=True, returning="a", using="b"),
+    )
+
+    obj = model.objects.get(pk=pk)
+    assert obj.prepare is True
+    assert obj.returning == "a"
+    assert obj.using == "b"
+
+    obj = model.objects.upsert_and_get(
+        conflict_target=["name"],
+        fields=dict(name="joe", prepare=False, returning="c", using="d"),
+    )
+
+    assert obj.prepare is False
+    assert obj.returning == "c"
+    assert obj.using == "d"
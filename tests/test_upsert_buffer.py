@@ -0,0 +1,151 @@
+import time
+
+import pytest
+
+from django.db import connection, models, transaction
+
+from psqlextra.buffer import UpsertBuffer
+
+from .fake_model import get_fake_model
+
+
+@pytest.fixture
+def model():
+    return get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "count": models.IntegerField(default=0),
+            "title": models.CharField(max_length=255, null=True),
+        }
+    )
+
+
+def _get_rows(model):
+    return {
+        name: (count, title)
+        for name, count, title in model.objects.values_list(
+            "name", "count", "title"
+        )
+    }
+
+
+def test_upsert_buffer_coalesces(model):
+    """Tests whether repeated writes to the same row are coalesced into a
+    single row when flushing."""
+
+    executed_sql = []
+
+    def _capture(execute, sql, params, many, context):
+        executed_sql.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(_capture):
+        with UpsertBuffer(model, ["name"]) as buffer:
+            for index in range(100):
+                buffer.add(dict(name=str(index % 3), count=index))
+
+            assert len(buffer) == 3
+            assert buffer.coalesced == 97
+            assert not executed_sql
+
+    assert len(executed_sql) == 1
+    assert _get_rows(model) == {
+        "0": (99, None),
+        "1": (97, None),
+        "2": (98, None),
+    }
+
+
+def test_upsert_buffer_merge_func(model):
+    """Tests whether buffered rows can be merged with a custom function."""
+
+    def _merge(existing_row, row):
+        return {**row, "count": existing_row["count"] + row["count"]}
+
+    with UpsertBuffer(model, ["name"], merge=_merge) as buffer:
+        buffer.extend([dict(name="joe", count=1), dict(name="joe", count=2)])
+
+    assert _get_rows(model) == {"joe": (3, None)}
+
+
+def test_upsert_buffer_max_rows(model):
+    """Tests whether the buffer is flushed once it is full."""
+
+    buffer = UpsertBuffer(model, ["name"], max_rows=2)
+
+    buffer.add(dict(name="a"))
+    buffer.add(dict(name="a"))
+    assert not model.objects.exists()
+
+    buffer.add(dict(name="b"))
+    assert model.objects.count() == 2
+    assert len(buffer) == 0
+
+
+def test_upsert_buffer_max_age(model):
+    """Tests whether the buffer is flushed once the oldest row is too
+    old."""
+
+    buffer = UpsertBuffer(model, ["name"], max_age=0.05)
+
+    buffer.add(dict(name="a"))
+    assert buffer.flush_if_due() == 0
+
+    time.sleep(0.1)
+
+    assert buffer.flush_if_due() == 1
+    assert model.objects.count() == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_upsert_buffer_flush_interval(model):
+    """Tests whether the buffer is flushed from the background once the
+    oldest row is too old."""
+
+    buffer = UpsertBuffer(model, ["name"], max_age=0.05, flush_interval=0.01)
+
+    try:
+        buffer.add(dict(name="a"))
+
+        for _ in range(100):
+            if model.objects.exists():
+                break
+
+            time.sleep(0.01)
+
+        assert model.objects.count() == 1
+    finally:
+        buffer.close()
+
+
+def test_upsert_buffer_error(model):
+    """Tests whether rows are discarded when the block exits because of an
+    error."""
+
+    with pytest.raises(ValueError):
+        with transaction.atomic():
+            with UpsertBuffer(model, ["name"]) as buffer:
+                buffer.add(dict(name="a"))
+                raise ValueError()
+
+    assert len(buffer) == 0
+    assert not model.objects.exists()
+
+
+def test_upsert_buffer_mixed_fields(model):
+    """Tests whether buffered rows that specify different fields are
+    upserted instead of making every flush fail."""
+
+    with UpsertBuffer(model, ["name"]) as buffer:
+        buffer.add(dict(name="a", count=1))
+        buffer.add(dict(name="b", title="b"))
+        buffer.add(dict(name="c", count=3))
+
+        assert buffer.flush() == 3
+        assert len(buffer) == 0
+
+    assert _get_rows(model) == {
+        "a": (1, None),
+        "b": (0, "b"),
+        "c": (3, None),
+    }
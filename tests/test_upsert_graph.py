@@ -0,0 +1,135 @@
+import pytest
+
+from django.core.exceptions import SuspiciousOperation
+from django.db import connection, models
+
+from psqlextra.upsert_graph import UpsertGraph
+
+from .fake_model import get_fake_model
+
+
+@pytest.fixture
+def author_model():
+    return get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "country": models.CharField(max_length=255, null=True),
+        }
+    )
+
+
+@pytest.fixture
+def book_model(author_model):
+    return get_fake_model(
+        {
+            "author": models.ForeignKey(author_model, on_delete=models.CASCADE),
+            "title": models.CharField(max_length=255),
+            "pages": models.IntegerField(default=0),
+        },
+        meta_options={"unique_together": ("author", "title")},
+    )
+
+
+@pytest.fixture
+def chapter_model(book_model):
+    return get_fake_model(
+        {
+            "book": models.ForeignKey(book_model, on_delete=models.CASCADE),
+            "number": models.IntegerField(),
+        },
+        meta_options={"unique_together": ("book", "number")},
+    )
+
+
+def test_upsert_graph(author_model, book_model, chapter_model):
+    """Tests whether rows of multiple models that refer to each other are
+    upserted in a single statement."""
+
+    existing_author = author_model.objects.create(name="joe", country="nl")
+    existing_book = book_model.objects.create(
+        author=existing_author, title="a", pages=1
+    )
+
+    executed_sql = []
+
+    def _capture(execute, sql, params, many, context):
+        executed_sql.append(sql)
+        return execute(sql, params, many, context)
+
+    graph = UpsertGraph()
+
+    authors = graph.upsert(
+        author_model,
+        ["name"],
+        [dict(name="joe", country="be"), dict(name="jane", country="de")],
+    )
+    books = graph.upsert(
+        book_model,
+        ["author", "title"],
+        [
+            dict(author=authors.ref(name="joe"), title="a", pages=2),
+            dict(author=authors.ref(name="jane"), title="b", pages=3),
+        ],
+    )
+    graph.upsert(
+        chapter_model,
+        ["book", "number"],
+        [
+            dict(
+                book=books.ref(author=authors.ref(name="jane"), title="b"),
+                number=1,
+            ),
+            dict(book=books.ref(author=existing_author, title="a"), number=1),
+        ],
+    )
+
+    with connection.execute_wrapper(_capture):
+        assert graph.execute() == [2, 2, 2]
+
+    assert len(executed_sql) == 1
+
+    jane = author_model.objects.get(name="jane")
+    assert jane.country == "de"
+    assert author_model.objects.get(id=existing_author.id).country == "be"
+
+    new_book = book_model.objects.get(author=jane)
+    assert (new_book.title, new_book.pages) == ("b", 3)
+    assert book_model.objects.get(id=existing_book.id).pages == 2
+
+    assert set(chapter_model.objects.values_list("book_id", "number")) == {
+        (new_book.id, 1),
+        (existing_book.id, 1),
+    }
+
+
+def test_upsert_graph_existing_rows(author_model, book_model):
+    """Tests whether rows can refer to rows that exist but were not upserted
+    by the graph."""
+
+    existing_author = author_model.objects.create(name="joe")
+
+    graph = UpsertGraph()
+    authors = graph.upsert(author_model, ["name"], [dict(name="jane")])
+    graph.upsert(
+        book_model,
+        ["author", "title"],
+        [dict(author=authors.ref(name="joe"), title="a")],
+    )
+
+    assert graph.execute() == [1, 1]
+    assert book_model.objects.get().author_id == existing_author.id
+
+
+def test_upsert_graph_invalid(author_model):
+    """Tests whether references to fields that do not exist and nodes
+    without rows are refused."""
+
+    graph = UpsertGraph()
+
+    with pytest.raises(SuspiciousOperation):
+        graph.upsert(author_model, ["name"], [])
+
+    authors = graph.upsert(author_model, ["name"], [dict(name="joe")])
+
+    with pytest.raises(SuspiciousOperation):
+        authors.ref(nope="joe")
@@ -0,0 +1,263 @@
+import pytest
+
+from django.core.exceptions import SuspiciousOperation
+from django.db import models
+from django.db.models import Q, UniqueConstraint
+from django.db.models.functions import Lower
+
+from psqlextra.expressions import ExcludedCol
+from psqlextra.fields import HStoreField
+from psqlextra.outcome import UpsertResult
+from psqlextra.query import ConflictAction
+from psqlextra.types import InsertEngine, UpsertOutcome
+
+from .fake_model import get_fake_model
+
+
+@pytest.fixture
+def model():
+    return get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "count": models.IntegerField(default=0),
+        }
+    )
+
+
+def test_upsert_return_outcome(model):
+    """Tests whether :see:upsert tells whether the row was inserted, updated
+    or skipped because of the update condition."""
+
+    def _upsert(count):
+        return model.objects.upsert(
+            conflict_target=["name"],
+            fields=dict(name="joe", count=count),
+            update_condition=Q(count__lt=count),
+            return_outcome=True,
+        )
+
+    inserted = _upsert(2)
+    assert inserted.outcomes == [UpsertOutcome.INSERTED]
+    assert inserted.rows == [model.objects.get().pk]
+    assert inserted.skipped == 0
+
+    updated = _upsert(3)
+    assert updated.outcomes == [UpsertOutcome.UPDATED]
+    assert updated.rows == inserted.rows
+
+    skipped = _upsert(1)
+    assert skipped.outcomes == [UpsertOutcome.SKIPPED]
+    assert skipped.rows == []
+    assert skipped.skipped == 1
+
+    assert model.objects.get().count == 3
+
+
+@pytest.mark.parametrize("engine", list(InsertEngine))
+def test_bulk_upsert_return_outcome(model, engine):
+    """Tests whether :see:bulk_upsert tells how many rows were inserted,
+    updated and skipped with every engine."""
+
+    model.objects.create(name="joe", count=5)
+    model.objects.create(name="jane", count=1)
+
+    result = model.objects.bulk_upsert(
+        conflict_target=["name"],
+        rows=[
+            dict(name="joe", count=2),
+            dict(name="jane", count=2),
+            dict(name="john", count=2),
+        ],
+        update_condition=Q(count__lt=ExcludedCol("count")),
+        engine=engine,
+        returning=["name"],
+        return_outcome=True,
+    )
+
+    assert result.outcomes == [
+        UpsertOutcome.SKIPPED,
+        UpsertOutcome.UPDATED,
+        UpsertOutcome.INSERTED,
+    ]
+    assert [row["name"] for row in result.rows] == ["jane", "john"]
+    assert "psqlextra_inserted" not in result.rows[0]
+    assert (result.inserted, result.updated, result.skipped) == (1, 1, 1)
+
+
+@pytest.mark.parametrize("engine", list(InsertEngine))
+def test_bulk_upsert_return_outcome_mixed(model, engine):
+    """Tests whether returned rows and outcomes are matched to the right rows
+    when skipped rows are mixed with updated and inserted rows."""
+
+    model.objects.create(name="a", count=5)
+    model.objects.create(name="c", count=1)
+    model.objects.create(name="e", count=5)
+
+    rows = [
+        dict(name="a", count=2),
+        dict(name="b", count=2),
+        dict(name="c", count=2),
+        dict(name="d", count=2),
+        dict(name="e", count=2),
+        dict(name="f", count=2),
+    ]
+
+    result = model.objects.bulk_upsert(
+        conflict_target=["name"],
+        rows=rows,
+        update_condition=Q(count__lt=ExcludedCol("count")),
+        engine=engine,
+        returning=["id"],
+        return_outcome=True,
+    )
+
+    assert result.outcomes == [
+        UpsertOutcome.SKIPPED,
+        UpsertOutcome.INSERTED,
+        UpsertOutcome.UPDATED,
+        UpsertOutcome.INSERTED,
+        UpsertOutcome.SKIPPED,
+        UpsertOutcome.INSERTED,
+    ]
+
+    ids = dict(model.objects.values_list("name", "id"))
+    assert [row["name"] for row in result.rows] == ["b", "c", "d", "f"]
+    assert all(row["id"] == ids[row["name"]] for row in result.rows)
+    assert (result.inserted, result.updated, result.skipped) == (3, 1, 2)
+
+
+def test_bulk_insert_returning_skipped_rows(model):
+    """Tests whether rows returned by a bulk insert are matched to the
+    right rows when some rows were skipped."""
+
+    model.objects.create(name="a")
+
+    result = model.objects.on_conflict(
+        ["name"], ConflictAction.NOTHING
+    ).bulk_insert(
+        [dict(name="a", count=1), dict(name="b", count=2)],
+        returning=["id"],
+    )
+
+    assert result == [
+        dict(name="b", count=2, id=model.objects.get(name="b").id)
+    ]
+
+
+def test_bulk_insert_returning_skipped_rows_hstore_key():
+    """Tests whether rows returned by a bulk insert are matched to the
+    right rows when the conflict target is a hstore key."""
+
+    model = get_fake_model(
+        {
+            "name": models.CharField(max_length=255),
+            "title": HStoreField(uniqueness=["key1"]),
+        }
+    )
+
+    model.objects.create(name="a", title={"key1": "1"})
+
+    result = model.objects.on_conflict(
+        [("title", "key1")], ConflictAction.NOTHING
+    ).bulk_insert(
+        [
+            dict(name="b", title={"key1": "1"}),
+            dict(name="c", title={"key1": 2}),
+        ],
+        returning=["name"],
+        return_outcome=True,
+    )
+
+    assert result.outcomes == [UpsertOutcome.SKIPPED, UpsertOutcome.INSERTED]
+    assert result.rows == [dict(name="c", title={"key1": 2})]
+
+
+def test_bulk_insert_returning_skipped_rows_expression_target(model):
+    """Tests whether returning rows is refused when the returned rows
+    cannot be matched to the rows that were inserted."""
+
+    constraint = UniqueConstraint(Lower("name"), name="outcome_lower_name")
+
+    with pytest.raises(SuspiciousOperation):
+        model.objects.on_conflict(
+            constraint, ConflictAction.NOTHING
+        ).bulk_insert([dict(name="a"), dict(name="b")], returning=["id"])
+
+
+def test_bulk_upsert_return_outcome_returning_none(model):
+    """Tests whether only the outcomes are returned when nothing else is
+    returned, summed over all chunks."""
+
+    model.objects.create(name="0")
+
+    result = model.objects.bulk_upsert(
+        conflict_target=["name"],
+        rows=[dict(name=str(index), count=index) for index in range(5)],
+        batch_size=2,
+        returning=None,
+        return_outcome=True,
+    )
+
+    assert result.rows == []
+    assert result.inserted == 4
+    assert result.updated == 1
+    assert result.skipped == 0
+
+
+def test_bulk_upsert_return_outcome_models(model):
+    """Tests whether models are returned alongside the outcomes."""
+
+    result = model.objects.bulk_upsert(
+        conflict_target=["name"],
+        rows=[dict(name="joe", count=1)],
+        return_model=True,
+        return_outcome=True,
+    )
+
+    assert isinstance(result.rows[0], model)
+    assert result.rows[0].count == 1
+    assert result.outcomes == [UpsertOutcome.INSERTED]
+
+
+def test_bulk_insert_on_conflict_nothing_return_outcome(model):
+    """Tests whether rows that are ignored because of DO NOTHING and rows
+    that are dropped as duplicates are counted as skipped."""
+
+    model.objects.create(name="joe")
+
+    result = model.objects.on_conflict(
+        ["name"], ConflictAction.NOTHING
+    ).bulk_insert(
+        [dict(name="joe"), dict(name="jane"), dict(name="jane")],
+        return_outcome=True,
+    )
+
+    assert result.outcomes == [UpsertOutcome.SKIPPED, UpsertOutcome.INSERTED]
+    assert result.skipped == 2
+
+
+def test_bulk_insert_return_outcome_without_conflict_handling(model):
+    """Tests whether all rows are reported as inserted when no conflict
+    handling was configured."""
+
+    result = model.objects.bulk_insert(
+        [dict(name="joe"), dict(name="jane")], return_outcome=True
+    )
+
+    assert result.inserted == 2
+    assert result.updated == 0
+
+
+def test_upsert_result_add():
+    """Tests whether results of multiple inserts can be summed."""
+
+    result = sum(
+        [
+            UpsertResult(rows=[1], outcomes=[UpsertOutcome.INSERTED]),
+            UpsertResult(outcomes=[UpsertOutcome.UPDATED], skipped=2),
+        ],
+        UpsertResult(),
+    )
+
+    assert result.rows == [1]
+    assert (result.inserted, result.updated, result.skipped) == (1, 1, 2)
@@ -0,0 +1,139 @@
+from datetime import timedelta
+
+import pytest
+
+from django.db import connection, models
+from django.db.models import F, Q
+
+from psqlextra.fields import HStoreField
+
+from .fake_model import get_fake_model
+
+
+@pytest.fixture
+def model():
+    return get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "count": models.IntegerField(default=0),
+            "title": models.CharField(max_length=255, null=True),
+            "data": HStoreField(null=True),
+        }
+    )
+
+
+def _get_xmin(model, name):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT xmin FROM {model._meta.db_table} WHERE name = %s", (name,)
+        )
+        return cursor.fetchone()[0]
+
+
+def test_bulk_upsert_skip_unchanged(model):
+    """Tests whether rows that would not change are not updated, including
+    rows where NULL stays NULL."""
+
+    model.objects.bulk_insert(
+        [
+            dict(name="joe", count=1, title=None, data={"a": "1"}),
+            dict(name="jane", count=1, title="a", data=None),
+        ]
+    )
+    xmin = _get_xmin(model, "joe")
+
+    result = model.objects.bulk_upsert(
+        ["name"],
+        [
+            dict(name="joe", count=1, title=None, data={"a": "1"}),
+            dict(name="jane", count=1, title=None, data=None),
+            dict(name="john", count=1, title=None, data=None),
+        ],
+        returning=None,
+        return_outcome=True,
+        skip_unchanged=True,
+    )
+
+    assert result.inserted == 1
+    assert result.updated == 1
+    assert result.skipped == 1
+
+    assert _get_xmin(model, "joe") == xmin
+    assert model.objects.get(name="jane").title is None
+
+
+def test_upsert_skip_unchanged_update_condition(model):
+    """Tests whether the guard is combined with the update condition."""
+
+    model.objects.create(name="joe", count=1)
+
+    for count in (1, 2):
+        model.objects.upsert(
+            ["name"],
+            dict(name="joe", count=count),
+            update_condition=Q(title__isnull=False),
+            skip_unchanged=True,
+        )
+
+    assert model.objects.get(name="joe").count == 1
+
+    model.objects.filter(name="joe").update(title="a")
+    model.objects.upsert(
+        ["name"],
+        dict(name="joe", count=2),
+        update_condition=Q(title__isnull=False),
+        skip_unchanged=True,
+    )
+
+    assert model.objects.get(name="joe").count == 2
+
+
+def test_upsert_skip_unchanged_update_values(model):
+    """Tests whether the guard compares against the update values rather
+    than the values that were inserted."""
+
+    model.objects.create(name="joe", count=1, title="a")
+
+    result = model.objects.upsert(
+        ["name"],
+        dict(name="joe", count=5, title="a"),
+        update_values=dict(title="a", count=F("count")),
+        return_outcome=True,
+        skip_unchanged=True,
+    )
+
+    assert result.skipped == 1
+    assert model.objects.get(name="joe").count == 1
+
+
+def test_bulk_upsert_skip_unchanged_auto_now():
+    """Tests whether fields set by `pre_save`, such as `auto_now`, are not
+    compared but still updated when one of the other fields changes."""
+
+    model = get_fake_model(
+        {
+            "name": models.CharField(max_length=255, unique=True),
+            "count": models.IntegerField(default=0),
+            "updated_at": models.DateTimeField(auto_now=True),
+        }
+    )
+
+    model.objects.bulk_insert(
+        [dict(name="joe", count=1), dict(name="jane", count=1)]
+    )
+    model.objects.update(updated_at=F("updated_at") - timedelta(days=1))
+    updated_at = model.objects.get(name="joe").updated_at
+
+    result = model.objects.bulk_upsert(
+        ["name"],
+        [dict(name="joe", count=1), dict(name="jane", count=2)],
+        returning=None,
+        return_outcome=True,
+        skip_unchanged=True,
+    )
+
+    assert result.updated == 1
+    assert result.skipped == 1
+
+    assert model.objects.get(name="joe").updated_at == updated_at
+    assert model.objects.get(name="jane").updated_at > updated_at